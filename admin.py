@@ -1,3 +1,98 @@
+import sys
+import time
 from db.db import *
 
-print(get_user_by_username('AWYME'))
\ No newline at end of file
+
+def import_course(path, validate=True, workers=4):
+    start = time.perf_counter()
+    # Файл читается по ходу проверки и записи, отдельного этапа чтения нет
+    bundle = load_bundle(path)
+    timings = {}
+
+    if validate:
+        from executor.grader import check_solutions
+        from executor.limits import make_limits
+        from executor.pool import ExecutorPool
+
+        started = time.perf_counter()
+        # Первый проход по файлу: ошибки структуры пакета всплывут до запуска пула
+        exercises = [((title, i), exercise['solution_code'], exercise.get('test_cases') or [])
+                     for i, (title, exercise) in enumerate(iter_exercises(bundle), start=1)]
+        pool = ExecutorPool(size=workers, limits=make_limits())
+        try:
+            reports = check_solutions(pool, exercises, workers=workers)
+        finally:
+            pool.close()
+        timings['проверка решений'] = time.perf_counter() - started
+        failed = [(key, report) for key, report in reports if report['total'] and not report['passed']]
+        for (title, number), report in failed:
+            errors = [case['error'] or f"ожидалось {case['expected']!r}, получено {case['output']!r}"
+                      for case in report['cases'] if not case['passed']]
+            print(f'Упражнение {number} («{title}»): не пройдено {report["failed_count"]} из {report["total"]}: {errors[0]}')
+        if failed:
+            print('Импорт отменён: эталонные решения не проходят тесты')
+            return None
+
+    started = time.perf_counter()
+    result = import_course_bundle(bundle)
+    timings['запись'] = time.perf_counter() - started
+    timings['всего'] = time.perf_counter() - start
+
+    print(f"Курс {result['course_id']}: модулей {result['modules']}, уроков {result['lessons']}, "
+          f"упражнений {result['exercises']}")
+    print(', '.join(f'{name} {seconds:.2f} с' for name, seconds in timings.items()))
+    return result
+
+
+if len(sys.argv) > 1 and sys.argv[1] == 'rebuild-progress':
+    rebuild_user_progress_counters()
+    print('Счётчики прогресса пересчитаны')
+elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-leaderboard':
+    rebuild_leaderboards()
+    print('Рейтинг пересчитан')
+elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-search':
+    rebuild_search()
+    print('Поисковый индекс пересчитан')
+elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-analytics':
+    # Можно запускать периодически (cron): исправляет расхождения сводных таблиц с user_progress
+    start = time.perf_counter()
+    rebuild_teacher_analytics()
+    print(f'Статистика для преподавателей пересчитана за {time.perf_counter() - start:.2f} с')
+elif len(sys.argv) > 1 and sys.argv[1] == 'history-stats':
+    stats = get_submission_storage_stats()
+    ratio = stats['code_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+    print(f"Попыток: {stats['submissions']}, уникальных решений: {stats['blobs']}, "
+          f"код {stats['code_bytes']} байт, хранится {stats['stored_bytes']} байт (в {ratio:.1f} раза меньше)")
+elif len(sys.argv) > 2 and sys.argv[1] in ('grant-teacher', 'revoke-teacher'):
+    user = get_user_by_username(sys.argv[2])
+    if user:
+        set_teacher(user['id'], sys.argv[1] == 'grant-teacher')
+        print('Готово')
+    else:
+        print('Пользователь не найден')
+elif len(sys.argv) > 2 and sys.argv[1] == 'revoke-sessions':
+    user = get_user_by_username(sys.argv[2])
+    if user:
+        print(f'Завершено сессий: {revoke_user_sessions(user["id"])}')
+    else:
+        print('Пользователь не найден')
+elif len(sys.argv) > 2 and sys.argv[1] == 'import-course':
+    # python admin.py import-course course.json [--no-validate] [--workers N]
+    args = sys.argv[2:]
+    workers = int(args[args.index('--workers') + 1]) if '--workers' in args else 4
+    try:
+        import_course(args[0], validate='--no-validate' not in args, workers=workers)
+    except BundleError as e:
+        print(e)
+elif len(sys.argv) > 3 and sys.argv[1] == 'export-course':
+    # python admin.py export-course <course_id> course.json|course.yaml
+    start = time.perf_counter()
+    try:
+        modules = export_course_bundle(int(sys.argv[2]), sys.argv[3])
+        print(f'Экспортировано модулей: {modules} за {time.perf_counter() - start:.2f} с')
+    except BundleError as e:
+        print(e)
+elif len(sys.argv) > 1 and sys.argv[1] == 'purge-sessions':
+    print(f'Удалено просроченных сессий: {purge_expired_sessions()}')
+else:
+    print(get_user_by_username('AWYME'))
@@ -0,0 +1,136 @@
+"""Сборка статических файлов: минификация, хэш содержимого в имени и сжатые копии.
+
+static/css/editor.css → static/dist/css/editor.<хэш>.css, рядом .gz и .br
+(brotli — если установлен пакет brotli), соответствие имён — в static/dist/manifest.json.
+Имя меняется вместе с содержимым, поэтому такие файлы можно кэшировать навсегда.
+
+    python assets.py            # собрать вручную (приложение собирает их и при старте)
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+ASSETS = ('style.css', 'css/editor.css', 'js/editor.js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (суффикс файла, Content-Encoding) в порядке предпочтения
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    # Пробелы вокруг операторов внутри calc() значимы, поэтому трогаем только {};,:
+    text = re.sub(r'\s*([{};,])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Консервативно: убирает отступы, пустые строки и строки-комментарии.
+
+    Строки внутри многострочных шаблонов `...` остаются как есть: в них бывает <pre>.
+    """
+    lines = []
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            lines.append(stripped)
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write(path, data):
+    # Несколько процессов могут собирать одновременно: файл появляется целиком или не появляется
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder, names=ASSETS):
+    """Собирает файлы names из static_folder, возвращает манифест {исходное имя: имя в dist}"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for name in names:
+        base, ext = os.path.splitext(name)
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            text = f.read()
+        minify = MINIFIERS.get(ext)
+        data = (minify(text) if minify else text).encode('utf-8')
+        hashed = f'{base}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+        manifest[name] = hashed
+
+        path = os.path.join(dist, hashed)
+        if os.path.exists(path):
+            continue
+        # mtime=0: одинаковое содержимое даёт одинаковый .gz
+        _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(data, quality=11))
+        _write(path, data)
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+class AssetManifest:
+    """Манифест собранных файлов для шаблонов и для отдачи сжатых вариантов."""
+
+    def __init__(self, static_folder, names=ASSETS):
+        self.static_folder = static_folder
+        self.names = names
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        self._set({})
+
+    def build(self):
+        self._set(build_assets(self.static_folder, self.names))
+
+    def load(self):
+        """Манифест, собранный заранее (python assets.py); без него шаблоны ссылаются на исходники."""
+        try:
+            with open(os.path.join(self.dist, MANIFEST), encoding='utf-8') as f:
+                self._set(json.load(f))
+        except FileNotFoundError:
+            self._set({})
+
+    def _set(self, manifest):
+        self.files = manifest
+        self._hashed = set(manifest.values())
+        self.version = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def is_built(self, hashed):
+        return hashed in self._hashed
+
+    def variant(self, hashed, accept_encoding):
+        """(путь в dist, Content-Encoding или None) для лучшего варианта, который принимает клиент"""
+        for suffix, encoding in ENCODINGS:
+            if accept_encoding[encoding] and os.path.exists(os.path.join(self.dist, hashed + suffix)):
+                return hashed + suffix, encoding
+        return hashed, None
+
+
+if __name__ == '__main__':
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for source, built in build_assets(folder).items():
+        print(f'{source} → {DIST_DIR}/{built}')
@@ -0,0 +1,182 @@
+"""Объём истории решений: code_blobs + submissions против кода текстом в каждой строке.
+
+    python -m bench.history                          # 1 000 000 попыток
+    python -m bench.history --count 200000 --duplicates 0.3
+
+--duplicates — доля попыток с кодом, который уже отправлял кто-то ещё
+(шаблон урока, эталонное решение, повторный запуск без правок).
+Обе базы создаются во временном каталоге и удаляются после замера.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from db.history import get_history_stats, record_submission
+from db.migrations import MIGRATIONS
+
+NAIVE_SCHEMA = [
+    '''
+        CREATE TABLE submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            code TEXT NOT NULL,
+            status TEXT NOT NULL,
+            passed_count INTEGER,
+            total_count INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'CREATE INDEX idx_submissions_user_lesson ON submissions (user_id, lesson_id, id)',
+]
+
+NAMES = ('n', 'count', 'total', 'result', 'numbers', 'items', 'words', 'text', 'value', 'answer', 'data', 'x')
+
+PROGRAMS = (
+    'n = int(input())\n{a} = []\nfor i in range(n):\n    {a}.append(int(input()))\nprint(sum({a}) / len({a}))\n',
+    'def {a}({b}):\n    if {b} <= 1:\n        return 1\n    return {b} * {a}({b} - {k})\n\nprint({a}(int(input())))\n',
+    '{a} = input().split()\n{b} = {{}}\nfor word in {a}:\n    {b}[word] = {b}.get(word, 0) + 1\n'
+    'for word, {c} in sorted({b}.items()):\n    print(word, {c})\n',
+    'class {A}:\n    def __init__(self, {a}):\n        self.{a} = {a}\n\n    def area(self):\n'
+    '        return self.{a} ** 2 * {k}\n\nprint({A}(float(input())).area())\n',
+    '{a} = [int(x) for x in input().split()]\n# {comment}\n{b} = max({a})\n{c} = min({a})\nprint({b} - {c}, {b} + {c})\n',
+    'import math\n\n\ndef main():\n    {a} = float(input())\n    {b} = math.sqrt({a}) * {k}\n'
+    '    print(round({b}, 2))\n\n\nif __name__ == "__main__":\n    main()\n',
+    '{a} = input()\n{b} = ""\nfor ch in {a}:\n    if ch.isalpha():\n        {b} += ch.lower()\n'
+    'print("да" if {b} == {b}[::-1] else "нет")\n',
+)
+
+COMMENTS = ('считаем ответ', 'проверка', 'TODO: упростить', 'решение через цикл', 'моё решение', 'работает')
+
+
+def make_program(rng):
+    a, b, c = rng.sample(NAMES, 3)
+    return rng.choice(PROGRAMS).format(a=a, b=b, c=c, A=a.capitalize() + 'Shape', k=rng.randint(1, 99),
+                                       comment=rng.choice(COMMENTS))
+
+
+def make_submissions(count, users, lessons, duplicates, seed_value):
+    """[(user_id, lesson_id, код, статус, пройдено, всего, время)] по возрастанию времени"""
+    rng = random.Random(seed_value)
+    # У каждого урока несколько «общих» решений, которые отправляют многие
+    common = {}
+    started = int(time.time()) - 365 * 86400
+    submissions = []
+    for number in range(count):
+        lesson_id = rng.randint(1, lessons)
+        if rng.random() < duplicates:
+            pool = common.setdefault(lesson_id, [make_program(rng) for _ in range(5)])
+            code = rng.choice(pool)
+        else:
+            # Строка с номером делает код уникальным, иначе шаблоны программ совпадают случайно
+            code = f'{make_program(rng)}# {number}\n'
+        total = rng.randint(3, 8)
+        passed = total if rng.random() < 0.4 else rng.randint(0, total - 1)
+        status = 'passed' if passed == total else 'failed'
+        submissions.append((rng.randint(1, users), lesson_id, code, status, passed, total,
+                            started + number * 30))
+    return submissions
+
+
+def database_size(conn):
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    pages = conn.execute('PRAGMA page_count').fetchone()[0] - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return pages * page_size
+
+
+def open_database(path, statements):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    for statement in statements:
+        conn.execute(statement)
+    return conn
+
+
+def fill_naive(path, submissions):
+    conn = open_database(path, NAIVE_SCHEMA)
+    start = time.perf_counter()
+    conn.executemany('''
+        INSERT INTO submissions (user_id, lesson_id, code, status, passed_count, total_count, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, DATETIME(?, 'unixepoch'))
+    ''', submissions)
+    conn.commit()
+    seconds = time.perf_counter() - start
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    size = database_size(conn)
+    conn.close()
+    return size, seconds
+
+
+def fill_compact(path, submissions, batch=10000):
+    # Только таблицы истории из миграции 9, без остальной схемы приложения
+    steps = next(steps for version, _, steps in MIGRATIONS if version == 9)
+    conn = open_database(path, [step for step in steps if isinstance(step, str)])
+    start = time.perf_counter()
+    for offset in range(0, len(submissions), batch):
+        for user_id, lesson_id, code, status, passed, total, created_at in submissions[offset:offset + batch]:
+            record_submission(conn, user_id, lesson_id, code, status, passed, total, created_at)
+        conn.commit()
+    seconds = time.perf_counter() - start
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    size = database_size(conn)
+    stats = get_history_stats(conn)
+    conn.close()
+    return size, seconds, stats
+
+
+def run(args):
+    directory = tempfile.mkdtemp(prefix='pyway-history-')
+    try:
+        submissions = make_submissions(args.count, args.users, args.lessons, args.duplicates, args.seed)
+        code_bytes = sum(len(code.encode('utf-8')) for _, _, code, _, _, _, _ in submissions)
+
+        naive_size, naive_seconds = fill_naive(os.path.join(directory, 'naive.db'), submissions)
+        compact_size, compact_seconds, stats = fill_compact(os.path.join(directory, 'compact.db'), submissions)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    per_million = 1_000_000 / args.count
+    return {
+        'submissions': args.count,
+        'duplicates': args.duplicates,
+        'unique_programs': stats['blobs'],
+        'code_mb': round(code_bytes / 2 ** 20, 1),
+        'naive': {
+            'size_mb': round(naive_size / 2 ** 20, 1),
+            'size_per_1m_mb': round(naive_size * per_million / 2 ** 20, 1),
+            'bytes_per_submission': round(naive_size / args.count, 1),
+            'insert_per_s': round(args.count / naive_seconds),
+        },
+        'compact': {
+            'size_mb': round(compact_size / 2 ** 20, 1),
+            'size_per_1m_mb': round(compact_size * per_million / 2 ** 20, 1),
+            'bytes_per_submission': round(compact_size / args.count, 1),
+            'blob_compression': round(stats['code_bytes'] / stats['stored_bytes'], 2) if stats['stored_bytes'] else None,
+            'insert_per_s': round(args.count / compact_seconds),
+        },
+        'size_ratio': round(naive_size / compact_size, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Объём истории решений PyWay')
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--lessons', type=int, default=400)
+    parser.add_argument('--duplicates', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
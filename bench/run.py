@@ -0,0 +1,216 @@
+"""Нагрузочный тест маршрутов Flask и исполнителя кода. Результат — JSON.
+
+    python -m bench.run --db /tmp/bench.db --clients 8 --requests 2000 --output result.json
+    python -m bench.run --db /tmp/bench.db --baseline previous.json
+
+Без --db база создаётся заново через bench.seed во временном каталоге.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MIX = '/=2,/courses=2,/course=1,/lesson=4,/profile=2,/api/execute=1'
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def summarize(latencies):
+    return {
+        'count': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def parse_mix(mix):
+    routes = []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        routes.append((name.strip(), float(weight or 1)))
+    return routes
+
+
+def measure_spawn_cost(runs=20):
+    from executor.pool import ExecutorPool, _run_subprocess
+
+    pool = ExecutorPool(size=1)
+    pool.run('pass')
+    start = time.perf_counter()
+    for _ in range(runs):
+        pool.run('pass')
+    pooled = (time.perf_counter() - start) / runs
+    pool.close()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        _run_subprocess('pass', '', 5)
+    cold = (time.perf_counter() - start) / runs
+    return {'pooled_ms': round(pooled * 1000, 3), 'subprocess_ms': round(cold * 1000, 3)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    delta = {}
+    for route, stats in result['routes'].items():
+        base = baseline.get('routes', {}).get(route)
+        if not base:
+            continue
+        delta[route] = {key: round(stats[key] - base[key], 3)
+                        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request') if key in base}
+    delta['throughput_rps'] = round(result['throughput_rps'] - baseline.get('throughput_rps', 0), 2)
+    return delta
+
+
+def run(args):
+    os.environ['DATABASE_PATH'] = args.db
+    os.environ.setdefault('RESULT_CACHE_SIZE', '0')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import db.db as database
+    import main
+    from bench.seed import TOPICS
+    from metrics import request_sql_count
+    app = main.app
+
+    conn = database.get_db_connection()
+    user_ids = [row[0] for row in conn.execute('SELECT id FROM users').fetchall()]
+    course_ids = [row[0] for row in conn.execute('SELECT id FROM courses').fetchall()]
+    lesson_ids = [row[0] for row in conn.execute('SELECT id FROM lessons').fetchall()]
+    conn.close()
+
+    routes = parse_mix(args.mix)
+    names = [name for name, _ in routes]
+    weights = [weight for _, weight in routes]
+    rng = random.Random(args.seed)
+    plan = rng.choices(names, weights, k=args.requests)
+
+    latencies = {name: [] for name in names}
+    queries = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def get_client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            with local.client.session_transaction() as session:
+                user_id = rng.choice(user_ids)
+                session['id'] = user_id
+                session['username'] = f'user{user_id}'
+                session['email'] = f'user{user_id}@example.com'
+        return local.client
+
+    def request(name):
+        client = get_client()
+        start = time.perf_counter()
+        try:
+            if name == '/api/execute':
+                response = client.post('/api/execute', json={
+                    'code': 'a = int(input())\nprint(sum(range(a)))',
+                    'input': str(rng.randint(1, 10000)),
+                    'cache': False
+                })
+            elif name == '/course':
+                response = client.get(f'/course/{rng.choice(course_ids)}')
+            elif name == '/lesson':
+                response = client.get(f'/lesson/{rng.choice(lesson_ids)}')
+            elif name == '/api/search':
+                response = client.get('/api/search', query_string={'q': rng.choice(TOPICS)})
+            else:
+                response = client.get(name)
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[name].append(elapsed)
+            queries[name].append(request_sql_count() if not failed else 0)
+            if failed:
+                errors[name] += 1
+
+    # Прогрев: каталог, пул соединений и интерпретаторов
+    for name in names:
+        request(name)
+    for name in names:
+        latencies[name].clear()
+        queries[name].clear()
+        errors[name] = 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        list(executor.map(request, plan))
+    total = time.perf_counter() - start
+
+    result = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'clients': args.clients, 'requests': args.requests, 'mix': args.mix, 'db': args.db},
+        'duration_s': round(total, 3),
+        'throughput_rps': round(args.requests / total, 2),
+        'routes': {},
+        'executor_spawn': measure_spawn_cost(),
+        'db_pool': database.get_pool_stats(),
+    }
+    for name in names:
+        stats = summarize(latencies[name])
+        stats['errors'] = errors[name]
+        stats['queries_per_request'] = round(sum(queries[name]) / len(queries[name]), 2) if queries[name] else 0.0
+        result['routes'][name] = stats
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            result['delta'] = compare(result, json.load(f))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест PyWay')
+    parser.add_argument('--db', help='база из bench.seed (по умолчанию создаётся временная)')
+    parser.add_argument('--clients', type=int, default=8, help='число параллельных клиентов')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='маршруты и их веса: "/=2,/lesson=4"')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию stdout)')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        from bench.seed import seed
+        args.db = os.path.join(tempfile.mkdtemp(prefix='pyway-bench-'), 'bench.db')
+        seed(args.db)
+
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Задержка /api/search на большом синтетическом каталоге.
+
+    python -m bench.search                         # 100 000 уроков во временной базе
+    python -m bench.search --db /tmp/search.db --queries 2000 --budget-ms 50
+
+Код возврата 1, если p95 превышает --budget-ms.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench.run import summarize
+from bench.seed import TOPICS, seed
+
+
+def make_queries(rng, count):
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(rng.choice(TOPICS))
+        elif kind < 0.7:
+            queries.append(' '.join(rng.sample(TOPICS, 2)))
+        elif kind < 0.9:
+            # Префикс, как при наборе в строке поиска
+            queries.append(rng.choice(TOPICS)[:rng.randint(2, 5)])
+        else:
+            queries.append(f'сложите {rng.choice(TOPICS)}')
+    return queries
+
+
+def run(args):
+    os.environ['DATABASE_PATH'] = args.db
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    start = time.perf_counter()
+    import main
+    index_seconds = time.perf_counter() - start
+
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session['id'] = 1
+        session['username'] = 'user1'
+        session['email'] = 'user1@example.com'
+
+    rng = random.Random(args.seed)
+    queries = make_queries(rng, args.queries)
+    # Прогрев: каталог в памяти и страницы индекса в кэше SQLite
+    for query in queries[:20]:
+        client.get('/api/search', query_string={'q': query})
+
+    latencies = []
+    results = 0
+    errors = 0
+    for query in queries:
+        started = time.perf_counter()
+        response = client.get('/api/search', query_string={'q': query})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+        else:
+            results += len(response.get_json()['results'])
+
+    conn = main.get_db_connection()
+    lessons = conn.execute('SELECT COUNT(*) FROM lessons').fetchone()[0]
+    conn.close()
+    stats = summarize(latencies)
+    return {
+        'lessons': lessons,
+        'startup_with_migrations_s': round(index_seconds, 2),
+        'search': stats,
+        'errors': errors,
+        'results_per_query': round(results / len(queries), 2),
+        'budget_ms': args.budget_ms,
+        'within_budget': stats['p95_ms'] <= args.budget_ms,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест поиска PyWay')
+    parser.add_argument('--db', help='база из bench.seed (по умолчанию создаётся временная на 100 000 уроков)')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='допустимый p95 одного запроса')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        args.db = os.path.join(tempfile.mkdtemp(prefix='pyway-search-'), 'search.db')
+        # 100 курсов × 10 модулей × 100 уроков
+        seed(args.db, users=10, courses=100, modules_per_course=10, lessons_per_module=100, progress=0)
+
+    result = run(args)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result['within_budget'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
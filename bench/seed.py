@@ -0,0 +1,205 @@
+"""Создаёт базу с синтетическими данными для нагрузочных тестов.
+
+    python -m bench.seed /tmp/bench.db --users 5000 --courses 30 --progress 300000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from werkzeug.security import generate_password_hash
+
+# Схема исходной базы db/app.db до миграций (user_version = 0), всё остальное создают миграции.
+# Не читается из db/app.db: рабочая база уже может быть мигрирована, и её таблицы содержат
+# колонки, которые миграции добавили бы повторно
+BASE_SCHEMA = (
+    '''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            experience INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            streak_days INTEGER DEFAULT 0,
+            last_activity_date DATE
+        )
+    ''',
+    '''
+        CREATE TABLE courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(100) NOT NULL,
+            description TEXT,
+            difficulty_level VARCHAR(20) DEFAULT 'beginner',
+            order_index INTEGER DEFAULT 0,
+            is_active BOOLEAN DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE TABLE modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL,
+            title VARCHAR(100) NOT NULL,
+            description TEXT,
+            order_index INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE
+        )
+    ''',
+    '''
+        CREATE TABLE lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            title VARCHAR(100) NOT NULL,
+            content TEXT NOT NULL,
+            order_index INTEGER DEFAULT 0,
+            lesson_type VARCHAR(20) DEFAULT 'theory',
+            expected_output TEXT,
+            hints TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (module_id) REFERENCES modules (id) ON DELETE CASCADE
+        )
+    ''',
+    '''
+        CREATE TABLE exercises (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lesson_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            starter_code TEXT,
+            solution_code TEXT NOT NULL,
+            test_cases TEXT,
+            difficulty VARCHAR(20) DEFAULT 'easy',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lesson_id) REFERENCES lessons (id) ON DELETE CASCADE
+        )
+    ''',
+    '''
+        CREATE TABLE user_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            lesson_id INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT 0,
+            completed_at DATETIME,
+            code_submission TEXT,
+            attempts INTEGER DEFAULT 0,
+            score INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (lesson_id) REFERENCES lessons (id) ON DELETE CASCADE,
+            UNIQUE(user_id, lesson_id)
+        )
+    ''',
+)
+PASSWORD = 'benchmark'
+
+# Темы для разного текста уроков, чтобы поиск не находил каждый урок по любому слову
+TOPICS = ('переменные', 'циклы', 'функции', 'строки', 'списки', 'словари', 'множества', 'кортежи',
+          'исключения', 'классы', 'наследование', 'генераторы', 'декораторы', 'модули', 'файлы',
+          'рекурсия', 'сортировка', 'поиск', 'итераторы', 'аннотации', 'замыкания', 'форматирование',
+          'сравнение', 'условия', 'срезы', 'словарь', 'алгоритмы', 'тестирование', 'отладка', 'регулярные')
+
+
+def lesson_text(rng):
+    topics = rng.sample(TOPICS, 3)
+    return (f'<p>В этом уроке разбираем {topics[0]}, {topics[1]} и {topics[2]}. '
+            f'Python позволяет писать короткие и понятные программы.</p>') * 6
+
+
+def create_base_schema(conn):
+    for sql in BASE_SCHEMA:
+        conn.execute(sql)
+
+
+def seed(path, users=2000, courses=24, modules_per_course=5, lessons_per_module=8,
+         progress=200000, seed_value=42):
+    rng = random.Random(seed_value)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    conn = sqlite3.connect(path)
+    create_base_schema(conn)
+    start = time.perf_counter()
+
+    # Хэш пароля считается один раз: он намеренно медленный
+    password_hash = generate_password_hash(PASSWORD)
+    conn.executemany('''
+        INSERT INTO users (id, username, email, password_hash, experience, level, streak_days)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(i, f'user{i}', f'user{i}@example.com', password_hash,
+           rng.randint(0, 5000), rng.randint(1, 20), rng.randint(0, 60))
+          for i in range(1, users + 1)])
+
+    conn.executemany('INSERT INTO courses (id, title, description, order_index) VALUES (?, ?, ?, ?)',
+                     [(i, f'Курс {i}', f'Описание курса {i}', i) for i in range(1, courses + 1)])
+
+    module_rows, lesson_rows, exercise_rows = [], [], []
+    module_id = lesson_id = 0
+    for course_id in range(1, courses + 1):
+        for m in range(1, modules_per_course + 1):
+            module_id += 1
+            module_rows.append((module_id, course_id, f'Модуль {course_id}.{m}', m))
+            for l in range(1, lessons_per_module + 1):
+                lesson_id += 1
+                lesson_rows.append((lesson_id, module_id, f'Урок {course_id}.{m}.{l}: {rng.choice(TOPICS)}',
+                                    lesson_text(rng), l))
+                test_cases = [{'input': f'{a}\n{a + 1}', 'output': str(2 * a + 1)} for a in range(3)]
+                exercise_rows.append((lesson_id, f'Сложите два числа ({lesson_id})',
+                                      'a = int(input())\nb = int(input())\n',
+                                      'a = int(input())\nb = int(input())\nprint(a + b)',
+                                      json.dumps(test_cases)))
+
+    conn.executemany('INSERT INTO modules (id, course_id, title, order_index) VALUES (?, ?, ?, ?)',
+                     module_rows)
+    conn.executemany('INSERT INTO lessons (id, module_id, title, content, order_index) VALUES (?, ?, ?, ?, ?)',
+                     lesson_rows)
+    conn.executemany('''
+        INSERT INTO exercises (lesson_id, question, starter_code, solution_code, test_cases)
+        VALUES (?, ?, ?, ?, ?)
+    ''', exercise_rows)
+
+    progress = min(progress, users * lesson_id)
+    pairs = set()
+    while len(pairs) < progress:
+        pairs.add((rng.randint(1, users), rng.randint(1, lesson_id)))
+    conn.executemany('''
+        INSERT INTO user_progress (user_id, lesson_id, completed, completed_at, code_submission, attempts, score)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?)
+    ''', ((user_id, lesson_id_, rng.random() < 0.7, 'print(1)', rng.randint(1, 5), rng.randint(0, 10))
+          for user_id, lesson_id_ in pairs))
+
+    conn.commit()
+    conn.close()
+    return {
+        'users': users,
+        'courses': courses,
+        'modules': module_id,
+        'lessons': lesson_id,
+        'progress_rows': progress,
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Синтетическая база для нагрузочных тестов')
+    parser.add_argument('path')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=24)
+    parser.add_argument('--modules', type=int, default=5, help='модулей в курсе')
+    parser.add_argument('--lessons', type=int, default=8, help='уроков в модуле')
+    parser.add_argument('--progress', type=int, default=200000, help='строк user_progress')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    result = seed(args.path, args.users, args.courses, args.modules, args.lessons,
+                  args.progress, args.seed)
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
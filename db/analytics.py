@@ -0,0 +1,156 @@
+"""Сводные таблицы для панели преподавателя.
+
+Панель читает только их, а не user_progress:
+    lesson_stats       — по уроку: начали (отправили решение хотя бы раз), прошли, сумма попыток;
+    lesson_attempts    — по уроку: сколько пользователей сделали N попыток (для медианы);
+    daily_stats        — по дню: активные пользователи, отправки, первые прохождения;
+    daily_active_users — кто был активен в день (нужна, чтобы не считать пользователя дважды).
+
+apply_analytics_delta вызывается в транзакции update_user_progress,
+rebuild_analytics пересчитывает статистику уроков целиком (admin.py rebuild-analytics).
+"""
+
+# Попытки сверх этого числа попадают в одну корзину «ATTEMPTS_CAP и больше»
+ATTEMPTS_CAP = 20
+# Сколько дней хранить daily_active_users; daily_stats хранится всегда
+ACTIVE_USERS_DAYS = 90
+
+
+def _bucket(attempts):
+    return min(attempts, ATTEMPTS_CAP)
+
+
+def apply_analytics_delta(conn, user_id, lesson_id, old_attempts, new_attempts, completed_delta):
+    """old_attempts — попытки до изменения (0, если пользователь открыл урок впервые)."""
+    conn.execute('''
+        INSERT INTO lesson_stats (lesson_id, started_users, completed_users, total_attempts, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (lesson_id) DO UPDATE SET
+            started_users = started_users + excluded.started_users,
+            completed_users = completed_users + excluded.completed_users,
+            total_attempts = total_attempts + excluded.total_attempts,
+            updated_at = excluded.updated_at
+    ''', (lesson_id, int(not old_attempts), completed_delta, new_attempts - old_attempts))
+
+    if _bucket(old_attempts) != _bucket(new_attempts):
+        if old_attempts:
+            conn.execute('''
+                UPDATE lesson_attempts SET users = users - 1 WHERE lesson_id = ? AND attempts = ?
+            ''', (lesson_id, _bucket(old_attempts)))
+        conn.execute('''
+            INSERT INTO lesson_attempts (lesson_id, attempts, users) VALUES (?, ?, 1)
+            ON CONFLICT (lesson_id, attempts) DO UPDATE SET users = users + 1
+        ''', (lesson_id, _bucket(new_attempts)))
+
+    first_visit = conn.execute('''
+        INSERT OR IGNORE INTO daily_active_users (day, user_id) VALUES (DATE('now'), ?)
+    ''', (user_id,)).rowcount
+    conn.execute('''
+        INSERT INTO daily_stats (day, active_users, submissions, completions)
+        VALUES (DATE('now'), ?, 1, ?)
+        ON CONFLICT (day) DO UPDATE SET
+            active_users = active_users + excluded.active_users,
+            submissions = submissions + 1,
+            completions = completions + excluded.completions
+    ''', (first_visit, max(completed_delta, 0)))
+
+
+def rebuild_analytics(conn):
+    """Пересчитывает статистику уроков по user_progress. Вызывающий код фиксирует транзакцию.
+
+    Дневная статистика — журнал событий, её по user_progress не восстановить: дни, которых
+    ещё нет в daily_stats, заполняются по completed_at, остальные не меняются.
+    """
+    conn.execute('DELETE FROM lesson_stats')
+    conn.execute('DELETE FROM lesson_attempts')
+    conn.execute('''
+        INSERT INTO lesson_stats (lesson_id, started_users, completed_users, total_attempts, updated_at)
+        SELECT lesson_id, COUNT(*), SUM(CASE WHEN completed THEN 1 ELSE 0 END), SUM(attempts), CURRENT_TIMESTAMP
+        FROM user_progress
+        WHERE attempts > 0
+        GROUP BY lesson_id
+    ''')
+    conn.execute('''
+        INSERT INTO lesson_attempts (lesson_id, attempts, users)
+        SELECT lesson_id, MIN(attempts, ?), COUNT(*)
+        FROM user_progress
+        WHERE attempts > 0
+        GROUP BY 1, 2
+    ''', (ATTEMPTS_CAP,))
+    conn.execute('''
+        INSERT OR IGNORE INTO daily_stats (day, active_users, submissions, completions)
+        SELECT DATE(completed_at), COUNT(DISTINCT user_id), COUNT(*), COUNT(*)
+        FROM user_progress
+        WHERE completed AND completed_at IS NOT NULL
+        GROUP BY DATE(completed_at)
+    ''')
+    conn.execute('''
+        DELETE FROM daily_active_users WHERE day < DATE('now', ?)
+    ''', (f'-{ACTIVE_USERS_DAYS} days',))
+
+
+def median_attempts(histogram):
+    """Медиана по [(попытки, пользователей)] в порядке возрастания попыток"""
+    total = sum(users for _, users in histogram)
+    if not total:
+        return None
+    seen = 0
+    for attempts, users in histogram:
+        seen += users
+        if seen * 2 >= total:
+            return attempts
+    return histogram[-1][0]
+
+
+def get_attempt_medians(conn, lesson_ids):
+    medians = {}
+    lesson_ids = list(lesson_ids)
+    # Не больше 900 параметров в одном запросе
+    for start in range(0, len(lesson_ids), 900):
+        chunk = lesson_ids[start:start + 900]
+        placeholders = ','.join('?' * len(chunk))
+        histograms = {}
+        for row in conn.execute(f'''
+            SELECT lesson_id, attempts, users FROM lesson_attempts
+            WHERE lesson_id IN ({placeholders}) AND users > 0
+            ORDER BY lesson_id, attempts
+        ''', chunk).fetchall():
+            histograms.setdefault(row['lesson_id'], []).append((row['attempts'], row['users']))
+        for lesson_id, histogram in histograms.items():
+            medians[lesson_id] = median_attempts(histogram)
+    return medians
+
+
+def get_lesson_stats(conn, lesson_ids):
+    stats = {}
+    lesson_ids = list(lesson_ids)
+    for start in range(0, len(lesson_ids), 900):
+        chunk = lesson_ids[start:start + 900]
+        placeholders = ','.join('?' * len(chunk))
+        for row in conn.execute(f'''
+            SELECT lesson_id, started_users, completed_users, total_attempts FROM lesson_stats
+            WHERE lesson_id IN ({placeholders})
+        ''', chunk).fetchall():
+            stats[row['lesson_id']] = dict(row)
+    return stats
+
+
+def get_hardest_lessons(conn, limit=10, min_users=5):
+    """Уроки с самой низкой долей прохождения среди начавших (при равенстве — больше попыток)"""
+    rows = conn.execute('''
+        SELECT lesson_id, started_users, completed_users, total_attempts FROM lesson_stats
+        WHERE started_users >= ?
+        ORDER BY CAST(completed_users AS REAL) / started_users,
+                 CAST(total_attempts AS REAL) / started_users DESC
+        LIMIT ?
+    ''', (min_users, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_daily_stats(conn, days=30):
+    rows = conn.execute('''
+        SELECT day, active_users, submissions, completions FROM daily_stats
+        WHERE day >= DATE('now', ?)
+        ORDER BY day
+    ''', (f'-{days - 1} days',)).fetchall()
+    return [dict(row) for row in rows]
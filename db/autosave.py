@@ -0,0 +1,118 @@
+"""Отложенная запись автосохранений кода: повторные сохранения склеиваются в памяти.
+
+Буфер свой у каждого процесса, поэтому каждая запись помечена временем сохранения
+(user_progress.code_saved_at): сброс не затирает код, сохранённый позже другим процессом,
+например отправленное там решение.
+"""
+import atexit
+import threading
+import time
+
+
+class AutosaveBuffer:
+    """Хранит последний код для каждой пары (user_id, lesson_id) и пишет всё одной транзакцией.
+
+    Сброс происходит раз в flush_interval секунд, при накоплении max_pending записей
+    и при завершении процесса.
+    """
+
+    def __init__(self, connect, flush_interval=2.0, max_pending=200):
+        self.connect = connect
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.saves = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+        atexit.register(self.close)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='autosave-flusher', daemon=True)
+            self._thread.start()
+
+    def save(self, user_id, lesson_id, code):
+        with self._lock:
+            self._pending[(user_id, lesson_id)] = (code, time.time())
+            self.saves += 1
+            pending = len(self._pending)
+            self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def get(self, user_id, lesson_id):
+        """(код, время сохранения) ещё не записанного черновика или None"""
+        with self._lock:
+            return self._pending.get((user_id, lesson_id))
+
+    def discard(self, user_id, lesson_id):
+        """Забывает черновик перед записью отправленного решения.
+
+        Ждёт сброс, который уже идёт: иначе черновик из его пакета мог бы записаться
+        после решения и затереть его.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop((user_id, lesson_id), None)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            conn = self.connect()
+            try:
+                conn.executemany('''
+                    INSERT INTO user_progress (user_id, lesson_id, code_submission, code_saved_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (user_id, lesson_id) DO UPDATE SET
+                        code_submission = excluded.code_submission,
+                        code_saved_at = excluded.code_saved_at
+                    WHERE user_progress.code_saved_at IS NULL
+                       OR user_progress.code_saved_at < excluded.code_saved_at
+                ''', [(user_id, lesson_id, code, saved_at)
+                      for (user_id, lesson_id), (code, saved_at) in batch.items()])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self._lock:
+                    # Более свежие сохранения, пришедшие во время сброса, важнее
+                    for key, code in batch.items():
+                        self._pending.setdefault(key, code)
+                raise
+            finally:
+                conn.close()
+
+            self.flushes += 1
+            self.rows_written += len(batch)
+            return len(batch)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[DB ERROR] Ошибка при сохранении черновиков кода: {e}")
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'saves': self.saves,
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+            }
@@ -0,0 +1,371 @@
+"""Импорт и экспорт курса целиком: курс → модули → уроки → упражнения.
+
+Формат пакета (JSON или YAML):
+    {"format": "pyway-course", "version": 1,
+     "course": {..., "modules": [{..., "lessons": [{..., "exercises": [{..., "test_cases": [...]}]}]}]}}
+
+JSON и пишется, и читается по одному модулю: весь курс в памяти не собирается.
+YAML в обе стороны обрабатывается целиком.
+Импорт выполняется одной транзакцией, уроки и упражнения модуля вставляются через executemany.
+"""
+import json
+import os
+import re
+
+BUNDLE_FORMAT = 'pyway-course'
+BUNDLE_VERSION = 1
+
+COURSE_FIELDS = ('title', 'description', 'difficulty_level', 'order_index', 'is_active')
+MODULE_FIELDS = ('title', 'description', 'order_index')
+LESSON_FIELDS = ('title', 'content', 'order_index', 'lesson_type', 'expected_output', 'hints')
+EXERCISE_FIELDS = ('question', 'starter_code', 'solution_code', 'test_cases', 'difficulty')
+
+REQUIRED_FIELDS = {
+    'course': ('title',),
+    'module': ('title',),
+    'lesson': ('title', 'content'),
+    'exercise': ('question', 'solution_code'),
+}
+
+
+class BundleError(Exception):
+    pass
+
+
+def _is_yaml(path):
+    return os.path.splitext(path)[1].lower() in ('.yaml', '.yml')
+
+
+def _yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise BundleError('Для YAML нужен пакет PyYAML (pip install pyyaml)') from None
+    return yaml
+
+
+class _JsonStream:
+    """Разбор JSON из файла по частям: значения декодируются json по одному, буфер держит
+    только ещё не разобранный текст."""
+
+    CHUNK = 1 << 16
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = ''
+        self._pos = 0
+        self._offset = 0
+
+    def _more(self, size=CHUNK):
+        chunk = self._f.read(size)
+        if not chunk:
+            return False
+        self._offset += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message):
+        return BundleError(f'Ошибка JSON (символ {self._offset + self._pos}): {message}')
+
+    def peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._more():
+                return self._buf[self._pos:self._pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self._error(f'ожидался {char!r}')
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Значение не поместилось в буфер: дочитываем не меньше уже прочитанного,
+                # чтобы большой модуль не разбирался заново после каждого блока
+                if self._more(max(self.CHUNK, len(self._buf) - self._pos)):
+                    continue
+                raise self._error(e.msg) from None
+            if end == len(self._buf) and self._more():
+                continue  # число могло оборваться на границе блока
+            self._pos = end
+            return value
+
+    def keys(self):
+        """Ключи объекта после '{'; значение каждого ключа вызывающий читает сам"""
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self._error('ожидался ключ объекта')
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self._pos += len(separator)
+            if separator == '}':
+                return
+            if separator != ',':
+                raise self._error("ожидалась ',' или '}'")
+
+    def items(self):
+        """Элементы массива после '['"""
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self._pos += len(separator)
+            if separator == ']':
+                return
+            if separator != ',':
+                raise self._error("ожидалась ',' или ']'")
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class BundleReader:
+    """Пакет курса в файле. JSON читается по одному модулю при каждом обходе modules(),
+    YAML загружается целиком (PyYAML не отдаёт документ по частям)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.course = {}
+
+    def _check_header(self):
+        if self.header.get('format') != BUNDLE_FORMAT:
+            raise BundleError(f'Это не пакет курса ({BUNDLE_FORMAT})')
+        if self.header.get('version') != BUNDLE_VERSION:
+            raise BundleError(f'Неподдерживаемая версия пакета: {self.header.get("version")}')
+
+    def _read_yaml(self):
+        with open(self.path, encoding='utf-8') as f:
+            bundle = _yaml().safe_load(f)
+        if not isinstance(bundle, dict) or not isinstance(bundle.get('course'), dict):
+            raise BundleError(f'Это не пакет курса ({BUNDLE_FORMAT})')
+        self.header = {key: value for key, value in bundle.items() if key != 'course'}
+        self.course = {key: value for key, value in bundle['course'].items() if key != 'modules'}
+        self._check_header()
+        yield from bundle['course'].get('modules') or []
+
+    def _read_json(self):
+        with open(self.path, encoding='utf-8') as f:
+            stream = _JsonStream(f)
+            if stream.peek() != '{':
+                raise BundleError(f'Это не пакет курса ({BUNDLE_FORMAT})')
+            stream.expect('{')
+            for key in stream.keys():
+                if key != 'course':
+                    self.header[key] = stream.value()
+                    continue
+                # Обычно format и version идут первыми: чужой файл отвергаем, не читая его дальше
+                if 'format' in self.header:
+                    self._check_header()
+                if stream.peek() != '{':
+                    raise BundleError('курс: ожидался объект')
+                stream.expect('{')
+                for course_key in stream.keys():
+                    if course_key == 'modules' and stream.peek() == '[':
+                        stream.expect('[')
+                        yield from stream.items()
+                    elif course_key == 'modules':
+                        if stream.value() is not None:
+                            raise BundleError('курс: modules должен быть списком')
+                    else:
+                        self.course[course_key] = stream.value()
+            if stream.peek():
+                raise BundleError('Лишние данные после пакета курса')
+        self._check_header()
+
+    def modules(self):
+        """Модули пакета по одному; после последнего заполнены header и course.
+
+        Модули с ошибками не выдаются, а все ошибки пакета бросаются одним BundleError
+        в конце обхода: импорт к этому моменту ещё не зафиксирован и откатывается.
+        """
+        self.header, self.course = {}, {}
+        errors = []
+        source = self._read_yaml() if _is_yaml(self.path) else self._read_json()
+        for m, module in enumerate(source, start=1):
+            module_errors = _module_errors(module, m)
+            if module_errors:
+                errors.extend(module_errors)
+            else:
+                yield module
+        errors[:0] = _item_errors('course', self.course, 'курс')
+        if errors:
+            raise BundleError('Ошибки в пакете:\n' + '\n'.join(errors))
+
+
+def load_bundle(path):
+    """Пакет курса из файла; сам файл читается и проверяется при обходе modules()"""
+    if not os.path.isfile(path):
+        raise BundleError(f'Файл {path} не найден')
+    return BundleReader(path)
+
+
+def _item_errors(kind, item, where):
+    if not isinstance(item, dict):
+        return [f'{where}: ожидался объект']
+    return [f'{where}: не заполнено поле {field}' for field in REQUIRED_FIELDS[kind] if not item.get(field)]
+
+
+def _module_errors(module, m):
+    errors = _item_errors('module', module, f'модуль {m}')
+    if not isinstance(module, dict):
+        return errors
+    for l, lesson in enumerate(module.get('lessons') or [], start=1):
+        lesson_errors = _item_errors('lesson', lesson, f'модуль {m}, урок {l}')
+        errors.extend(lesson_errors)
+        if not isinstance(lesson, dict):
+            continue
+        for e, exercise in enumerate(lesson.get('exercises') or [], start=1):
+            where = f'модуль {m}, урок {l}, упражнение {e}'
+            exercise_errors = _item_errors('exercise', exercise, where)
+            errors.extend(exercise_errors)
+            if not isinstance(exercise, dict):
+                continue
+            test_cases = exercise.get('test_cases') or []
+            if not isinstance(test_cases, list) or not all(
+                    isinstance(case, dict) and 'output' in case for case in test_cases):
+                errors.append(f'{where}: test_cases должен быть списком объектов с полем output')
+    return errors
+
+
+def iter_exercises(bundle):
+    """(название урока, упражнение) для всех упражнений пакета"""
+    for module in bundle.modules():
+        for lesson in module.get('lessons') or []:
+            for exercise in lesson.get('exercises') or []:
+                yield lesson['title'], exercise
+
+
+def _next_id(conn, table):
+    # AUTOINCREMENT не выдаёт id удалённых строк повторно, поэтому учитываем и sqlite_sequence
+    max_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+    seq = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    return max(max_id, seq[0] if seq else 0) + 1
+
+
+def import_bundle(conn, bundle):
+    """Вставляет курс из пакета (BundleReader) одной транзакцией и возвращает счётчики вставленных строк.
+
+    id назначаются заранее, поэтому уроки и упражнения модуля вставляются одним executemany,
+    а строка курса — после модулей, когда прочитаны все его поля.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Модули ссылаются на курс, который вставляется последним
+        conn.execute('PRAGMA defer_foreign_keys = ON')
+        course_id = _next_id(conn, 'courses')
+        module_id = _next_id(conn, 'modules')
+        lesson_id = _next_id(conn, 'lessons')
+        exercise_id = _next_id(conn, 'exercises')
+        counts = {'modules': 0, 'lessons': 0, 'exercises': 0}
+
+        for m, module in enumerate(bundle.modules()):
+            lessons, exercises = [], []
+            for l, lesson in enumerate(module.get('lessons') or []):
+                hints = lesson.get('hints')
+                if isinstance(hints, (list, dict)):
+                    hints = json.dumps(hints, ensure_ascii=False)
+                lessons.append((lesson_id, module_id, lesson['title'], lesson['content'],
+                                lesson.get('order_index', l + 1), lesson.get('lesson_type', 'theory'),
+                                lesson.get('expected_output'), hints))
+                for exercise in lesson.get('exercises') or []:
+                    exercises.append((exercise_id, lesson_id, exercise['question'], exercise.get('starter_code'),
+                                      exercise['solution_code'],
+                                      json.dumps(exercise.get('test_cases') or [], ensure_ascii=False),
+                                      exercise.get('difficulty', 'easy')))
+                    exercise_id += 1
+                lesson_id += 1
+
+            conn.execute('''
+                INSERT INTO modules (id, course_id, title, description, order_index) VALUES (?, ?, ?, ?, ?)
+            ''', (module_id, course_id, module['title'], module.get('description'), module.get('order_index', m + 1)))
+            conn.executemany('''
+                INSERT INTO lessons (id, module_id, title, content, order_index, lesson_type, expected_output, hints)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', lessons)
+            conn.executemany('''
+                INSERT INTO exercises (id, lesson_id, question, starter_code, solution_code, test_cases, difficulty)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', exercises)
+            module_id += 1
+            counts['modules'] += 1
+            counts['lessons'] += len(lessons)
+            counts['exercises'] += len(exercises)
+
+        course = bundle.course
+        conn.execute('''
+            INSERT INTO courses (id, title, description, difficulty_level, order_index, is_active)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (course_id, course['title'], course.get('description'), course.get('difficulty_level', 'beginner'),
+              course.get('order_index', 0), int(course.get('is_active', True))))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'course_id': course_id, **counts}
+
+
+def _row(row, fields):
+    return {field: row[field] for field in fields}
+
+
+def _iter_modules(conn, course_id):
+    modules = conn.execute('SELECT * FROM modules WHERE course_id = ? ORDER BY order_index, id',
+                           (course_id,)).fetchall()
+    for module in modules:
+        data = _row(module, MODULE_FIELDS)
+        data['lessons'] = []
+        for lesson in conn.execute('SELECT * FROM lessons WHERE module_id = ? ORDER BY order_index, id',
+                                   (module['id'],)).fetchall():
+            lesson_data = _row(lesson, LESSON_FIELDS)
+            lesson_data['exercises'] = []
+            for exercise in conn.execute('SELECT * FROM exercises WHERE lesson_id = ? ORDER BY id',
+                                         (lesson['id'],)).fetchall():
+                exercise_data = _row(exercise, EXERCISE_FIELDS)
+                exercise_data['test_cases'] = json.loads(exercise['test_cases']) if exercise['test_cases'] else []
+                lesson_data['exercises'].append(exercise_data)
+            data['lessons'].append(lesson_data)
+        yield data
+
+
+def _get_course(conn, course_id):
+    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+    if course is None:
+        raise BundleError(f'Курс {course_id} не найден')
+    data = _row(course, COURSE_FIELDS)
+    data['is_active'] = bool(data['is_active'])
+    return data
+
+
+def export_bundle(conn, course_id, path):
+    """Пишет курс в файл пакета; возвращает число модулей."""
+    course = _get_course(conn, course_id)
+    if _is_yaml(path):
+        course['modules'] = list(_iter_modules(conn, course_id))
+        bundle = {'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION, 'course': course}
+        with open(path, 'w', encoding='utf-8') as f:
+            _yaml().safe_dump(bundle, f, allow_unicode=True, sort_keys=False)
+        return len(course['modules'])
+
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        header = json.dumps(course, ensure_ascii=False)[:-1]
+        f.write(f'{{"format": "{BUNDLE_FORMAT}", "version": {BUNDLE_VERSION}, "course": {header}, "modules": [')
+        for module in _iter_modules(conn, course_id):
+            f.write((',\n' if count else '\n') + json.dumps(module, ensure_ascii=False))
+            count += 1
+        f.write('\n]}}\n')
+    return count
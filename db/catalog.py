@@ -0,0 +1,132 @@
+"""Неизменяемый снимок каталога курсов в памяти процесса.
+
+Снимок перестраивается целиком, когда меняется catalog_version — счётчик,
+который увеличивают триггеры на courses/modules/lessons/exercises. Поэтому
+несколько процессов gunicorn замечают правку контента одним дешёвым запросом.
+Возвращаемые словари общие для всех запросов и не должны изменяться.
+"""
+import bisect
+import json
+import threading
+import time
+
+
+def _sort_key(row):
+    return (row['order_index'] if row['order_index'] is not None else 0, row['id'])
+
+
+def _parse_test_cases(raw):
+    if not raw:
+        return []
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+
+
+class Catalog:
+    def __init__(self, version, courses, modules, lessons, exercises):
+        self.version = version
+        self.loaded_at = time.time()
+        self.courses_by_id = {course['id']: course for course in courses}
+        self.modules_by_id = {module['id']: module for module in modules}
+        self.lessons_by_id = {lesson['id']: lesson for lesson in lessons}
+
+        self.active_courses = sorted((c for c in courses if c['is_active']), key=_sort_key)
+
+        self.exercises_by_lesson = {}
+        for exercise in sorted(exercises, key=lambda e: e['id']):
+            if exercise['lesson_id'] in self.exercises_by_lesson:
+                continue
+            test_cases = _parse_test_cases(exercise['test_cases'])
+            exercise['test_cases'] = test_cases
+            exercise['parsed_test_cases'] = test_cases
+            self.exercises_by_lesson[exercise['lesson_id']] = exercise
+
+        lessons_by_module = {}
+        for lesson in sorted(lessons, key=_sort_key):
+            lessons_by_module.setdefault(lesson['module_id'], []).append(lesson)
+
+        self.next_lesson = {}
+        self.prev_lesson = {}
+        for module_lessons in lessons_by_module.values():
+            orders = [_sort_key(lesson)[0] for lesson in module_lessons]
+            for lesson, order in zip(module_lessons, orders):
+                # Та же логика, что и в запросах по order_index: строго больше/меньше
+                after = bisect.bisect_right(orders, order)
+                before = bisect.bisect_left(orders, order) - 1
+                if after < len(module_lessons):
+                    nxt = module_lessons[after]
+                    self.next_lesson[lesson['id']] = {'id': nxt['id'], 'title': nxt['title']}
+                if before >= 0:
+                    prev = module_lessons[before]
+                    self.prev_lesson[lesson['id']] = {'id': prev['id'], 'title': prev['title']}
+
+        modules_by_course = {}
+        for module in sorted(modules, key=_sort_key):
+            modules_by_course.setdefault(module['course_id'], []).append(module)
+
+        self.course_trees = {}
+        for course in courses:
+            tree = dict(course)
+            tree['modules'] = []
+            for module in modules_by_course.get(course['id'], []):
+                module_tree = dict(module)
+                module_tree['lessons'] = [dict(lesson) for lesson in lessons_by_module.get(module['id'], [])]
+                tree['modules'].append(module_tree)
+            self.course_trees[course['id']] = tree
+
+        self.lesson_count_by_course = {
+            course_id: sum(len(module['lessons']) for module in tree['modules'])
+            for course_id, tree in self.course_trees.items()
+        }
+
+
+def get_catalog_version(conn):
+    row = conn.execute('SELECT version FROM catalog_version WHERE id = 1').fetchone()
+    return row[0] if row else 0
+
+
+def load_catalog(conn):
+    version = get_catalog_version(conn)
+    courses = [dict(row) for row in conn.execute('SELECT * FROM courses').fetchall()]
+    modules = [dict(row) for row in conn.execute('SELECT * FROM modules').fetchall()]
+    lessons = [dict(row) for row in conn.execute('SELECT * FROM lessons').fetchall()]
+    exercises = [dict(row) for row in conn.execute('SELECT * FROM exercises').fetchall()]
+    return Catalog(version, courses, modules, lessons, exercises)
+
+
+class CatalogCache:
+    """Держит текущий снимок; версия в БД проверяется не чаще раза в check_interval секунд."""
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.rebuilds = 0
+        self._catalog = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, conn):
+        catalog = self._catalog
+        now = time.monotonic()
+        if catalog is not None and now - self._checked_at < self.check_interval:
+            return catalog
+
+        version = get_catalog_version(conn)
+        if catalog is not None and catalog.version == version:
+            self._checked_at = now
+            return catalog
+
+        with self._lock:
+            catalog = self._catalog
+            if catalog is None or catalog.version != version:
+                catalog = load_catalog(conn)
+                # Присваивание ссылки атомарно: читатели видят либо старый, либо новый снимок
+                self._catalog = catalog
+                self.rebuilds += 1
+            self._checked_at = time.monotonic()
+        return catalog
+
+    def invalidate(self):
+        # Не 0.0: monotonic() отсчитывается от произвольной точки и может быть меньше check_interval
+        self._checked_at = float('-inf')
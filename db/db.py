@@ -1,19 +1,116 @@
 import sqlite3
 import os
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 import json
+import time
+from flask import g, has_app_context
+from db.pool import ConnectionPool, SharedConnection
+from db.migrations import migrate
+from db.catalog import CatalogCache
+from db.progress import apply_progress_delta, rebuild_progress_counters
+from db.autosave import AutosaveBuffer
+from db.sessions import SessionStore, ServerSessionInterface, UserContextCache
+from db.passwords import PasswordHasher, PasswordHasherBusy
+from db.bundle import BundleError, load_bundle, import_bundle, export_bundle, iter_exercises
+from db.leaderboard import (LeaderboardCache, GLOBAL_BOARD, course_board, week_board,
+                            apply_leaderboard_delta, rebuild_leaderboard, mark_leaderboard_reset)
+from db.search import search, rebuild_search_index
+from db.analytics import (apply_analytics_delta, rebuild_analytics, get_lesson_stats, get_attempt_medians,
+                          get_hardest_lessons, get_daily_stats)
+from db.history import record_submission, list_submissions, get_submission, get_history_stats
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'app.db')
+DATABASE_PATH = os.environ.get('DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'app.db')
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+_pool = ConnectionPool(lambda: DATABASE_PATH, max_size=int(os.environ.get('DB_POOL_SIZE', 8)))
+_autosave = AutosaveBuffer(lambda: _pool.acquire(),
+                           flush_interval=float(os.environ.get('AUTOSAVE_FLUSH_INTERVAL', 2.0)),
+                           max_pending=int(os.environ.get('AUTOSAVE_MAX_PENDING', 200)))
+_catalog_cache = CatalogCache(check_interval=float(os.environ.get('CATALOG_CHECK_INTERVAL', 1.0)))
+_hasher = PasswordHasher(method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+                         workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+                         max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16)))
+_session_store = SessionStore(lambda: _pool.acquire())
+_leaderboards = LeaderboardCache(max_boards=int(os.environ.get('LEADERBOARD_CACHE_BOARDS', 64)))
+_user_contexts = UserContextCache(max_entries=int(os.environ.get('USER_CONTEXT_CACHE_SIZE', 1000)),
+                                  ttl=float(os.environ.get('USER_CONTEXT_TTL', 60)))
 
-def create_user(username, email, password):
-    conn = get_db_connection()
-    password_hash = generate_password_hash(password)
+def get_db_connection(conn=None):
+    # Переданное соединение используется как есть и не закрывается вызываемой функцией
+    if conn is not None:
+        return SharedConnection(conn)
+    # Внутри запроса Flask все функции работают через одно соединение
+    if has_app_context():
+        if 'db_conn' not in g:
+            g.db_conn = _pool.acquire()
+        return SharedConnection(g.db_conn)
+    return _pool.acquire()
+
+def release_request_connection(exception=None):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.close()
+
+def run_migrations(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+def init_db_app(app):
+    run_migrations()
+    app.teardown_appcontext(release_request_connection)
+    app.session_interface = ServerSessionInterface(_session_store)
+    _hasher.start()
+
+def revoke_user_sessions(user_id):
+    """Завершает все сессии пользователя, возвращает их число"""
+    _user_contexts.invalidate(user_id)
+    return _session_store.revoke_user(user_id)
+
+def purge_expired_sessions():
+    return _session_store.purge_expired()
+
+def get_user_context(user_id, conn=None):
+    """Профиль и сводка прогресса пользователя, кэшируются в памяти процесса"""
+    catalog = get_catalog(conn)
+    return _user_contexts.get(user_id, catalog.version, lambda: get_user_profile(user_id, conn))
+
+def invalidate_user_context(user_id=None):
+    _user_contexts.invalidate(user_id)
+
+def get_user_context_stats():
+    return _user_contexts.stats()
+
+def get_password_hasher_stats():
+    return _hasher.stats()
+
+def get_pool_stats():
+    return _pool.stats()
+
+def add_connection_hook(hook):
+    """hook(conn) вызывается для каждого нового соединения пула"""
+    _pool.connect_hooks.append(hook)
+
+def add_statement_hook(hook):
+    """hook(sql, elapsed) вызывается после каждого execute/executemany"""
+    _pool.statement_hooks.append(hook)
+
+def get_autosave_stats():
+    return _autosave.stats()
+
+def get_catalog_stats():
+    catalog = _catalog_cache._catalog
+    return {
+        'version': catalog.version if catalog else 0,
+        'rebuilds': _catalog_cache.rebuilds,
+        'lessons': len(catalog.lessons_by_id) if catalog else 0,
+    }
+
+def create_user(username, email, password, conn=None):
+    # Хэш считается до получения соединения: пока ждём пул процессов, соединение не занято
+    password_hash = _hasher.hash(password)
+    conn = get_db_connection(conn)
     
     try:
         cursor = conn.execute('''
@@ -28,73 +125,112 @@ def create_user(username, email, password):
     finally:
         conn.close()
 
-def get_user_by_username(username):
-    conn = get_db_connection()
+def get_user_by_username(username, conn=None):
+    conn = get_db_connection(conn)
     user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
     conn.close()
     return user
 
-def get_user_by_email(email):
-    conn = get_db_connection()
+def get_user_by_email(email, conn=None):
+    conn = get_db_connection(conn)
     user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
     conn.close()
     return user
 
-def verify_password(user_row, password):
-    return check_password_hash(user_row['password_hash'], password)
+def verify_password(user_row, password, conn=None):
+    if conn is None and has_app_context():
+        # Соединение запроса возвращается в пул на время хэширования
+        release_request_connection()
+    if not _hasher.verify(user_row['password_hash'], password):
+        return False
+    # Параметры хэширования поменялись: пересчитываем хэш, пока известен пароль
+    if _hasher.needs_rehash(user_row['password_hash']):
+        password_hash = _hasher.hash(password)
+        conn = get_db_connection(conn)
+        conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_row['id']))
+        conn.commit()
+        conn.close()
+    return True
 
-def get_all_courses():
-    conn = get_db_connection()
-    
+def get_catalog(conn=None):
+    conn = get_db_connection(conn)
     try:
-        courses = conn.execute('''
-            SELECT * FROM courses 
-            WHERE is_active = TRUE 
-            ORDER BY order_index
-        ''').fetchall()
-        
-        print(f"[DB] get_all_courses() вернула {len(courses)} курсов")
-        return courses
+        return _catalog_cache.get(conn)
+    finally:
+        conn.close()
+
+def get_page_versions(user_id, conn=None):
+    """Версии каталога и прогресса пользователя из БД, а не из кэшей процесса:
+    {'catalog_version', 'catalog_updated_at', 'progress_version', 'progress_updated_at'}"""
+    conn = get_db_connection(conn)
+    try:
+        row = conn.execute('''
+            SELECT c.version AS catalog_version, c.updated_at AS catalog_updated_at,
+                   COALESCE(s.version, 0) AS progress_version, s.updated_at AS progress_updated_at
+            FROM catalog_version c
+            LEFT JOIN user_progress_summary s ON s.user_id = ?
+            WHERE c.id = 1
+        ''', (user_id,)).fetchone()
+        return dict(row)
+    finally:
+        conn.close()
+
+def invalidate_catalog():
+    _catalog_cache.invalidate()
+
+def get_all_courses(conn=None):
+    try:
+        return get_catalog(conn).active_courses
         
     except Exception as e:
         print(f"[DB ERROR] Ошибка в get_all_courses(): {e}")
         return []
-    finally:
-        conn.close()
 
-def get_course_with_content(course_id):
-    conn = get_db_connection()
-    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
-    if not course:
-        conn.close()
+def get_course_with_content(course_id, conn=None):
+    return get_catalog(conn).course_trees.get(course_id)
+
+def get_lesson(lesson_id, conn=None):
+    return get_catalog(conn).lessons_by_id.get(lesson_id)
+
+def get_lesson_context(lesson_id, conn=None):
+    """Урок вместе с модулем, курсом, упражнением и соседними уроками"""
+    catalog = get_catalog(conn)
+    lesson = catalog.lessons_by_id.get(lesson_id)
+    if not lesson:
         return None
-    modules = conn.execute('''
-        SELECT * FROM modules 
-        WHERE course_id = ? 
-        ORDER BY order_index
-    ''', (course_id,)).fetchall()
-    result_course = dict(course)
-    result_course['modules'] = []
-    for module in modules:
-        module_dict = dict(module)
-        lessons = conn.execute('''
-            SELECT * FROM lessons 
-            WHERE module_id = ? 
-            ORDER BY order_index
-        ''', (module['id'],)).fetchall()
-        module_dict['lessons'] = [dict(lesson) for lesson in lessons]
-        result_course['modules'].append(module_dict)
-    conn.close()
-    return result_course
+    module = catalog.modules_by_id.get(lesson['module_id'])
+    return {
+        'lesson': lesson,
+        'module': module,
+        'course': catalog.courses_by_id.get(module['course_id']) if module else None,
+        'exercise': catalog.exercises_by_lesson.get(lesson_id),
+        'next_lesson': catalog.next_lesson.get(lesson_id),
+        'prev_lesson': catalog.prev_lesson.get(lesson_id),
+    }
+
+def save_code_draft(user_id, lesson_id, code):
+    _autosave.save(user_id, lesson_id, code)
 
-def get_lesson(lesson_id):
-    conn = get_db_connection()
-    lesson = conn.execute('SELECT * FROM lessons WHERE id = ?', (lesson_id,)).fetchone()
+def get_code_draft(user_id, lesson_id, conn=None):
+    # Буфер только этого процесса: код в БД мог сохранить позже другой процесс
+    pending = _autosave.get(user_id, lesson_id)
+    conn = get_db_connection(conn)
+    progress = conn.execute('''
+        SELECT code_submission, code_saved_at FROM user_progress 
+        WHERE user_id = ? AND lesson_id = ?
+    ''', (user_id, lesson_id)).fetchone()
     conn.close()
-    return lesson
+    if pending and (not progress or progress['code_saved_at'] is None or pending[1] > progress['code_saved_at']):
+        return pending[0]
+    return progress['code_submission'] if progress else None
+
+def flush_code_drafts():
+    return _autosave.flush()
 
-def update_user_progress(user_id, lesson_id, code_submission=None, completed=True):
-    conn = get_db_connection()
+def update_user_progress(user_id, lesson_id, code_submission=None, completed=True, conn=None):
+    # Черновик старше кода, который сохраняется сейчас
+    _autosave.discard(user_id, lesson_id)
+    conn = get_db_connection(conn)
     existing = conn.execute('''
         SELECT * FROM user_progress 
         WHERE user_id = ? AND lesson_id = ?
@@ -105,14 +241,24 @@ def update_user_progress(user_id, lesson_id, code_submission=None, completed=Tru
             SET completed = ?, 
                 completed_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE completed_at END,
                 code_submission = ?, 
+                code_saved_at = ?,
                 attempts = attempts + 1
             WHERE user_id = ? AND lesson_id = ?
-        ''', (completed, completed, code_submission, user_id, lesson_id))
+        ''', (completed, completed, code_submission, time.time(), user_id, lesson_id))
     else:
         conn.execute('''
-            INSERT INTO user_progress (user_id, lesson_id, completed, completed_at, code_submission, attempts)
-            VALUES (?, ?, ?, ?, ?, 1)
-        ''', (user_id, lesson_id, completed, datetime.now() if completed else None, code_submission))
+            INSERT INTO user_progress (user_id, lesson_id, completed, completed_at, code_submission, code_saved_at,
+                                       attempts)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+        ''', (user_id, lesson_id, completed, datetime.now() if completed else None, code_submission, time.time()))
+    was_completed = bool(existing and existing['completed'])
+    completed_delta = int(bool(completed)) - int(was_completed)
+    score_delta = (existing['score'] or 0) * completed_delta if existing else 0
+    course_id = get_lesson_course_id(lesson_id, conn)
+    apply_progress_delta(conn, user_id, course_id, completed_delta, score_delta)
+    old_attempts = (existing['attempts'] or 0) if existing else 0
+    apply_analytics_delta(conn, user_id, lesson_id, old_attempts, old_attempts + 1, completed_delta)
+    leaderboard_changes = None
     if completed:
         conn.execute('''
             UPDATE users 
@@ -120,13 +266,99 @@ def update_user_progress(user_id, lesson_id, code_submission=None, completed=Tru
                 last_activity_date = DATE('now')
             WHERE id = ?
         ''', (user_id,))
+        leaderboard_changes = apply_leaderboard_delta(conn, user_id, course_id, 10)
     
     conn.commit()
     conn.close()
+    if leaderboard_changes:
+        _leaderboards.applied(*leaderboard_changes)
+    _user_contexts.invalidate(user_id)
     return True
 
-def get_user_progress(user_id, course_id=None):
-    conn = get_db_connection()
+def record_check_attempt(user_id, lesson_id, code, passed, passed_count, total_count, conn=None):
+    """Проверка решения тестами: попытка в user_progress, статистике преподавателя и истории решений.
+
+    Урок при этом не завершается (это делает update_user_progress), поэтому completed_delta = 0
+    даже для прошедшей проверки. Черновик в code_submission не трогаем.
+    """
+    conn = get_db_connection(conn)
+    try:
+        attempts = conn.execute('''
+            INSERT INTO user_progress (user_id, lesson_id, completed, attempts) VALUES (?, ?, 0, 1)
+            ON CONFLICT (user_id, lesson_id) DO UPDATE SET attempts = COALESCE(attempts, 0) + 1
+            RETURNING attempts
+        ''', (user_id, lesson_id)).fetchone()[0]
+        apply_analytics_delta(conn, user_id, lesson_id, attempts - 1, attempts, 0)
+        attempt = record_submission(conn, user_id, lesson_id, code, 'passed' if passed else 'failed',
+                                    passed_count, total_count)
+        conn.commit()
+        return attempt
+    finally:
+        conn.close()
+
+def get_lesson_course_id(lesson_id, conn=None):
+    catalog = get_catalog(conn)
+    lesson = catalog.lessons_by_id.get(lesson_id)
+    module = catalog.modules_by_id.get(lesson['module_id']) if lesson else None
+    return module['course_id'] if module else None
+
+def rebuild_user_progress_counters(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        rebuild_progress_counters(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def rebuild_leaderboards(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        rebuild_leaderboard(conn)
+        mark_leaderboard_reset(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    _leaderboards.invalidate()
+
+def resolve_leaderboard(kind, course_id=None):
+    """Имя доски: kind — 'global', 'week' или 'course' (с course_id)"""
+    if kind == 'week':
+        return week_board()
+    if kind == 'course' and course_id is not None:
+        return course_board(course_id)
+    return GLOBAL_BOARD
+
+def get_leaderboard(board, user_id=None, limit=50, conn=None):
+    """Топ доски и место пользователя:
+    {'top': [{'user_id', 'username', 'level', 'score', 'rank'}], 'me': {'rank', 'score'} или None, 'total'}"""
+    conn = get_db_connection(conn)
+    try:
+        index = _leaderboards.get(conn, board)
+        top = index.top(limit)
+        me = None
+        if user_id is not None and index.rank(user_id) is not None:
+            me = {'rank': index.rank(user_id), 'score': index.score(user_id)}
+        users = {}
+        if top:
+            placeholders = ','.join('?' * len(top))
+            users = {row['id']: row for row in conn.execute(f'''
+                SELECT id, username, level FROM users WHERE id IN ({placeholders})
+            ''', [entry[0] for entry in top]).fetchall()}
+    finally:
+        conn.close()
+    return {
+        'top': [{'user_id': uid, 'username': users[uid]['username'], 'level': users[uid]['level'],
+                 'score': score, 'rank': rank}
+                for uid, score, rank in top if uid in users],
+        'me': me,
+        'total': len(index),
+    }
+
+def get_leaderboard_stats():
+    return _leaderboards.stats()
+
+def get_user_progress(user_id, course_id=None, conn=None):
+    conn = get_db_connection(conn)
     if course_id:
         progress = conn.execute('''
             SELECT l.id, l.title, l.module_id, l.order_index,
@@ -151,44 +383,188 @@ def get_user_progress(user_id, course_id=None):
     conn.close()
     return result
 
-def get_user_profile(user_id):
-    conn = get_db_connection()
+def get_user_profile(user_id, conn=None):
+    conn = get_db_connection(conn)
     user = conn.execute('''
-        SELECT id, username, email, created_at, experience, level, streak_days
+        SELECT id, username, email, created_at, experience, level, streak_days, is_teacher
         FROM users WHERE id = ?
     ''', (user_id,)).fetchone()   
     if not user:
         conn.close()
         return None
     profile_data = dict(user)
-    progress_stats = get_user_progress(user_id)
-    profile_data['progress_stats'] = progress_stats
+    summary = get_user_progress_summary(user_id, conn=conn)
+    profile_data['progress_summary'] = summary
+    profile_data['progress_stats'] = {
+        'total_lessons': summary['total_lessons'],
+        'completed_lessons': summary['completed_lessons']
+    }
     conn.close()
     return profile_data
 
-def get_exercise_for_lesson(lesson_id):
-    conn = get_db_connection()
-    exercise = conn.execute('''
-        SELECT * FROM exercises 
-        WHERE lesson_id = ?
-    ''', (lesson_id,)).fetchone()
-    if not exercise:
+def search_catalog(text, limit=20, conn=None):
+    """Уроки активных курсов по релевантности, по одному результату на урок:
+    [{'lesson_id', 'kind', 'title', 'module_title', 'course_id', 'course_title', 'snippet'}]"""
+    conn = get_db_connection(conn)
+    try:
+        # Урок и его упражнение могут найтись оба, поэтому берём с запасом
+        matches = search(conn, text, limit * 2)
+        catalog = get_catalog(conn)
+    finally:
         conn.close()
-        return None
-    test_cases = []
-    if exercise['test_cases']:
-        try:
-            test_cases = json.loads(exercise['test_cases'])
-        except:
-            test_cases = []
-    result = dict(exercise)
-    result['test_cases'] = test_cases
-    result['parsed_test_cases'] = test_cases
+    results = []
+    seen = set()
+    for lesson_id, kind, snippet in matches:
+        lesson = catalog.lessons_by_id.get(lesson_id)
+        module = catalog.modules_by_id.get(lesson['module_id']) if lesson else None
+        course = catalog.courses_by_id.get(module['course_id']) if module else None
+        if not course or not course['is_active'] or lesson_id in seen:
+            continue
+        seen.add(lesson_id)
+        results.append({
+            'lesson_id': lesson_id,
+            'kind': kind,
+            'title': lesson['title'],
+            'module_title': module['title'],
+            'course_id': course['id'],
+            'course_title': course['title'],
+            'snippet': snippet,
+        })
+        if len(results) >= limit:
+            break
+    return results
+
+def rebuild_search(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        rebuild_search_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def set_teacher(user_id, is_teacher=True, conn=None):
+    conn = get_db_connection(conn)
+    conn.execute('UPDATE users SET is_teacher = ? WHERE id = ?', (int(is_teacher), user_id))
+    conn.commit()
     conn.close()
+    _user_contexts.invalidate(user_id)
+
+def rebuild_teacher_analytics(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        rebuild_analytics(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_course_funnel(course_id, conn=None):
+    """Воронка курса по сводным таблицам: модули → уроки со started/completed и медианой попыток"""
+    catalog = get_catalog(conn)
+    tree = catalog.course_trees.get(course_id)
+    if not tree:
+        return None
+    lesson_ids = [lesson['id'] for module in tree['modules'] for lesson in module['lessons']]
+    conn = get_db_connection(conn)
+    try:
+        stats = get_lesson_stats(conn, lesson_ids)
+        medians = get_attempt_medians(conn, lesson_ids)
+    finally:
+        conn.close()
+    
+    # Доля считается от числа начавших первый урок курса
+    first = stats.get(lesson_ids[0], {}) if lesson_ids else {}
+    entered = first.get('started_users', 0)
+    modules = []
+    for module in tree['modules']:
+        lessons = []
+        for lesson in module['lessons']:
+            row = stats.get(lesson['id'], {})
+            completed = row.get('completed_users', 0)
+            lessons.append({
+                'id': lesson['id'],
+                'title': lesson['title'],
+                'started_users': row.get('started_users', 0),
+                'completed_users': completed,
+                'median_attempts': medians.get(lesson['id']),
+                'retention_percent': round(completed / entered * 100, 1) if entered else 0,
+            })
+        modules.append({
+            'id': module['id'],
+            'title': module['title'],
+            'lessons': lessons,
+            # Дошли до конца модуля — прошли его последний урок
+            'finished_users': lessons[-1]['completed_users'] if lessons else 0,
+        })
+    return {'course': {'id': tree['id'], 'title': tree['title']}, 'entered_users': entered, 'modules': modules}
+
+def get_hardest_exercises(limit=10, min_users=5, conn=None):
+    catalog = get_catalog(conn)
+    conn = get_db_connection(conn)
+    try:
+        # Берём с запасом: в рейтинг попадают только уроки с упражнением из активных курсов
+        candidates = get_hardest_lessons(conn, limit * 3, min_users)
+        candidates = [row for row in candidates if row['lesson_id'] in catalog.exercises_by_lesson][:limit]
+        medians = get_attempt_medians(conn, [row['lesson_id'] for row in candidates])
+    finally:
+        conn.close()
+    result = []
+    for row in candidates:
+        lesson = catalog.lessons_by_id.get(row['lesson_id'])
+        module = catalog.modules_by_id.get(lesson['module_id']) if lesson else None
+        course = catalog.courses_by_id.get(module['course_id']) if module else None
+        if not course or not course['is_active']:
+            continue
+        result.append(dict(row,
+                           title=lesson['title'],
+                           course_title=course['title'],
+                           median_attempts=medians.get(row['lesson_id']),
+                           completion_percent=round(row['completed_users'] / row['started_users'] * 100, 1)))
     return result
 
-def create_exercise(lesson_id, question, starter_code, solution_code, test_cases):
-    conn = get_db_connection()
+def get_activity(days=30, conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return get_daily_stats(conn, days)
+    finally:
+        conn.close()
+
+def save_submission(user_id, lesson_id, code, status, passed_count=None, total_count=None, conn=None):
+    """Добавляет попытку в историю решений, возвращает её номер"""
+    conn = get_db_connection(conn)
+    try:
+        attempt = record_submission(conn, user_id, lesson_id, code, status, passed_count, total_count)
+        conn.commit()
+        return attempt
+    finally:
+        conn.close()
+
+def get_submission_history(user_id, lesson_id, before=None, limit=20, conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return list_submissions(conn, user_id, lesson_id, before, limit)
+    finally:
+        conn.close()
+
+def get_submission_code(user_id, lesson_id, attempt, conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return get_submission(conn, user_id, lesson_id, attempt)
+    finally:
+        conn.close()
+
+def get_submission_storage_stats(conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return get_history_stats(conn)
+    finally:
+        conn.close()
+
+def get_exercise_for_lesson(lesson_id, conn=None):
+    exercise = get_catalog(conn).exercises_by_lesson.get(lesson_id)
+    return dict(exercise) if exercise else None
+
+def create_exercise(lesson_id, question, starter_code, solution_code, test_cases, conn=None):
+    conn = get_db_connection(conn)
     test_cases_json = json.dumps(test_cases, ensure_ascii=False)
     cursor = conn.execute('''
         INSERT INTO exercises (lesson_id, question, starter_code, solution_code, test_cases)
@@ -197,40 +573,89 @@ def create_exercise(lesson_id, question, starter_code, solution_code, test_cases
     exercise_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    invalidate_catalog()
     return exercise_id
 
-def get_user_progress_summary(user_id):
-    conn = get_db_connection()
+def import_course_bundle(bundle, conn=None):
+    """Курс из пакета (см. db/bundle.py) одной транзакцией: {'course_id', 'modules', 'lessons', 'exercises'}"""
+    conn = get_db_connection(conn)
+    try:
+        result = import_bundle(conn, bundle)
+    finally:
+        conn.close()
+    invalidate_catalog()
+    return result
+
+def export_course_bundle(course_id, path, conn=None):
+    conn = get_db_connection(conn)
+    try:
+        return export_bundle(conn, course_id, path)
+    finally:
+        conn.close()
+
+def get_user_progress_summary(user_id, conn=None):
+    conn = get_db_connection(conn)
     try:
         stats = conn.execute('''
-            SELECT 
-                COUNT(DISTINCT l.id) as total_lessons,
-                COUNT(DISTINCT up.lesson_id) as completed_lessons,
-                COALESCE(SUM(up.score), 0) as total_score,
-                u.experience,
-                u.level
-            FROM lessons l
-            CROSS JOIN users u
-            LEFT JOIN user_progress up ON l.id = up.lesson_id AND up.user_id = u.id AND up.completed = TRUE
+            SELECT u.experience, u.level,
+                   COALESCE(s.completed_lessons, 0) as completed_lessons,
+                   COALESCE(s.total_score, 0) as total_score,
+                   COALESCE(s.version, 0) as version, s.updated_at
+            FROM users u
+            LEFT JOIN user_progress_summary s ON s.user_id = u.id
             WHERE u.id = ?
-            GROUP BY u.id
         ''', (user_id,)).fetchone()
         
         if stats:
-            progress_percent = (stats['completed_lessons'] / stats['total_lessons'] * 100) if stats['total_lessons'] > 0 else 0
+            total_lessons = len(get_catalog(conn).lessons_by_id)
+            progress_percent = (stats['completed_lessons'] / total_lessons * 100) if total_lessons > 0 else 0
             return {
-                'total_lessons': stats['total_lessons'],
+                'total_lessons': total_lessons,
                 'completed_lessons': stats['completed_lessons'],
                 'progress_percent': round(progress_percent, 1),
                 'total_score': stats['total_score'],
                 'experience': stats['experience'],
-                'level': stats['level']
+                'level': stats['level'],
+                'version': stats['version'],
+                'updated_at': stats['updated_at']
             }
         
         return None
         
-    except Exception:
-        print(f"[ERROR] Ошибка при получении статистики: {Exception}")
+    except Exception as e:
+        print(f"[ERROR] Ошибка при получении статистики: {e}")
         return None
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+def get_user_course_summaries(user_id, course_ids=None, conn=None):
+    """Прогресс пользователя по курсам из счётчиков: {course_id: {...}}"""
+    conn = get_db_connection(conn)
+    rows = conn.execute('''
+        SELECT course_id, completed_lessons, total_score
+        FROM user_course_progress
+        WHERE user_id = ?
+    ''', (user_id,)).fetchall()
+    catalog = get_catalog(conn)
+    conn.close()
+    completed = {row['course_id']: row for row in rows}
+    if course_ids is None:
+        course_ids = [course_id for course_id in completed if course_id in catalog.course_trees]
+    
+    result = {}
+    for course_id in course_ids:
+        tree = catalog.course_trees.get(course_id)
+        total_lessons = catalog.lesson_count_by_course.get(course_id, 0)
+        row = completed.get(course_id)
+        completed_lessons = row['completed_lessons'] if row else 0
+        progress_percent = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+        result[course_id] = {
+            'id': course_id,
+            'title': tree['title'] if tree else '',
+            'total_lessons': total_lessons,
+            'completed_lessons': completed_lessons,
+            'total_score': row['total_score'] if row else 0,
+            'progress_percent': round(progress_percent, 1),
+            'started': row is not None
+        }
+    return result
@@ -0,0 +1,156 @@
+"""История отправленных решений: только добавление, код хранится один раз.
+
+    code_blobs  — уникальные тексты решений: ключ — 16 байт SHA-256 текста,
+                  сам текст сжат zlib с общим словарём (короткий код без словаря почти не сжимается);
+    submissions — попытки (user_id, lesson_id, attempt) → blob_id, время и результат проверки,
+                  WITHOUT ROWID: строка живёт прямо в B-дереве первичного ключа, отдельного индекса нет.
+
+Одинаковый код (исходный шаблон урока, эталонное решение, повторная отправка без правок)
+занимает в code_blobs одну строку, сколько бы раз его ни отправляли.
+Сравнение с хранением кода текстом в каждой строке — bench/history.py.
+"""
+import hashlib
+import time
+import zlib
+
+HASH_SIZE = 16
+
+# Кодеки code_blobs.codec. Словарь ZDICT_V1 менять нельзя: им сжаты уже сохранённые решения,
+# новый словарь — новый кодек
+CODEC_RAW = 0
+CODEC_ZLIB_V1 = 1
+
+# zlib ищет совпадения в последних байтах словаря, поэтому самое частое — в конце
+ZDICT_V1 = (
+    'import math\nimport random\nfrom collections import Counter, defaultdict\n'
+    'class __init__(self, self.\nwhile True:\n    break\n    continue\ntry:\nexcept ValueError:\n'
+    'elif else:\nreturn None\nTrue False and or not in is \nlen(str(list(dict(set(sorted(sum(max(min(abs(round('
+    'enumerate(zip(map(float(.append(.split()\n.strip()\n.join(.format(f"{}"\n'
+    'def main():\nif __name__ == "__main__":\n    main()\n'
+    'result = []\nn = int(input())\nfor i in range(n):\n    if \n        print(\n'
+    'def solve(\n    return \nprint(input())\nprint(\n'
+).encode('utf-8')
+
+STATUSES = ('completed', 'passed', 'failed')
+
+
+def code_hash(code):
+    return hashlib.sha256(code.encode('utf-8')).digest()[:HASH_SIZE]
+
+
+def encode_code(code):
+    """(кодек, данные): сжатый вариант, только если он короче исходного текста"""
+    raw = code.encode('utf-8')
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=ZDICT_V1)
+    packed = compressor.compress(raw) + compressor.flush()
+    if len(packed) < len(raw):
+        return CODEC_ZLIB_V1, packed
+    return CODEC_RAW, raw
+
+
+def decode_code(codec, data):
+    if codec == CODEC_ZLIB_V1:
+        decompressor = zlib.decompressobj(-15, zdict=ZDICT_V1)
+        data = decompressor.decompress(data) + decompressor.flush()
+    elif codec != CODEC_RAW:
+        raise ValueError(f'неизвестный кодек {codec}')
+    return bytes(data).decode('utf-8')
+
+
+def store_code(conn, code):
+    """id строки code_blobs с этим текстом; сжимает и добавляет, только если такого ещё нет"""
+    digest = code_hash(code)
+    row = conn.execute('SELECT id FROM code_blobs WHERE hash = ?', (digest,)).fetchone()
+    if row:
+        return row[0]
+    codec, data = encode_code(code)
+    # Тот же код мог только что сохранить другой запрос: тогда берём его строку
+    conn.execute('''
+        INSERT OR IGNORE INTO code_blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)
+    ''', (digest, codec, len(code.encode('utf-8')), data))
+    return conn.execute('SELECT id FROM code_blobs WHERE hash = ?', (digest,)).fetchone()[0]
+
+
+def record_submission(conn, user_id, lesson_id, code, status, passed_count=None, total_count=None,
+                      created_at=None):
+    """Добавляет попытку, возвращает её номер. Вызывающий код фиксирует транзакцию.
+
+    status — одно из STATUSES: 'completed' (урок завершён), 'passed'/'failed' (проверка тестами).
+    """
+    blob_id = store_code(conn, code)
+    # Номер попытки вычисляется в том же INSERT: две одновременные отправки не получат один номер
+    return conn.execute('''
+        INSERT INTO submissions (user_id, lesson_id, attempt, blob_id, created_at, status, passed_count, total_count)
+        SELECT ?, ?, COALESCE(MAX(attempt), 0) + 1, ?, ?, ?, ?, ?
+        FROM submissions WHERE user_id = ? AND lesson_id = ?
+        RETURNING attempt
+    ''', (user_id, lesson_id, blob_id, int(created_at if created_at is not None else time.time()),
+          STATUSES.index(status), passed_count, total_count, user_id, lesson_id)).fetchone()[0]
+
+
+def import_progress_history(conn):
+    """Первая попытка в истории для каждого пройденного урока с кодом в user_progress.
+
+    У непройденных уроков там черновик автосохранения, а не отправленное решение.
+    """
+    rows = conn.execute('''
+        SELECT user_id, lesson_id, code_submission,
+               CAST(STRFTIME('%s', COALESCE(completed_at, 'now')) AS INTEGER) AS created_at
+        FROM user_progress
+        WHERE completed AND code_submission IS NOT NULL AND code_submission != ''
+          AND NOT EXISTS (SELECT 1 FROM submissions s
+                          WHERE s.user_id = user_progress.user_id AND s.lesson_id = user_progress.lesson_id)
+    ''').fetchall()
+    for row in rows:
+        record_submission(conn, row['user_id'], row['lesson_id'], row['code_submission'], 'completed',
+                          created_at=row['created_at'])
+
+
+def _submission(row):
+    return {
+        'attempt': row['attempt'],
+        'created_at': row['created_at'],
+        'status': STATUSES[row['status']],
+        'passed_count': row['passed_count'],
+        'total_count': row['total_count'],
+        'size': row['size'],
+    }
+
+
+def list_submissions(conn, user_id, lesson_id, before=None, limit=20):
+    """Попытки от новых к старым, без кода; before — номер попытки, с которой продолжать (не включая)"""
+    rows = conn.execute('''
+        SELECT s.attempt, s.created_at, s.status, s.passed_count, s.total_count, b.size
+        FROM submissions s
+        JOIN code_blobs b ON b.id = s.blob_id
+        WHERE s.user_id = ? AND s.lesson_id = ? AND s.attempt < ?
+        ORDER BY s.attempt DESC
+        LIMIT ?
+    ''', (user_id, lesson_id, before if before is not None else 2 ** 62, limit)).fetchall()
+    return [_submission(row) for row in rows]
+
+
+def get_submission(conn, user_id, lesson_id, attempt):
+    """Попытка вместе с кодом или None"""
+    row = conn.execute('''
+        SELECT s.attempt, s.created_at, s.status, s.passed_count, s.total_count, b.size, b.codec, b.data
+        FROM submissions s
+        JOIN code_blobs b ON b.id = s.blob_id
+        WHERE s.user_id = ? AND s.lesson_id = ? AND s.attempt = ?
+    ''', (user_id, lesson_id, attempt)).fetchone()
+    if row is None:
+        return None
+    submission = _submission(row)
+    submission['code'] = decode_code(row['codec'], row['data'])
+    return submission
+
+
+def get_history_stats(conn):
+    row = conn.execute('''
+        SELECT (SELECT COUNT(*) FROM submissions) AS submissions,
+               COUNT(*) AS blobs,
+               COALESCE(SUM(size), 0) AS code_bytes,
+               COALESCE(SUM(LENGTH(data)), 0) AS stored_bytes
+        FROM code_blobs
+    ''').fetchone()
+    return dict(row)
@@ -0,0 +1,246 @@
+"""Рейтинг пользователей: общий, по курсам и за неделю.
+
+Очки хранятся в таблице leaderboard (board, user_id, score) и меняются в той же
+транзакции, что и user_progress. Для топа и «моего места» каждый процесс держит
+в памяти отсортированный индекс доски: место находится бинарным поиском за O(log n),
+топ N — срезом. Свои изменения применяются к индексу сразу после commit, чужие —
+при следующей проверке leaderboard_version: каждая строка помнит версию, в которой
+менялась, и перечитываются только строки новее уже применённой версии. Целиком доски
+загружаются заново лишь после rebuild_leaderboard (reset_version).
+"""
+import bisect
+import collections
+import threading
+import time
+from datetime import datetime, timezone
+
+GLOBAL_BOARD = 'global'
+
+
+def course_board(course_id):
+    return f'course:{course_id}'
+
+
+def week_board(day=None):
+    """Доска недели по ISO-календарю в UTC, как DATE('now') в SQLite: 'week:2026-W42'"""
+    year, week, _ = (day or datetime.now(timezone.utc).date()).isocalendar()
+    return f'week:{year}-W{week:02d}'
+
+
+def get_leaderboard_version(conn):
+    """(версия, версия последней перестройки досок)"""
+    row = conn.execute('SELECT version, reset_version FROM leaderboard_version WHERE id = 1').fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def _add_points(conn, board, user_id, points, version):
+    return conn.execute('''
+        INSERT INTO leaderboard (board, user_id, score, updated_at, version)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?)
+        ON CONFLICT (board, user_id) DO UPDATE SET
+            score = score + excluded.score,
+            updated_at = excluded.updated_at,
+            version = excluded.version
+        RETURNING score
+    ''', (board, user_id, points, version)).fetchone()[0]
+
+
+def apply_leaderboard_delta(conn, user_id, course_id, points):
+    """Вызывается внутри транзакции, изменяющей users.experience.
+
+    Возвращает (версия, [(доска, user_id, очки)]) для LeaderboardCache.applied после commit.
+    """
+    # Версия увеличивается первой: ею помечаются изменённые строки
+    version = conn.execute('''
+        UPDATE leaderboard_version SET version = version + 1 WHERE id = 1 RETURNING version
+    ''').fetchone()[0]
+    # Общая доска повторяет users.experience, поэтому берём значение из users, а не прибавляем
+    score = conn.execute('''
+        INSERT INTO leaderboard (board, user_id, score, updated_at, version)
+        SELECT ?, id, experience, CURRENT_TIMESTAMP, ? FROM users WHERE id = ?
+        ON CONFLICT (board, user_id) DO UPDATE SET
+            score = excluded.score,
+            updated_at = excluded.updated_at,
+            version = excluded.version
+        RETURNING score
+    ''', (GLOBAL_BOARD, version, user_id)).fetchone()[0]
+    changes = [(GLOBAL_BOARD, user_id, score)]
+    boards = [week_board()]
+    if course_id is not None:
+        boards.append(course_board(course_id))
+    for board in boards:
+        changes.append((board, user_id, _add_points(conn, board, user_id, points, version)))
+    return version, changes
+
+
+def get_leaderboard_changes(conn, boards, after, until):
+    """[(доска, user_id, очки)] строк досок boards, изменённых в версиях (after, until]"""
+    placeholders = ','.join('?' * len(boards))
+    return [tuple(row) for row in conn.execute(f'''
+        SELECT board, user_id, score FROM leaderboard
+        WHERE version > ? AND version <= ? AND board IN ({placeholders})
+    ''', [after, until, *boards]).fetchall()]
+
+
+def rebuild_leaderboard(conn):
+    """Пересчитывает доски по users и счётчикам прогресса. Вызывающий код фиксирует транзакцию.
+
+    Очки за повторные решения уроков восстановить нельзя: доски курсов и текущей недели
+    получают по 10 очков за каждый пройденный урок, прошлые недели удаляются.
+    """
+    conn.execute('DELETE FROM leaderboard')
+    conn.execute('''
+        INSERT INTO leaderboard (board, user_id, score, updated_at)
+        SELECT ?, id, experience, CURRENT_TIMESTAMP FROM users WHERE experience > 0
+    ''', (GLOBAL_BOARD,))
+    conn.execute('''
+        INSERT INTO leaderboard (board, user_id, score, updated_at)
+        SELECT 'course:' || course_id, user_id, completed_lessons * 10, CURRENT_TIMESTAMP
+        FROM user_course_progress WHERE completed_lessons > 0
+    ''')
+    conn.execute('''
+        INSERT INTO leaderboard (board, user_id, score, updated_at)
+        SELECT ?, user_id, COUNT(*) * 10, CURRENT_TIMESTAMP
+        FROM user_progress
+        WHERE completed AND DATE(completed_at, 'weekday 0', '-6 days') = DATE('now', 'weekday 0', '-6 days')
+        GROUP BY user_id
+    ''', (week_board(),))
+    conn.execute('''
+        INSERT INTO leaderboard_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1
+    ''')
+
+
+def mark_leaderboard_reset(conn):
+    """После rebuild_leaderboard: строки удалены, поэтому процессы загружают доски заново,
+    а не применяют изменения по версиям. Отдельно от rebuild_leaderboard: та нужна миграции 5,
+    где колонки reset_version ещё нет."""
+    conn.execute('UPDATE leaderboard_version SET reset_version = version WHERE id = 1')
+
+
+class RankIndex:
+    """Одна доска: список (-очки, user_id) по возрастанию, т.е. от лучших к худшим.
+
+    Место и поиск — bisect за O(log n). Обновление — O(n): del и insort сдвигают хвост
+    списка. Сдвиг — один memmove указателей, для десятков тысяч участников это единицы
+    микросекунд, а обновлений на порядки меньше, чем чтений места и топа. Дерево или
+    список блоков дали бы O(log n) на запись ценой более медленных rank() и top().
+    """
+
+    def __init__(self, rows=()):
+        self._scores = {}
+        self._keys = []
+        for user_id, score in rows:
+            self._scores[user_id] = score
+            self._keys.append((-score, user_id))
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-old, user_id))]
+        self._scores[user_id] = score
+        bisect.insort(self._keys, (-score, user_id))
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def rank(self, user_id):
+        """Место пользователя (1 — лучший, при равных очках места одинаковые) или None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        # (-score,) меньше любого (-score, user_id): слева остаются только те, у кого очков больше
+        return bisect.bisect_left(self._keys, (-score,)) + 1
+
+    def top(self, limit):
+        """[(user_id, очки, место)] для первых limit участников"""
+        result = []
+        rank = 0
+        previous = None
+        for position, (negative_score, user_id) in enumerate(self._keys[:limit], start=1):
+            if negative_score != previous:
+                rank, previous = position, negative_score
+            result.append((user_id, -negative_score, rank))
+        return result
+
+
+def load_board(conn, board):
+    rows = conn.execute('SELECT user_id, score FROM leaderboard WHERE board = ?', (board,)).fetchall()
+    return RankIndex((row['user_id'], row['score']) for row in rows)
+
+
+class LeaderboardCache:
+    """Индексы досок в памяти процесса, не больше max_boards (давно не нужные вытесняются).
+
+    Версия в БД проверяется не чаще раза в check_interval секунд, как у CatalogCache.
+    """
+
+    def __init__(self, max_boards=64, check_interval=1.0):
+        self.max_boards = max_boards
+        self.check_interval = check_interval
+        self.loads = 0
+        self.updates = 0
+        self._boards = collections.OrderedDict()
+        self._version = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self, conn, board):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                version, reset_version = get_leaderboard_version(conn)
+                if self._version is None or reset_version > self._version:
+                    self._boards.clear()
+                elif version != self._version and self._boards:
+                    self._catch_up(conn, version)
+                self._version = version
+                self._checked_at = now
+            index = self._boards.get(board)
+            if index is None:
+                index = load_board(conn, board)
+                self.loads += 1
+                self._boards[board] = index
+                while len(self._boards) > self.max_boards:
+                    self._boards.popitem(last=False)
+            else:
+                self._boards.move_to_end(board)
+            return index
+
+    def _catch_up(self, conn, version):
+        # Строка, изменённая ещё раз после version, сюда не попадёт, но придёт со следующей проверкой
+        for board, user_id, score in get_leaderboard_changes(conn, list(self._boards), self._version, version):
+            self._boards[board].update(user_id, score)
+            self.updates += 1
+
+    def applied(self, version, changes):
+        """Изменения, зафиксированные этим процессом (см. apply_leaderboard_delta)."""
+        with self._lock:
+            if self._version is None or version != self._version + 1:
+                # Между ними есть чужие изменения: при следующем обращении применим их вместе с этими
+                self._checked_at = float('-inf')
+                return
+            self._version = version
+            for board, user_id, score in changes:
+                index = self._boards.get(board)
+                if index is not None:
+                    index.update(user_id, score)
+
+    def invalidate(self):
+        with self._lock:
+            self._boards.clear()
+            self._version = None
+            self._checked_at = float('-inf')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'boards': len(self._boards),
+                'entries': sum(len(index) for index in self._boards.values()),
+                'loads': self.loads,
+                'updates': self.updates,
+            }
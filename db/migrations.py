@@ -0,0 +1,235 @@
+"""Версионные миграции схемы. Текущая версия хранится в PRAGMA user_version."""
+from db.progress import rebuild_progress_counters
+from db.leaderboard import rebuild_leaderboard
+from db.search import SEARCH_INDEX_STEPS, rebuild_search_index
+from db.analytics import rebuild_analytics
+from db.history import import_progress_history
+
+CATALOG_TABLES = ('courses', 'modules', 'lessons', 'exercises')
+
+
+def _catalog_version_triggers(with_updated_at=False):
+    # Любое изменение учебного контента увеличивает общий счётчик версии каталога
+    statements = []
+    assignment = 'version = version + 1'
+    if with_updated_at:
+        assignment += ', updated_at = CURRENT_TIMESTAMP'
+    for table in CATALOG_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            name = f'trg_{table}_{event.lower()}_catalog_version'
+            if with_updated_at:
+                statements.append(f'DROP TRIGGER IF EXISTS {name}')
+            statements.append(f'''
+                CREATE TRIGGER IF NOT EXISTS {name}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_version SET {assignment} WHERE id = 1;
+                END
+            ''')
+    return statements
+
+
+# Каждая миграция — (версия, описание, шаги). Шаг — SQL-строка или функция step(conn).
+# Уже применённые миграции не меняются: новые изменения схемы добавляются в конец списка.
+MIGRATIONS = [
+    (1, 'Индексы для частых выборок', [
+        'CREATE INDEX IF NOT EXISTS idx_courses_active_order ON courses (is_active, order_index)',
+        'CREATE INDEX IF NOT EXISTS idx_modules_course_order ON modules (course_id, order_index)',
+        # Покрывающий индекс для поиска следующего/предыдущего урока в модуле
+        'CREATE INDEX IF NOT EXISTS idx_lessons_module_order ON lessons (module_id, order_index, title)',
+        'CREATE INDEX IF NOT EXISTS idx_exercises_lesson ON exercises (lesson_id)',
+        'CREATE INDEX IF NOT EXISTS idx_user_progress_user_completed_at ON user_progress (user_id, completed_at)',
+        'ANALYZE',
+    ]),
+    (2, 'Счётчик версии каталога', [
+        '''
+            CREATE TABLE IF NOT EXISTS catalog_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        'INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)',
+        *_catalog_version_triggers(),
+    ]),
+    (3, 'Счётчики прогресса пользователей', [
+        '''
+            CREATE TABLE IF NOT EXISTS user_progress_summary (
+                user_id INTEGER PRIMARY KEY,
+                completed_lessons INTEGER NOT NULL DEFAULT 0,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS user_course_progress (
+                user_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                completed_lessons INTEGER NOT NULL DEFAULT 0,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, course_id),
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE
+            )
+        ''',
+        rebuild_progress_counters,
+    ]),
+    (4, 'Серверные сессии', [
+        '''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)',
+    ]),
+    (5, 'Рейтинг пользователей', [
+        '''
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                board TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                score INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (board, user_id),
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_leaderboard_board_score ON leaderboard (board, score DESC, user_id)',
+        '''
+            CREATE TABLE IF NOT EXISTS leaderboard_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        'INSERT OR IGNORE INTO leaderboard_version (id, version) VALUES (1, 0)',
+        rebuild_leaderboard,
+    ]),
+    (6, 'Версия прогресса пользователя', [
+        'ALTER TABLE user_progress_summary ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (7, 'Полнотекстовый поиск по урокам', [
+        *SEARCH_INDEX_STEPS,
+        rebuild_search_index,
+    ]),
+    (8, 'Сводная статистика для преподавателей', [
+        'ALTER TABLE users ADD COLUMN is_teacher INTEGER NOT NULL DEFAULT 0',
+        '''
+            CREATE TABLE IF NOT EXISTS lesson_stats (
+                lesson_id INTEGER PRIMARY KEY,
+                started_users INTEGER NOT NULL DEFAULT 0,
+                completed_users INTEGER NOT NULL DEFAULT 0,
+                total_attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (lesson_id) REFERENCES lessons (id) ON DELETE CASCADE
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS lesson_attempts (
+                lesson_id INTEGER NOT NULL,
+                attempts INTEGER NOT NULL,
+                users INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (lesson_id, attempts),
+                FOREIGN KEY (lesson_id) REFERENCES lessons (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                day DATE PRIMARY KEY,
+                active_users INTEGER NOT NULL DEFAULT 0,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                completions INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS daily_active_users (
+                day DATE NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (day, user_id)
+            ) WITHOUT ROWID
+        ''',
+        rebuild_analytics,
+    ]),
+    (9, 'История отправленных решений', [
+        '''
+            CREATE TABLE IF NOT EXISTS code_blobs (
+                id INTEGER PRIMARY KEY,
+                hash BLOB NOT NULL UNIQUE,
+                codec INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS submissions (
+                user_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                attempt INTEGER NOT NULL,
+                blob_id INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                passed_count INTEGER,
+                total_count INTEGER,
+                PRIMARY KEY (user_id, lesson_id, attempt),
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                FOREIGN KEY (lesson_id) REFERENCES lessons (id) ON DELETE CASCADE,
+                FOREIGN KEY (blob_id) REFERENCES code_blobs (id)
+            ) WITHOUT ROWID
+        ''',
+        import_progress_history,
+    ]),
+    (10, 'Время изменения каталога', [
+        # Для Last-Modified: общее для всех процессов, в отличие от времени загрузки снимка
+        'ALTER TABLE catalog_version ADD COLUMN updated_at DATETIME',
+        'UPDATE catalog_version SET updated_at = CURRENT_TIMESTAMP',
+        *_catalog_version_triggers(with_updated_at=True),
+    ]),
+    (11, 'Изменения рейтинга по версиям', [
+        # Процессы догоняют чужие изменения досок, перечитывая только строки новее своей версии
+        'ALTER TABLE leaderboard ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        'CREATE INDEX IF NOT EXISTS idx_leaderboard_version ON leaderboard (version)',
+        'ALTER TABLE leaderboard_version ADD COLUMN reset_version INTEGER NOT NULL DEFAULT 0',
+        'UPDATE leaderboard_version SET reset_version = version',
+    ]),
+    (12, 'Время сохранения кода', [
+        # Сброс черновиков из буфера одного процесса не затирает решение, сохранённое другим
+        'ALTER TABLE user_progress ADD COLUMN code_saved_at REAL',
+    ]),
+]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Применяет недостающие миграции, каждую в своей транзакции. Возвращает новую версию."""
+    version = get_schema_version(conn)
+    for target, description, steps in migrations:
+        if target <= version:
+            continue
+        # BEGIN IMMEDIATE: несколько процессов, стартующих одновременно, не применят миграцию дважды
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) >= target:
+                conn.rollback()
+                version = get_schema_version(conn)
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f'PRAGMA user_version = {int(target)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DB] Применена миграция {target}: {description}")
+        version = target
+    return version
@@ -0,0 +1,112 @@
+"""Хэширование паролей в отдельном пуле процессов.
+
+generate_password_hash/check_password_hash намеренно медленные. Они выполняются
+в процессах пула, поэтому поток запроса не держит GIL, а остальные страницы
+продолжают отвечать. Число одновременных операций ограничено, лишние сразу
+получают PasswordHasherBusy.
+"""
+import concurrent.futures
+import multiprocessing
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def hash_method(password_hash):
+    """Параметры хэша: 'scrypt:32768:8:1' из 'scrypt:32768:8:1$соль$хэш'"""
+    return password_hash.split('$', 1)[0]
+
+
+class PasswordHasher:
+    """workers — число процессов (0 — считать в потоке запроса),
+    max_pending — сколько операций может выполняться и ждать одновременно,
+    timeout — сколько ждать результата.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=16, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        # 'scrypt' раскрывается werkzeug в полные параметры, поэтому берём их из настоящего хэша.
+        # Считается один раз здесь, в обход пула: иначе needs_rehash занимал бы слот и под нагрузкой
+        # вход с верным паролем мог получить PasswordHasherBusy
+        self._current_method = hash_method(_hash('', method))
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # fork, а не spawn: spawn заново импортирует главный модуль (main.py) в каждом процессе
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._executor
+
+    def start(self):
+        """Запускает процессы пула заранее.
+
+        Вызывается при старте приложения, пока в процессе ещё нет других потоков:
+        fork() из многопоточного процесса может унаследовать занятые блокировки.
+        """
+        if self.workers > 0:
+            self._get_executor().submit(int).result()
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy('Сервер перегружен, попробуйте через несколько секунд')
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            try:
+                return self._get_executor().submit(fn, *args).result(timeout=self.timeout)
+            except concurrent.futures.TimeoutError:
+                raise PasswordHasherBusy('Сервер перегружен, попробуйте через несколько секунд') from None
+            except BrokenProcessPool:
+                # Процесс пула умер: следующий запрос создаст пул заново
+                self.close()
+                raise PasswordHasherBusy('Сервер перегружен, попробуйте через несколько секунд') from None
+        finally:
+            self.completed += 1
+            self._slots.release()
+
+    def hash(self, password):
+        return self._submit(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._submit(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True, если хэш посчитан с другими параметрами, чем текущий method."""
+        return hash_method(password_hash) != self._current_method
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
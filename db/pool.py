@@ -0,0 +1,179 @@
+"""Пул соединений SQLite с общими настройками и метриками ожидания."""
+import sqlite3
+import threading
+import time
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection(sqlite3.Connection):
+    """Соединение из пула: close() возвращает его в пул, а не закрывает."""
+    pool = None
+
+    def execute(self, sql, parameters=()):
+        pool = self.pool
+        if pool is None or not pool.statement_hooks:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            pool.notify_statement(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        pool = self.pool
+        if pool is None or not pool.statement_hooks:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            pool.notify_statement(sql, time.perf_counter() - start)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def dispose(self):
+        self.pool = None
+        super().close()
+
+
+class SharedConnection:
+    """Чужое соединение, переданное в функцию: close() ничего не делает."""
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        while isinstance(conn, SharedConnection):
+            conn = conn._conn
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        pass
+
+
+def configure_connection(conn):
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, get_path, max_size=8, timeout=10):
+        self.get_path = get_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.connect_hooks = []
+        self.statement_hooks = []
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+
+        self.acquired = 0
+        self.waited = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.get_path(), check_same_thread=False, factory=PooledConnection)
+        configure_connection(conn)
+        for hook in self.connect_hooks:
+            hook(conn)
+        conn.pool = self
+        conn.in_pool = False
+        return conn
+
+    def notify_statement(self, sql, elapsed):
+        for hook in self.statement_hooks:
+            hook(sql, elapsed)
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._cond:
+            while not self._idle and self._created >= self.max_size:
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise PoolTimeout('Нет свободных соединений с базой данных')
+                self._cond.wait(remaining)
+
+            waited = time.perf_counter() - start
+            self.acquired += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+            if waited > 0.001:
+                self.waited += 1
+
+            if self._idle:
+                conn = self._idle.pop()
+                conn.in_pool = False
+                return conn
+            self._created += 1
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        if getattr(conn, 'in_pool', False):
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.dispose()
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            conn.in_pool = True
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._idle.pop().dispose()
+                self._created -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                'max_size': self.max_size,
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'wait_time_total': round(self.wait_time_total, 6),
+                'wait_time_max': round(self.wait_time_max, 6),
+                'wait_time_avg': round(self.wait_time_total / self.acquired, 6) if self.acquired else 0.0,
+            }
@@ -0,0 +1,64 @@
+"""Счётчики прогресса пользователей, которые обновляются вместе с user_progress."""
+
+
+def apply_progress_delta(conn, user_id, course_id, completed_delta=0, score_delta=0):
+    """Вызывается внутри транзакции, изменяющей user_progress.
+
+    version увеличивается при каждом изменении прогресса пользователя (см. ETag страниц).
+    """
+    conn.execute('''
+        INSERT INTO user_progress_summary (user_id, completed_lessons, total_score, updated_at, version)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP, 1)
+        ON CONFLICT (user_id) DO UPDATE SET
+            completed_lessons = completed_lessons + excluded.completed_lessons,
+            total_score = total_score + excluded.total_score,
+            updated_at = excluded.updated_at,
+            version = version + 1
+    ''', (user_id, completed_delta, score_delta))
+    if course_id is not None:
+        conn.execute('''
+            INSERT INTO user_course_progress (user_id, course_id, completed_lessons, total_score, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id, course_id) DO UPDATE SET
+                completed_lessons = completed_lessons + excluded.completed_lessons,
+                total_score = total_score + excluded.total_score,
+                updated_at = excluded.updated_at
+        ''', (user_id, course_id, completed_delta, score_delta))
+
+
+def rebuild_progress_counters(conn):
+    """Пересчитывает все счётчики по user_progress. Вызывающий код фиксирует транзакцию.
+
+    Строки user_progress_summary не удаляются, а обновляются с version + 1: иначе версии
+    начались бы заново и ETag страниц повторил бы уже выданные значения.
+    """
+    conn.execute('DELETE FROM user_course_progress')
+    conn.execute('''
+        INSERT INTO user_course_progress (user_id, course_id, completed_lessons, total_score, updated_at)
+        SELECT up.user_id, m.course_id,
+               SUM(CASE WHEN up.completed THEN 1 ELSE 0 END),
+               COALESCE(SUM(CASE WHEN up.completed THEN up.score ELSE 0 END), 0),
+               CURRENT_TIMESTAMP
+        FROM user_progress up
+        JOIN lessons l ON l.id = up.lesson_id
+        JOIN modules m ON m.id = l.module_id
+        GROUP BY up.user_id, m.course_id
+    ''')
+    conn.execute('''
+        UPDATE user_progress_summary SET completed_lessons = 0, total_score = 0, updated_at = CURRENT_TIMESTAMP
+    ''')
+    conn.execute('''
+        INSERT INTO user_progress_summary (user_id, completed_lessons, total_score, updated_at)
+        SELECT user_id, SUM(completed_lessons), SUM(total_score), CURRENT_TIMESTAMP
+        FROM user_course_progress
+        WHERE true
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            completed_lessons = excluded.completed_lessons,
+            total_score = excluded.total_score,
+            updated_at = excluded.updated_at
+    ''')
+    # Миграция 3 вызывает пересчёт до того, как миграция 6 добавит version
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(user_progress_summary)').fetchall()}
+    if 'version' in columns:
+        conn.execute('UPDATE user_progress_summary SET version = version + 1')
@@ -0,0 +1,112 @@
+"""Полнотекстовый поиск по урокам и упражнениям (SQLite FTS5).
+
+search_index повторяет lessons (title, content) и exercises (question) и
+обновляется триггерами, поэтому его не нужно помнить при правке контента.
+rowid строки индекса: id * 2 для урока и id * 2 + 1 для упражнения — так
+триггер удаляет старую строку по rowid, а не перебором индекса.
+"""
+import html
+import re
+
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+SEARCH_INDEX_STEPS = [
+    '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title, body, lesson_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_insert_search AFTER INSERT ON lessons
+        BEGIN
+            INSERT INTO search_index (rowid, title, body, lesson_id) VALUES (new.id * 2, new.title, new.content, new.id);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_update_search AFTER UPDATE OF id, title, content ON lessons
+        BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 2;
+            INSERT INTO search_index (rowid, title, body, lesson_id) VALUES (new.id * 2, new.title, new.content, new.id);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_lessons_delete_search AFTER DELETE ON lessons
+        BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 2;
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_exercises_insert_search AFTER INSERT ON exercises
+        BEGIN
+            INSERT INTO search_index (rowid, title, body, lesson_id) VALUES (new.id * 2 + 1, '', new.question, new.lesson_id);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_exercises_update_search AFTER UPDATE OF id, question, lesson_id ON exercises
+        BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+            INSERT INTO search_index (rowid, title, body, lesson_id) VALUES (new.id * 2 + 1, '', new.question, new.lesson_id);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_exercises_delete_search AFTER DELETE ON exercises
+        BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        END
+    ''',
+]
+
+
+def rebuild_search_index(conn):
+    """Заполняет индекс заново. Вызывающий код фиксирует транзакцию."""
+    conn.execute('DELETE FROM search_index')
+    conn.execute('''
+        INSERT INTO search_index (rowid, title, body, lesson_id)
+        SELECT id * 2, title, content, id FROM lessons
+    ''')
+    conn.execute('''
+        INSERT INTO search_index (rowid, title, body, lesson_id)
+        SELECT id * 2 + 1, '', question, lesson_id FROM exercises
+    ''')
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def build_match_query(text, max_terms=8):
+    """Запрос FTS5 из пользовательского ввода: все слова, каждое — как префикс.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 (AND, NEAR, *, ^) из ввода не работают.
+    Однобуквенные слова отбрасываются: такой префикс совпадает почти со всем индексом.
+    """
+    terms = [term for term in re.findall(r'\w+', text.lower()) if len(term) > 1][:max_terms]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _snippet_html(snippet):
+    # Уроки хранятся в HTML: теги из фрагмента убираем, текст экранируем, совпадения выделяем
+    text = re.sub(r'<[^>]*>', ' ', snippet)
+    text = re.sub(r'<[^>]*$', '', text)
+    text = html.escape(html.unescape(re.sub(r'\s+', ' ', text).strip()))
+    return text.replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+
+
+def search(conn, text, limit=20):
+    """[(lesson_id, тип 'lesson' или 'exercise', фрагмент HTML)] по убыванию релевантности.
+
+    Совпадение в названии урока весит в 10 раз больше, чем в тексте; фрагмент берётся из текста.
+    """
+    query = build_match_query(text)
+    if not query:
+        return []
+    rows = conn.execute(f'''
+        SELECT rowid, lesson_id,
+               snippet(search_index, 1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 12) AS snippet
+        FROM search_index
+        WHERE search_index MATCH ? AND rank MATCH 'bm25(10.0, 1.0)'
+        ORDER BY rank
+        LIMIT ?
+    ''', (query, limit)).fetchall()
+    return [(row['lesson_id'], 'exercise' if row['rowid'] % 2 else 'lesson', _snippet_html(row['snippet']))
+            for row in rows]
@@ -0,0 +1,196 @@
+"""Серверные сессии и кэш контекста пользователя.
+
+В cookie хранится только случайный идентификатор, данные сессии лежат в таблице sessions.
+Поэтому сессию можно отозвать на сервере, например при смене пароля.
+"""
+import collections
+import json
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.expires_at = expires_at
+        self.previous_sid = None
+        self.modified = False
+
+    def regenerate(self):
+        """Выдаёт новый id (вызывается при входе), старая запись удаляется при сохранении."""
+        if self.sid is not None and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class SessionStore:
+    def __init__(self, connect):
+        self.connect = connect
+
+    def load(self, sid):
+        conn = self.connect()
+        try:
+            row = conn.execute('SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?',
+                               (sid, time.time())).fetchone()
+        finally:
+            conn.close()
+        return (json.loads(row['data']), row['expires_at']) if row else (None, None)
+
+    def save(self, sid, data, expires_at):
+        conn = self.connect()
+        try:
+            conn.execute('''
+                INSERT INTO sessions (id, user_id, data, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    user_id = excluded.user_id, data = excluded.data, expires_at = excluded.expires_at
+            ''', (sid, data.get('id'), json.dumps(data, ensure_ascii=False), time.time(), expires_at))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, sid):
+        conn = self.connect()
+        try:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def revoke_user(self, user_id):
+        """Завершает все сессии пользователя. Возвращает их число."""
+        conn = self.connect()
+        try:
+            count = conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+
+    def purge_expired(self):
+        conn = self.connect()
+        try:
+            count = conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+
+
+class ServerSessionInterface(SessionInterface):
+    """Сессии Flask в SessionStore.
+
+    Срок жизни — PERMANENT_SESSION_LIFETIME; запись продлевается не чаще раза
+    в refresh_interval секунд, а не на каждом запросе.
+    """
+
+    def __init__(self, store, refresh_interval=3600, purge_every=1000):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.purge_every = purge_every
+        self._saves = 0
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data, expires_at = self.store.load(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid, expires_at=expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+            session.previous_sid = None
+
+        if not session:
+            if session.sid is not None and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        lifetime = app.permanent_session_lifetime
+        if isinstance(lifetime, timedelta):
+            lifetime = lifetime.total_seconds()
+        now = time.time()
+        refresh = session.expires_at is None or session.expires_at - now < lifetime - self.refresh_interval
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        if session.modified or refresh:
+            session.expires_at = now + lifetime
+            self.store.save(session.sid, dict(session), session.expires_at)
+            self._saves += 1
+            if self._saves % self.purge_every == 0:
+                self.store.purge_expired()
+
+        if session.new or session.modified or (session.permanent and refresh):
+            response.set_cookie(name, session.sid,
+                                expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app),
+                                domain=domain, path=path,
+                                secure=self.get_cookie_secure(app),
+                                samesite=self.get_cookie_samesite(app))
+
+
+class UserContextCache:
+    """LRU-кэш контекста пользователя (профиль и сводка прогресса) с временем жизни ttl.
+
+    Запись сбрасывается при изменении прогресса; ttl ограничивает устаревание,
+    если данные поменял другой процесс.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        context = load()
+        if context is None:
+            return None
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, version, context)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
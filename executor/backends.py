@@ -0,0 +1,121 @@
+"""Бэкенды выполнения кода с интерфейсом ExecutorPool: run(), run_with_usage(), max_output.
+
+LocalBackend выполняет код в пуле зигот этого же процесса, BrokerBackend отдаёт
+задачи отдельным воркерам через брокер (см. executor.broker, executor.worker).
+"""
+import base64
+import importlib.util
+import subprocess
+import time
+
+from executor.pool import RunResult
+
+# Байткод marshal совместим только между одинаковыми версиями интерпретатора
+BYTECODE_MAGIC = base64.b64encode(importlib.util.MAGIC_NUMBER).decode('ascii')
+
+
+class ExecutorUnavailable(Exception):
+    """Выполнить код сейчас невозможно: нет живых воркеров или все заняты."""
+
+
+class LocalBackend:
+    name = 'local'
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.max_output = pool.max_output
+        self.limits = pool.limits
+
+    def run(self, code, user_input='', timeout=5):
+        return self.pool.run(code, user_input, timeout)
+
+    def run_with_usage(self, code, user_input='', timeout=5, max_output=None, bytecode=None, limits=None):
+        return self.pool.run_with_usage(code, user_input, timeout, max_output=max_output, bytecode=bytecode,
+                                        limits=limits)
+
+    def spawn(self, code, bytecode=None):
+        """Запуск для потокового выполнения (executor.live); у BrokerBackend его нет."""
+        return self.pool.spawn(code, bytecode)
+
+    def stats(self):
+        return {'workers': 1, 'capacity': self.pool.size}
+
+    def close(self):
+        self.pool.close()
+
+
+class BrokerBackend:
+    """Выполнение на воркерах через брокер.
+
+    max_pending — сколько задач может ждать в очереди, дальше новые отклоняются;
+    worker_timeout — через сколько секунд без heartbeat воркер считается мёртвым,
+    а его задачи возвращаются в очередь (не больше max_attempts попыток);
+    queue_timeout — сколько задача может ждать свободного воркера;
+    result_ttl — через сколько секунд незабранный результат удаляется из брокера.
+    """
+    name = 'broker'
+
+    def __init__(self, broker, limits=None, max_output=65536, max_pending=100, worker_timeout=10,
+                 max_attempts=3, queue_timeout=30, poll_interval=0.02, result_ttl=600):
+        self.broker = broker
+        self.limits = limits
+        self.max_output = max_output
+        self.max_pending = max_pending
+        self.worker_timeout = worker_timeout
+        self.max_attempts = max_attempts
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._last_reap = 0
+
+    def run(self, code, user_input='', timeout=5):
+        """Возвращает (stdout, stderr) или бросает subprocess.TimeoutExpired."""
+        result = self.run_with_usage(code, user_input, timeout)
+        if result.timed_out:
+            raise subprocess.TimeoutExpired('worker', timeout)
+        return result.stdout, result.stderr
+
+    def run_with_usage(self, code, user_input='', timeout=5, max_output=None, bytecode=None, limits=None):
+        """limits заменяет лимиты бэкенда для этого запуска."""
+        self._reap()
+        if not self.broker.workers(self.worker_timeout):
+            raise ExecutorUnavailable('исполнители недоступны, попробуйте позже')
+        if self.broker.pending() >= self.max_pending:
+            raise ExecutorUnavailable('исполнители перегружены, попробуйте позже')
+
+        job_id = self.broker.submit({
+            'code': code,
+            'input': user_input or '',
+            'timeout': timeout,
+            'max_output': max_output or self.max_output,
+            'limits': limits or self.limits,
+            'bytecode': base64.b64encode(bytecode).decode('ascii') if bytecode else None,
+            'magic': BYTECODE_MAGIC,
+        })
+
+        deadline = time.monotonic() + self.queue_timeout + timeout * self.max_attempts
+        delay = self.poll_interval
+        while time.monotonic() < deadline:
+            status, result = self.broker.result(job_id)
+            if status == 'done':
+                return RunResult(**result)
+            if status == 'failed' or status is None:
+                raise ExecutorUnavailable('исполнитель аварийно завершился, попробуйте ещё раз')
+            self._reap()
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.25)
+
+        self.broker.cancel(job_id)
+        raise ExecutorUnavailable('исполнители перегружены, попробуйте позже')
+
+    def _reap(self):
+        now = time.monotonic()
+        if now - self._last_reap >= self.worker_timeout / 2:
+            self._last_reap = now
+            self.broker.requeue_stale(self.worker_timeout, self.max_attempts, self.result_ttl)
+
+    def stats(self):
+        return self.broker.stats(self.worker_timeout)
+
+    def close(self):
+        self.broker.close()
@@ -0,0 +1,220 @@
+"""Брокер задач на выполнение кода поверх SQLite.
+
+Сервер кладёт задачу в таблицу, воркеры (python -m executor.worker) забирают её,
+выполняют и записывают результат. Брокер работает в пределах одной машины: база
+в режиме WAL требует общей памяти, поэтому сервер и воркеры открывают один локальный
+файл (NFS и SMB не подходят). Интерфейс брокера небольшой (submit/claim/complete/...),
+поэтому для воркеров на других машинах его можно заменить, например, на Redis.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    busy INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+'''
+
+
+class SqliteBroker:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('PRAGMA busy_timeout = 5000')
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._conn())
+
+    # --- сторона сервера ---
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, payload, created_at) VALUES (?, ?, ?)',
+                         (job_id, json.dumps(payload), time.time()))
+        return job_id
+
+    def result(self, job_id):
+        """Возвращает (status, result) и удаляет завершённую задачу."""
+        # Опрос идёт часто, поэтому статус читается без блокировки записи: она нужна только для удаления
+        row = self._conn().execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or row['status'] not in (DONE, FAILED):
+            return (row['status'] if row else None), None
+        with self._connect() as conn:
+            row = conn.execute('DELETE FROM jobs WHERE id = ? RETURNING status, result', (job_id,)).fetchone()
+        if row is None:
+            return None, None
+        return row['status'], json.loads(row['result']) if row['result'] else None
+
+    def cancel(self, job_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    # pending, workers и stats только читают: обычные запросы в autocommit не берут блокировку
+    # записи и не мешают claim/complete
+
+    def pending(self):
+        return self._conn().execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+
+    def workers(self, worker_timeout):
+        """Живые воркеры: те, что присылали heartbeat за последние worker_timeout секунд."""
+        rows = self._conn().execute('SELECT * FROM workers WHERE heartbeat_at >= ?',
+                                    (time.time() - worker_timeout,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_stale(self, worker_timeout, max_attempts, result_ttl=600):
+        """Возвращает в очередь задачи умерших воркеров; после max_attempts попыток задача проваливается.
+
+        Завершённые задачи старше result_ttl секунд удаляются: их результат уже никто не заберёт
+        (сервер, ждавший его, завершился). Возвращает (перезапущено, провалено).
+        """
+        deadline = time.time() - worker_timeout
+        with self._connect() as conn:
+            stale = conn.execute('''
+                SELECT j.id, j.attempts FROM jobs j
+                LEFT JOIN workers w ON w.id = j.worker_id
+                WHERE j.status = ? AND (w.id IS NULL OR w.heartbeat_at < ?)
+            ''', (RUNNING, deadline)).fetchall()
+            requeued = failed = 0
+            for row in stale:
+                if row['attempts'] >= max_attempts:
+                    conn.execute('UPDATE jobs SET status = ?, worker_id = NULL, finished_at = ? WHERE id = ?',
+                                 (FAILED, time.time(), row['id']))
+                    failed += 1
+                else:
+                    conn.execute('UPDATE jobs SET status = ?, worker_id = NULL WHERE id = ?',
+                                 (QUEUED, row['id']))
+                    requeued += 1
+            conn.execute('DELETE FROM workers WHERE heartbeat_at < ?', (deadline - 10 * worker_timeout,))
+            conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                         (DONE, FAILED, time.time() - result_ttl))
+        return requeued, failed
+
+    # --- сторона воркера ---
+
+    def register(self, capacity):
+        worker_id = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO workers (id, host, pid, capacity, started_at, heartbeat_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (worker_id, socket.gethostname(), os.getpid(), capacity, now, now))
+        return worker_id
+
+    def heartbeat(self, worker_id, busy):
+        with self._connect() as conn:
+            conn.execute('UPDATE workers SET heartbeat_at = ?, busy = ? WHERE id = ?',
+                         (time.time(), busy, worker_id))
+
+    def unregister(self, worker_id):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, worker_id = NULL WHERE status = ? AND worker_id = ?',
+                         (QUEUED, RUNNING, worker_id))
+            conn.execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+
+    def claim(self, worker_id):
+        """Забирает самую старую задачу из очереди: (job_id, payload) или None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                               (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('''
+                UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, claimed_at = ?
+                WHERE id = ?
+            ''', (RUNNING, worker_id, time.time(), row['id']))
+            return row['id'], json.loads(row['payload'])
+
+    def release(self, job_id, worker_id, max_attempts):
+        """Задача, которую воркер не смог выполнить: обратно в очередь или, после max_attempts попыток, провал."""
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                                worker_id = NULL,
+                                finished_at = CASE WHEN attempts >= ? THEN ? ELSE finished_at END
+                WHERE id = ? AND worker_id = ? AND status = ?
+            ''', (max_attempts, FAILED, QUEUED, max_attempts, time.time(), job_id, worker_id, RUNNING))
+
+    def complete(self, job_id, worker_id, result):
+        # Задачу могли уже отдать другому воркеру, тогда этот результат не нужен
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, finished_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+            ''', (DONE, json.dumps(result), time.time(), job_id, worker_id, RUNNING))
+
+    def stats(self, worker_timeout):
+        conn = self._conn()
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        workers = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(capacity), 0), COALESCE(SUM(busy), 0)
+            FROM workers WHERE heartbeat_at >= ?
+        ''', (time.time() - worker_timeout,)).fetchone()
+        return {
+            'queued': counts.get(QUEUED, 0),
+            'running': counts.get(RUNNING, 0),
+            'workers': workers[0],
+            'capacity': workers[1],
+            'busy': workers[2],
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """Контекст с BEGIN IMMEDIATE: claim и requeue не должны пересекаться между процессами."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
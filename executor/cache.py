@@ -0,0 +1,166 @@
+"""Кэш результатов детерминированного выполнения кода."""
+import ast
+import collections
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+# Код, использующий эти модули, может давать разный результат при каждом запуске
+NONDETERMINISTIC_MODULES = {'random', 'time', 'datetime', 'uuid', 'secrets', 'os', 'threading',
+                            'multiprocessing', 'subprocess', 'socket', 'urllib', 'http'}
+
+
+def normalize_code(code):
+    # Только переводы строк: компилятор всё равно приводит их к \n. Пробелы в конце строк
+    # не трогаем — внутри многострочной строки они меняют вывод программы
+    return code.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def is_cacheable(code):
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        # Синтаксическая ошибка — результат заведомо одинаковый
+        return True
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or '']
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == '__import__':
+            return False
+        else:
+            continue
+        if any(name.split('.')[0] in NONDETERMINISTIC_MODULES for name in names):
+            return False
+    return True
+
+
+class ResultCache:
+    """LRU-кэш в памяти с необязательным вторым уровнем в SQLite.
+
+    Ключ — хэш нормализованного кода, входных данных, версии интерпретатора и context —
+    настроек, от которых зависит результат (лимиты, запрещённые модули, код харнесса).
+    После их изменения старые записи, в том числе на диске, больше не находятся.
+    Записи живут ttl секунд; в памяти хранится не больше max_entries,
+    на диске — не больше max_disk_entries.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600, path=None, max_disk_entries=100000, context=None):
+        self.context = json.dumps(context, sort_keys=True, default=sorted) if context is not None else ''
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_writes = 0
+
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._disk.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_created ON result_cache (created_at)')
+            self._disk.commit()
+
+    def make_key(self, code, user_input='', namespace='execute'):
+        digest = hashlib.sha256()
+        for part in (namespace, sys.version, self.context, normalize_code(code), user_input or ''):
+            digest.update(part.encode('utf-8', errors='surrogatepass'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute('SELECT value, created_at FROM result_cache WHERE key = ?',
+                                         (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._disk is not None:
+                self._disk.execute('INSERT OR REPLACE INTO result_cache (key, value, created_at) VALUES (?, ?, ?)',
+                                   (key, json.dumps(value, ensure_ascii=False), now))
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._prune_disk(now)
+                self._disk.commit()
+
+    def _remember(self, key, created_at, value):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self, now):
+        self._disk.execute('DELETE FROM result_cache WHERE created_at < ?', (now - self.ttl,))
+        self._disk.execute('''
+            DELETE FROM result_cache WHERE key IN (
+                SELECT key FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_disk_entries,))
+
+    def get_or_run(self, code, user_input, run, namespace='execute', use_cache=True, store=None):
+        """Возвращает закэшированный результат или вызывает run() и запоминает его.
+
+        store(result) решает, можно ли сохранить результат (например, не кэшировать таймауты).
+        """
+        if not use_cache or not is_cacheable(code):
+            with self._lock:
+                self.skipped += 1
+            return run()
+
+        key = self.make_key(code, user_input, namespace)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = run()
+        if store is None or store(value):
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'skipped': self.skipped,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,116 @@
+"""Проверка решения на всех тестах упражнения за один запуск интерпретатора."""
+import base64
+import concurrent.futures
+import json
+import os
+import subprocess
+import time
+
+from executor.backends import ExecutorUnavailable
+from executor.limits import harness_limits
+
+HARNESS_PATH = os.path.join(os.path.dirname(__file__), 'harness.py')
+
+with open(HARNESS_PATH, encoding='utf-8') as f:
+    HARNESS_CODE = f.read()
+
+
+def normalize_output(text):
+    # То же сравнение, что и в compareOutput() из static/js/editor.js
+    if not isinstance(text, str):
+        return ''
+    return ' '.join(text.strip().replace('\r\n', '\n').split())
+
+
+def _case_report(index, case, result):
+    output = result['stdout'].strip()
+    error = result['error']
+    passed = error is None and normalize_output(output) == normalize_output(case.get('output', ''))
+    return {
+        'index': index,
+        'description': case.get('description') or f'Тест {index}',
+        'input': case.get('input', ''),
+        'expected': case.get('output', ''),
+        'output': output,
+        'error': error,
+        'passed': passed,
+        'time': result['time'],
+    }
+
+
+def grade(pool, code, test_cases, stop_on_failure=False, case_timeout=2, bytecode=None):
+    """Прогоняет code на test_cases одним процессом и возвращает отчёт по каждому тесту.
+
+    bytecode — уже скомпилированный code (см. executor.precheck), чтобы не разбирать его заново.
+    Харнесс получает только входные данные тестов, ожидаемый вывод сравнивается здесь.
+    """
+    limits = getattr(pool, 'limits', None)
+    inputs = [case.get('input') or '' for case in test_cases]
+    payload = json.dumps({
+        'code': code,
+        'bytecode': base64.b64encode(bytecode).decode('ascii') if bytecode else None,
+        'inputs': inputs,
+        'stop_on_failure': stop_on_failure,
+        'case_timeout': case_timeout,
+        'max_output': pool.max_output,
+        'max_processes': limits.get('max_processes') if limits else None,
+    }, ensure_ascii=False)
+
+    start = time.perf_counter()
+    timeout = (case_timeout + 1) * len(inputs) + 1
+    try:
+        # Вывод всех тестов приходит одним JSON, поэтому лимит вывода умножается на число тестов
+        run = pool.run_with_usage(HARNESS_CODE, payload, timeout=timeout,
+                                  max_output=pool.max_output * (len(inputs) + 1) * 2,
+                                  limits=harness_limits(limits))
+        if run.timed_out:
+            raise subprocess.TimeoutExpired('grader', timeout)
+        stdout, stderr = run.stdout, run.stderr
+        try:
+            results = json.loads(stdout.splitlines()[-1]) if stdout.strip() else None
+        except ValueError:
+            results = None
+        if results is None:
+            error = stderr.strip().splitlines()[-1] if stderr.strip() else 'Проверка завершилась аварийно'
+            results = [{'stdout': '', 'stderr': stderr, 'error': error, 'time': 0.0}]
+    except subprocess.TimeoutExpired:
+        results = [{'stdout': '', 'stderr': '', 'time': 0.0,
+                    'error': 'Ошибка: время выполнения кода истекло'}]
+    except ExecutorUnavailable as e:
+        results = [{'stdout': '', 'stderr': '', 'time': 0.0, 'error': f'Ошибка: {e}'}]
+    elapsed = time.perf_counter() - start
+    return _grade_report(test_cases, results, elapsed, stop_on_failure)
+
+
+def reject(test_cases, error):
+    """Отчёт для кода, не прошедшего предварительную проверку: все тесты провалены без запуска."""
+    results = [{'stdout': '', 'stderr': '', 'error': error, 'time': 0.0} for _ in test_cases]
+    return _grade_report(test_cases, results, 0.0)
+
+
+def _grade_report(test_cases, results, elapsed, stop_on_failure=False):
+    reports = []
+    for i, (case, result) in enumerate(zip(test_cases, results), start=1):
+        reports.append(_case_report(i, case, result))
+        if stop_on_failure and not reports[-1]['passed']:
+            break
+    passed_count = sum(1 for report in reports if report['passed'])
+    return {
+        'passed': passed_count == len(test_cases),
+        'total': len(test_cases),
+        'passed_count': passed_count,
+        'failed_count': len(reports) - passed_count,
+        'skipped_count': len(test_cases) - len(reports),
+        'cases': reports,
+        'time': round(elapsed, 4),
+    }
+
+
+def check_solutions(pool, exercises, workers=4):
+    """Проверяет эталонные решения: exercises — [(ключ, code, test_cases)], возвращает [(ключ, отчёт)].
+
+    Решения проверяются параллельно в workers потоках, каждое — отдельным процессом из pool.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as executor:
+        futures = [(key, executor.submit(grade, pool, code, test_cases)) for key, code, test_cases in exercises]
+        return [(key, future.result()) for key, future in futures]
@@ -0,0 +1,149 @@
+"""Очередь задач на выполнение кода: запрос возвращает id сразу, код выполняется в фоне."""
+import collections
+import itertools
+import threading
+import time
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, user_id, handler, args):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.handler = handler
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'queue_time': round((self.started_at or time.time()) - self.created_at, 3),
+        }
+        if self.status == DONE:
+            data['run_time'] = round(self.finished_at - self.started_at, 3)
+            data['result'] = self.result
+        return data
+
+
+class JobScheduler:
+    """Ограниченная очередь с пулом потоков-исполнителей.
+
+    Задачи выбираются по кругу между пользователями (справедливая очередь),
+    у одного пользователя одновременно выполняется не больше per_user_limit задач,
+    а в очереди ждёт не больше max_pending_per_user.
+    """
+
+    def __init__(self, handler, workers=4, per_user_limit=1, max_queued=200,
+                 max_pending_per_user=5, ttl=300, on_complete=None):
+        self.handler = handler
+        self.on_complete = on_complete
+        self.per_user_limit = per_user_limit
+        self.max_queued = max_queued
+        self.max_pending_per_user = max_pending_per_user
+        self.ttl = ttl
+
+        self._jobs = {}
+        self._pending = collections.OrderedDict()
+        self._running = collections.Counter()
+        self._queued = 0
+        self._cond = threading.Condition()
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True).start()
+
+    def submit(self, user_id, *args, handler=None):
+        with self._cond:
+            self._expire()
+            if self._queued >= self.max_queued:
+                raise QueueFull('Сервер перегружен, попробуйте позже')
+            user_queue = self._pending.setdefault(user_id, collections.deque())
+            if len(user_queue) >= self.max_pending_per_user:
+                raise QueueFull('Слишком много задач в очереди, дождитесь результатов')
+
+            job = Job(user_id, handler or self.handler, args)
+            user_queue.append(job)
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._cond.notify()
+            return job
+
+    def get(self, job_id, user_id=None):
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    def _next_job(self):
+        for user_id in list(self._pending):
+            if self._running[user_id] >= self.per_user_limit:
+                continue
+            user_queue = self._pending.pop(user_id)
+            job = user_queue.popleft()
+            if user_queue:
+                # Пользователь уходит в конец круга
+                self._pending[user_id] = user_queue
+            return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._queued -= 1
+                self._running[job.user_id] += 1
+                job.status = RUNNING
+                job.started_at = time.time()
+
+            try:
+                job.result = job.handler(*job.args)
+            except Exception as e:
+                job.result = {'success': False, 'output': f'Системная ошибка: {str(e)}'}
+
+            with self._cond:
+                self._running[job.user_id] -= 1
+                if not self._running[job.user_id]:
+                    del self._running[job.user_id]
+                job.finished_at = time.time()
+                job.status = DONE
+                job._done.set()
+                self._cond.notify_all()
+
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(job)
+                except Exception:
+                    pass
+
+    def _expire(self):
+        deadline = time.time() - self.ttl
+        for job_id in list(itertools.takewhile(lambda j: self._jobs[j].created_at < deadline, self._jobs)):
+            if self._jobs[job_id].status == DONE:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': self._queued,
+                'running': sum(self._running.values()),
+                'jobs': len(self._jobs),
+            }
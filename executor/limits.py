@@ -0,0 +1,72 @@
+"""Ограничения ресурсов для процесса с пользовательским кодом."""
+import signal
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SIGNAL_MESSAGES = {
+    getattr(signal, 'SIGXCPU', None): 'превышен лимит процессорного времени',
+    getattr(signal, 'SIGXFSZ', None): 'превышен лимит размера файла',
+    getattr(signal, 'SIGSEGV', None): 'аварийное завершение процесса',
+}
+
+
+def make_limits(cpu_seconds=5, memory_mb=256, file_size_mb=1, max_processes=0):
+    """Словарь лимитов для передачи в зиготу. None означает «без ограничения».
+
+    max_processes — RLIMIT_NPROC; лимит считается на пользователя ОС целиком,
+    поэтому любое небольшое значение фактически запрещает fork() и потоки.
+    """
+    return {
+        'cpu_seconds': cpu_seconds,
+        'memory_mb': memory_mb,
+        'file_size_mb': file_size_mb,
+        'max_processes': max_processes,
+    }
+
+
+def harness_limits(limits):
+    """Лимиты для executor.harness: он сам запускает потомка на каждый тест и ставит
+    потомку RLIMIT_NPROC, поэтому самому харнессу fork() разрешён."""
+    if not limits:
+        return limits
+    return {**limits, 'max_processes': None}
+
+
+def _set(name, value):
+    limit = getattr(resource, name, None)
+    if limit is None or value is None:
+        return
+    try:
+        resource.setrlimit(limit, (value, value))
+    except (ValueError, OSError):
+        # Жёсткий лимит уже ниже запрошенного — оставляем как есть
+        pass
+
+
+def apply_limits(limits):
+    """Вызывается в дочернем процессе до выполнения кода."""
+    if resource is None or not limits:
+        return
+    cpu = limits.get('cpu_seconds')
+    if cpu is not None:
+        # Мягкий лимит присылает SIGXCPU, жёсткий через секунду убивает процесс
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu), int(cpu) + 1))
+        except (ValueError, OSError):
+            pass
+    memory = limits.get('memory_mb')
+    _set('RLIMIT_AS', memory * 1024 * 1024 if memory is not None else None)
+    file_size = limits.get('file_size_mb')
+    _set('RLIMIT_FSIZE', int(file_size * 1024 * 1024) if file_size is not None else None)
+    _set('RLIMIT_NPROC', limits.get('max_processes'))
+    _set('RLIMIT_CORE', 0)
+    if hasattr(signal, 'SIGXFSZ'):
+        # Запись сверх лимита превращается в OSError вместо убийства процесса
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+
+
+def describe_signal(signum):
+    return SIGNAL_MESSAGES.get(signum) or f'процесс завершён сигналом {signum}'
@@ -0,0 +1,194 @@
+"""Потоковое выполнение кода.
+
+Вывод программы передаётся по мере появления, ввод приходит из браузера по строкам.
+"""
+import codecs
+import os
+import queue
+import selectors
+import threading
+import time
+import uuid
+
+READ_CHUNK = 4096
+
+
+class LiveRunLimit(Exception):
+    pass
+
+
+class LiveRun:
+    """Один потоковый запуск: поток-насос читает stdout/stderr потомка в ограниченную очередь событий.
+
+    Если клиент не забирает события, очередь заполняется, чтение из pipe останавливается,
+    и потомок блокируется на записи, а не копит вывод в памяти сервера.
+    """
+
+    def __init__(self, user_id, child, timeout=60, max_output=65536, max_buffered=256):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.child = child
+        self.timeout = timeout
+        self.max_output = max_output
+        self.events = queue.Queue(maxsize=max_buffered)
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._finished = threading.Event()
+        self._cancelled = threading.Event()
+        self._stdin_lock = threading.Lock()
+        self._stdin_open = True
+        self._deadline = time.monotonic() + timeout
+        os.set_blocking(child.stdin_fd, False)
+        threading.Thread(target=self._pump, name=f'live-{self.id[:8]}', daemon=True).start()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def write_input(self, text):
+        """Передаёт text в stdin программы. False — ввод уже закрыт или программа его не читает."""
+        data = text.encode('utf-8')
+        with self._stdin_lock:
+            if not self._stdin_open:
+                return False
+            try:
+                written = os.write(self.child.stdin_fd, data)
+            except (BlockingIOError, BrokenPipeError):
+                return False
+            return written == len(data)
+
+    def close_input(self):
+        with self._stdin_lock:
+            if self._stdin_open:
+                self._stdin_open = False
+                os.close(self.child.stdin_fd)
+
+    def cancel(self):
+        self._cancelled.set()
+        self.child.kill()
+
+    def _emit(self, event, data):
+        while True:
+            try:
+                self.events.put((event, data), timeout=0.5)
+                return True
+            except queue.Full:
+                if self._cancelled.is_set() or time.monotonic() > self._deadline:
+                    return False
+
+    def _pump(self):
+        decoders = {
+            self.child.stdout_fd: ('stdout', codecs.getincrementaldecoder('utf-8')(errors='replace')),
+            self.child.stderr_fd: ('stderr', codecs.getincrementaldecoder('utf-8')(errors='replace')),
+        }
+        output_bytes = 0
+        truncated = timed_out = False
+        try:
+            with selectors.DefaultSelector() as selector:
+                for fd in decoders:
+                    selector.register(fd, selectors.EVENT_READ)
+                while selector.get_map() and not self._cancelled.is_set():
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        timed_out = True
+                        break
+                    for key, _ in selector.select(min(remaining, 1.0)):
+                        chunk = os.read(key.fd, READ_CHUNK)
+                        if not chunk:
+                            selector.unregister(key.fd)
+                            continue
+                        if output_bytes + len(chunk) > self.max_output:
+                            chunk = chunk[:self.max_output - output_bytes]
+                            truncated = True
+                        output_bytes += len(chunk)
+                        stream, decoder = decoders[key.fd]
+                        text = decoder.decode(chunk)
+                        if text and not self._emit(stream, {'text': text}):
+                            timed_out = not self._cancelled.is_set()
+                            break
+                        if truncated:
+                            break
+                    if truncated or timed_out:
+                        break
+        finally:
+            self.child.kill()
+            self.close_input()
+            for fd in decoders:
+                os.close(fd)
+            status = self.child.wait_status(1.0)
+            self.result = {
+                'exit_code': status.get('exit_code'),
+                'cpu_time': status.get('cpu_time'),
+                'max_rss_kb': status.get('max_rss_kb'),
+                'truncated': truncated,
+                'timed_out': timed_out,
+                'cancelled': self._cancelled.is_set(),
+            }
+            self.finished_at = time.time()
+            self._finished.set()
+            # Событие завершения не должно потеряться, но и ждать его вечно некому
+            try:
+                self.events.put(('exit', self.result), timeout=5)
+            except queue.Full:
+                pass
+
+    def iter_events(self, keepalive=15):
+        """(event, data) по мере поступления; None — пора отправить keep-alive. Заканчивается на 'exit'."""
+        while True:
+            try:
+                event, data = self.events.get(timeout=keepalive)
+            except queue.Empty:
+                if self.finished and self.events.empty():
+                    yield 'exit', self.result
+                    return
+                yield None
+                continue
+            yield event, data
+            if event == 'exit':
+                return
+
+
+class LiveRunRegistry:
+    """Активные потоковые запуски: не больше max_runs всего и per_user на пользователя."""
+
+    def __init__(self, max_runs=20, per_user=1, ttl=60):
+        self.max_runs = max_runs
+        self.per_user = per_user
+        self.ttl = ttl
+        self.started = 0
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def start(self, user_id, spawn, **options):
+        """spawn() возвращает ChildProcess (см. ExecutorPool.spawn); options передаются в LiveRun."""
+        with self._lock:
+            self._expire()
+            active = [run for run in self._runs.values() if not run.finished]
+            if len(active) >= self.max_runs:
+                raise LiveRunLimit('Сервер перегружен, попробуйте позже')
+            if sum(1 for run in active if run.user_id == user_id) >= self.per_user:
+                raise LiveRunLimit('Дождитесь завершения предыдущего запуска')
+            run = LiveRun(user_id, spawn(), **options)
+            self._runs[run.id] = run
+            self.started += 1
+            return run
+
+    def get(self, run_id, user_id=None):
+        run = self._runs.get(run_id)
+        if run is None or (user_id is not None and run.user_id != user_id):
+            return None
+        return run
+
+    def _expire(self):
+        deadline = time.time() - self.ttl
+        for run_id, run in list(self._runs.items()):
+            if run.finished and run.finished_at < deadline:
+                del self._runs[run_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': sum(1 for run in self._runs.values() if not run.finished),
+                'started': self.started,
+            }
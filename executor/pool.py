@@ -0,0 +1,413 @@
+"""Пул предзапущенных интерпретаторов для выполнения пользовательского кода."""
+import atexit
+import base64
+import json
+import os
+import queue
+import select
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from executor.limits import apply_limits
+
+ZYGOTE_PATH = os.path.join(os.path.dirname(__file__), 'zygote.py')
+HEADER = struct.Struct('!I')
+READ_CHUNK = 32768
+
+
+def _run_subprocess(code, user_input, timeout, limits=None, max_output=None):
+    preexec_fn = None
+    if limits and os.name == 'posix':
+        preexec_fn = lambda: apply_limits(limits)
+    process = subprocess.Popen(
+        [sys.executable, '-c', code],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='ignore',
+        preexec_fn=preexec_fn
+    )
+
+    try:
+        stdout, stderr = process.communicate(input=user_input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise
+
+    truncated = False
+    if max_output is not None:
+        if len(stdout.encode('utf-8')) > max_output or len(stderr.encode('utf-8')) > max_output:
+            truncated = True
+            stdout = stdout.encode('utf-8')[:max_output].decode('utf-8', errors='ignore')
+            stderr = stderr.encode('utf-8')[:max_output].decode('utf-8', errors='ignore')
+    return RunResult(stdout, stderr, process.returncode, truncated)
+
+
+class RunResult:
+    """Результат запуска: вывод, код завершения и потреблённые ресурсы."""
+
+    def __init__(self, stdout, stderr, exit_code=None, truncated=False, timed_out=False,
+                 cpu_time=None, max_rss_kb=None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+        self.truncated = truncated
+        self.timed_out = timed_out
+        self.cpu_time = cpu_time
+        self.max_rss_kb = max_rss_kb
+
+    @property
+    def signal(self):
+        if self.exit_code is not None and self.exit_code < 0:
+            return -self.exit_code
+        return None
+
+    def usage(self):
+        return {
+            'exit_code': self.exit_code,
+            'cpu_time': self.cpu_time,
+            'max_rss_kb': self.max_rss_kb,
+            'truncated': self.truncated,
+            'timed_out': self.timed_out,
+        }
+
+
+def _communicate(stdin_fd, stdout_fd, stderr_fd, data, timeout, max_output=None, on_overflow=None):
+    """Аналог Popen.communicate() для «голых» дескрипторов; закрывает их сам.
+
+    Читает не больше max_output байт из каждого потока; при превышении вызывает
+    on_overflow() (обычно убивает процесс) и дочитывает потоки до конца впустую.
+    Возвращает (stdout, stderr, truncated).
+    """
+    output = {stdout_fd: [], stderr_fd: []}
+    sizes = {stdout_fd: 0, stderr_fd: 0}
+    truncated = False
+    opened = {stdin_fd, stdout_fd, stderr_fd}
+    offset = 0
+    deadline = time.monotonic() + timeout
+
+    def close(fd):
+        opened.discard(fd)
+        os.close(fd)
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            for fd in opened:
+                os.set_blocking(fd, False)
+            if data:
+                selector.register(stdin_fd, selectors.EVENT_WRITE)
+            else:
+                close(stdin_fd)
+            selector.register(stdout_fd, selectors.EVENT_READ)
+            selector.register(stderr_fd, selectors.EVENT_READ)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired('zygote', timeout)
+
+                for key, _ in selector.select(remaining):
+                    fd = key.fd
+                    if fd == stdin_fd:
+                        try:
+                            offset += os.write(fd, data[offset:offset + READ_CHUNK])
+                        except BrokenPipeError:
+                            offset = len(data)
+                        if offset >= len(data):
+                            selector.unregister(fd)
+                            close(fd)
+                        continue
+
+                    chunk = os.read(fd, READ_CHUNK)
+                    if not chunk:
+                        selector.unregister(fd)
+                        continue
+                    if max_output is not None and sizes[fd] + len(chunk) > max_output:
+                        chunk = chunk[:max_output - sizes[fd]]
+                        if not truncated:
+                            truncated = True
+                            if on_overflow is not None:
+                                on_overflow()
+                    sizes[fd] += len(chunk)
+                    if chunk:
+                        output[fd].append(chunk)
+    finally:
+        for fd in list(opened):
+            close(fd)
+
+    stdout = b''.join(output[stdout_fd]).decode('utf-8', errors='ignore')
+    stderr = b''.join(output[stderr_fd]).decode('utf-8', errors='ignore')
+    return stdout, stderr, truncated
+
+
+def _read_status(status_fd, timeout):
+    try:
+        ready, _, _ = select.select([status_fd], [], [], timeout)
+        data = os.read(status_fd, 4096) if ready else b''
+    finally:
+        os.close(status_fd)
+    try:
+        return json.loads(data) if data else {}
+    except ValueError:
+        return {}
+
+
+class ChildProcess:
+    """Потомок зиготы: дескрипторы его stdin/stdout/stderr на стороне сервера."""
+
+    def __init__(self, pid, stdin_fd, stdout_fd, stderr_fd, status_fd):
+        self.pid = pid
+        self.stdin_fd = stdin_fd
+        self.stdout_fd = stdout_fd
+        self.stderr_fd = stderr_fd
+        self.status_fd = status_fd
+
+    def kill(self):
+        # Потомок запущен в своей группе процессов: убиваем её целиком,
+        # вместе со всем, что он мог породить
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def wait_status(self, timeout):
+        """Код завершения и ресурсы из зиготы; закрывает status_fd."""
+        return _read_status(self.status_fd, timeout)
+
+
+class PopenChild:
+    """То же для запасного пути через subprocess.Popen."""
+
+    def __init__(self, code, limits=None):
+        preexec_fn = None
+        if limits and os.name == 'posix':
+            preexec_fn = lambda: apply_limits(limits)
+        self.process = subprocess.Popen(
+            [sys.executable, '-u', '-c', code],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+            preexec_fn=preexec_fn
+        )
+        self.pid = self.process.pid
+        # Дескрипторы отдаются вызывающему, он их и закрывает
+        self.stdin_fd = os.dup(self.process.stdin.fileno())
+        self.stdout_fd = os.dup(self.process.stdout.fileno())
+        self.stderr_fd = os.dup(self.process.stderr.fileno())
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
+
+    def wait_status(self, timeout):
+        try:
+            return {'exit_code': self.process.wait(timeout)}
+        except subprocess.TimeoutExpired:
+            return {}
+
+
+class Zygote:
+    def __init__(self):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, ZYGOTE_PATH, str(child_sock.fileno())],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                pass_fds=(child_sock.fileno(),)
+            )
+        finally:
+            child_sock.close()
+        self.sock = parent_sock
+        self.runs = 0
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def fork(self, code, fds, limits=None, bytecode=None, line_buffered=False):
+        payload = json.dumps({
+            'code': code,
+            'bytecode': base64.b64encode(bytecode).decode('ascii') if bytecode else None,
+            'limits': limits,
+            'line_buffered': line_buffered,
+        }).encode('utf-8')
+        socket.send_fds(self.sock, [HEADER.pack(len(payload))], fds)
+        self.sock.sendall(payload)
+
+        reply = b''
+        while len(reply) < HEADER.size:
+            chunk = self.sock.recv(HEADER.size - len(reply))
+            if not chunk:
+                raise OSError('зигота завершилась')
+            reply += chunk
+        self.runs += 1
+        return HEADER.unpack(reply)[0]
+
+    def close(self):
+        self.sock.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class ExecutorPool:
+    """Пул зигот: каждый запуск выполняется в свежем потомке тёплого интерпретатора.
+
+    size — число зигот, max_runs — сколько запусков обслуживает зигота до замены.
+    limits — лимиты ресурсов потомка (см. executor.limits.make_limits),
+    max_output — сколько байт stdout/stderr сохраняется, остальное отбрасывается.
+    При size=0 или на платформах без fork() код выполняется через subprocess.Popen.
+    """
+
+    def __init__(self, size=2, max_runs=500, limits=None, max_output=65536):
+        self.size = size
+        self.max_runs = max_runs
+        self.limits = limits
+        self.max_output = max_output
+        self.enabled = size > 0 and hasattr(os, 'fork') and hasattr(socket, 'send_fds')
+        self._idle = queue.LifoQueue()
+        self._spawned = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle.empty() and self._spawned < self.size:
+                self._spawned += 1
+                try:
+                    return Zygote()
+                except Exception:
+                    self._spawned -= 1
+                    raise
+        return self._idle.get()
+
+    def _release(self, zygote):
+        if self._closed or not zygote.is_alive() or zygote.runs >= self.max_runs:
+            self._retire(zygote)
+        else:
+            self._idle.put(zygote)
+
+    def _retire(self, zygote):
+        with self._lock:
+            self._spawned -= 1
+        zygote.close()
+
+    def _fork(self, code, fds, limits, bytecode=None, line_buffered=False):
+        zygote = self._acquire()
+        try:
+            pid = zygote.fork(code, fds, limits, bytecode, line_buffered)
+        except OSError:
+            # Зигота умерла — заменяем её и пробуем ещё раз
+            self._retire(zygote)
+            zygote = self._acquire()
+            try:
+                pid = zygote.fork(code, fds, limits, bytecode, line_buffered)
+            except OSError:
+                self._retire(zygote)
+                raise
+        self._release(zygote)
+        return pid
+
+    def run(self, code, user_input='', timeout=5):
+        """Возвращает (stdout, stderr) или бросает subprocess.TimeoutExpired."""
+        result = self.run_with_usage(code, user_input, timeout)
+        if result.timed_out:
+            raise subprocess.TimeoutExpired('zygote', timeout)
+        return result.stdout, result.stderr
+
+    def run_with_usage(self, code, user_input='', timeout=5, max_output=None, bytecode=None, limits=None):
+        """Запускает код и возвращает RunResult; таймаут отмечается в result.timed_out.
+
+        bytecode — результат executor.precheck.precheck(code): зигота выполнит его
+        без повторного разбора. Запасной путь через subprocess всегда берёт исходник.
+        limits заменяет лимиты пула для этого запуска.
+        """
+        max_output = max_output or self.max_output
+        limits = limits or self.limits
+        if not self.enabled or self._closed:
+            return self._run_fallback(code, user_input, timeout, max_output, limits)
+
+        child = self._spawn_zygote(code, limits, bytecode)
+        if child is None:
+            return self._run_fallback(code, user_input, timeout, max_output, limits)
+
+        timed_out = False
+        try:
+            stdout, stderr, truncated = _communicate(
+                child.stdin_fd, child.stdout_fd, child.stderr_fd, (user_input or '').encode('utf-8'), timeout,
+                max_output=max_output, on_overflow=child.kill)
+        except subprocess.TimeoutExpired:
+            stdout, stderr, truncated = '', '', False
+            timed_out = True
+        finally:
+            child.kill()
+
+        status = child.wait_status(1.0)
+        return RunResult(stdout, stderr,
+                         exit_code=status.get('exit_code'),
+                         truncated=truncated,
+                         timed_out=timed_out,
+                         cpu_time=status.get('cpu_time'),
+                         max_rss_kb=status.get('max_rss_kb'))
+
+    def spawn(self, code, bytecode=None, limits=None):
+        """Запускает код и сразу возвращает ChildProcess: ввод и вывод читает вызывающий.
+
+        Используется для потокового выполнения (см. executor.live).
+        """
+        limits = limits or self.limits
+        child = None
+        if self.enabled and not self._closed:
+            child = self._spawn_zygote(code, limits, bytecode, line_buffered=True)
+        return child or PopenChild(code, limits)
+
+    def _spawn_zygote(self, code, limits, bytecode, line_buffered=False):
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        status_r, status_w = os.pipe()
+        try:
+            pid = self._fork(code, [stdin_r, stdout_w, stderr_w, status_w], limits, bytecode, line_buffered)
+        except Exception:
+            pid = None
+        finally:
+            for fd in (stdin_r, stdout_w, stderr_w, status_w):
+                os.close(fd)
+
+        if pid is None:
+            for fd in (stdin_w, stdout_r, stderr_r, status_r):
+                os.close(fd)
+            return None
+        return ChildProcess(pid, stdin_w, stdout_r, stderr_r, status_r)
+
+    def _run_fallback(self, code, user_input, timeout, max_output, limits):
+        try:
+            return _run_subprocess(code, user_input, timeout, limits, max_output)
+        except subprocess.TimeoutExpired:
+            return RunResult('', '', timed_out=True)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                zygote = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(zygote)
@@ -0,0 +1,168 @@
+"""Проверка кода до запуска: компиляция в процессе сервера и запрет опасных импортов."""
+import ast
+import marshal
+
+# Модули, которые учебным задачам не нужны, а песочнице опасны.
+# posix и _posixsubprocess — то, на чём стоят os и subprocess; builtins дал бы __import__
+FORBIDDEN_MODULES = frozenset({
+    'subprocess', 'multiprocessing', 'socket', 'ctypes', 'signal', 'pty',
+    'resource', 'shutil', 'importlib', 'posix', 'nt', '_posixsubprocess', 'builtins',
+})
+
+# Модули, из которых задачам нужна малая часть: разрешены только эти атрибуты.
+# Остальное в os (system, popen, fork, exec*) равносильно subprocess, а sys.modules отдаёт
+# уже загруженный os целиком
+RESTRICTED_MODULES = {
+    'os': frozenset({'path', 'sep', 'linesep', 'curdir', 'pardir', 'extsep', 'name'}),
+    'sys': frozenset({'stdin', 'stdout', 'stderr', 'argv', 'exit', 'maxsize', 'float_info', 'int_info',
+                      'version', 'version_info', 'getrecursionlimit', 'setrecursionlimit', 'getsizeof',
+                      'set_int_max_str_digits', 'get_int_max_str_digits', 'intern'}),
+}
+
+
+class PrecheckError(Exception):
+    """Код не прошёл проверку: message готово для показа пользователю."""
+
+    def __init__(self, message, line=None, column=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def location(self):
+        return {'line': self.line, 'column': self.column}
+
+
+def _syntax_error(e):
+    message = f"{type(e).__name__}: {e.msg}"
+    if e.lineno:
+        message = f"Строка {e.lineno}, позиция {e.offset or 1}: {message}"
+    if e.text:
+        text = e.text.rstrip('\n')
+        indent = len(text) - len(text.lstrip())
+        caret = max((e.offset or 1) - 1 - indent, 0)
+        message += f"\n    {text.strip()}\n    {' ' * caret}^"
+    return PrecheckError(message, e.lineno, e.offset)
+
+
+def _imported_modules(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield node, alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level:
+                yield node, node.module
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+              and node.func.id == '__import__' and node.args
+              and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            yield node, node.args[0].value
+
+
+def _import_error(node, name):
+    return PrecheckError(f"Строка {node.lineno}: импорт модуля {name} запрещён",
+                         node.lineno, node.col_offset + 1)
+
+
+def _attribute_error(node, module, attribute):
+    return PrecheckError(f"Строка {node.lineno}: {module}.{attribute} запрещён", node.lineno, node.col_offset + 1)
+
+
+def _check_dynamic_imports(tree):
+    # Имя модуля, вычисленное во время выполнения, проверить нельзя: такой импорт запрещаем целиком.
+    # Это не песочница (её дают лимиты исполнителя), а отсечение очевидных обходов запрета
+    constant_calls = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == '__import__'
+                and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            constant_calls.add(id(node.func))
+    for node in ast.walk(tree):
+        name = node.id if isinstance(node, ast.Name) else node.attr if isinstance(node, ast.Attribute) else None
+        if name == '__builtins__' or (name == '__import__' and id(node) not in constant_calls):
+            raise PrecheckError(f"Строка {node.lineno}: {name} запрещён", node.lineno, node.col_offset + 1)
+
+
+def _check_module_attributes(tree, modules):
+    # Многие модули держат ссылку на os или sys атрибутом (os.path.os, random._os):
+    # иначе запрещённый модуль достаётся без импорта
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.lstrip('_') in modules:
+            raise PrecheckError(f"Строка {node.lineno}: обращение к модулю {node.attr.lstrip('_')} "
+                                f"через атрибут запрещено", node.lineno, node.col_offset + 1)
+
+
+def _check_restricted(tree, restricted_modules):
+    """Модули из restricted_modules доступны только через разрешённые атрибуты:
+    имя, под которым модуль импортирован, можно использовать лишь как module.attr."""
+    bound = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                root, _, rest = alias.name.partition('.')
+                if root not in restricted_modules:
+                    continue
+                if rest and rest.split('.')[0] not in restricted_modules[root]:
+                    raise _attribute_error(node, root, rest.split('.')[0])
+                # import os.path связывает имя os, import os.path as p — только подмодуль
+                if alias.asname is None or not rest:
+                    bound[alias.asname or root] = root
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            root, _, rest = node.module.partition('.')
+            if root not in restricted_modules:
+                continue
+            if rest:
+                if rest.split('.')[0] not in restricted_modules[root]:
+                    raise _attribute_error(node, root, rest.split('.')[0])
+                continue
+            for alias in node.names:
+                if alias.name not in restricted_modules[root]:
+                    raise _attribute_error(node, root, alias.name)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == '__import__'
+              and node.args and isinstance(node.args[0], ast.Constant)
+              and str(node.args[0].value).split('.')[0] in restricted_modules):
+            # Результат __import__ не отследить: модуль целиком оказался бы в произвольной переменной
+            raise _import_error(node, node.args[0].value)
+    if not bound:
+        return
+
+    allowed_names = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                and node.value.id in bound and isinstance(node.ctx, ast.Load)):
+            module = bound[node.value.id]
+            if node.attr not in restricted_modules[module]:
+                raise _attribute_error(node, module, node.attr)
+            allowed_names.add(id(node.value))
+    for node in ast.walk(tree):
+        # Любое другое использование (getattr(os, ...), vars(sys), f(os)) отдало бы модуль целиком
+        if isinstance(node, ast.Name) and node.id in bound and id(node) not in allowed_names:
+            raise PrecheckError(f"Строка {node.lineno}: модуль {bound[node.id]} можно использовать "
+                                f"только как {node.id}.<атрибут>", node.lineno, node.col_offset + 1)
+
+
+def precheck(code, forbidden_modules=FORBIDDEN_MODULES, restricted_modules=RESTRICTED_MODULES):
+    """Компилирует code и возвращает байткод (marshal) для передачи в исполнитель.
+
+    Бросает PrecheckError при синтаксической ошибке, запрещённом импорте или обращении
+    к неразрешённому атрибуту модуля из restricted_modules.
+    """
+    try:
+        tree = ast.parse(code, '<string>')
+    except (SyntaxError, ValueError) as e:
+        if isinstance(e, SyntaxError):
+            raise _syntax_error(e) from None
+        raise PrecheckError(f"Ошибка в коде: {e}") from None
+
+    for node, name in _imported_modules(tree):
+        if name.split('.')[0] in forbidden_modules:
+            raise _import_error(node, name)
+    _check_dynamic_imports(tree)
+    _check_module_attributes(tree, set(forbidden_modules) | set(restricted_modules))
+    _check_restricted(tree, restricted_modules)
+
+    try:
+        # Часть ошибок (return вне функции, break вне цикла) видна только при компиляции
+        code_object = compile(tree, '<string>', 'exec')
+    except SyntaxError as e:
+        raise _syntax_error(e) from None
+    return marshal.dumps(code_object)
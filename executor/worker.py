@@ -0,0 +1,139 @@
+"""Воркер выполнения кода: забирает задачи из брокера и выполняет их в своём пуле зигот.
+
+Запуск (из корня проекта):
+    python -m executor.worker --broker db/broker.db --concurrency 4
+"""
+import argparse
+import base64
+import signal
+import sys
+import threading
+import traceback
+
+from executor.backends import BYTECODE_MAGIC
+from executor.broker import SqliteBroker
+from executor.limits import make_limits
+from executor.pool import ExecutorPool
+
+
+class Worker:
+    def __init__(self, broker, pool, concurrency=4, heartbeat_interval=2, poll_interval=0.05, max_attempts=3,
+                 error_backoff=1.0):
+        self.broker = broker
+        self.pool = pool
+        self.concurrency = concurrency
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.error_backoff = error_backoff
+        self.id = None
+        self.busy = 0
+        self.completed = 0
+        self.errors = 0
+        # Задачи, которые не удалось ни завершить, ни вернуть в брокер: повторяем позже
+        self._unreleased = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def execute(self, payload):
+        bytecode = payload.get('bytecode')
+        if bytecode and payload.get('magic') == BYTECODE_MAGIC:
+            bytecode = base64.b64decode(bytecode)
+        else:
+            bytecode = None
+        result = self.pool.run_with_usage(payload['code'], payload['input'], payload['timeout'],
+                                          max_output=payload.get('max_output'), bytecode=bytecode,
+                                          limits=payload.get('limits'))
+        return {'stdout': result.stdout, 'stderr': result.stderr, **result.usage()}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._release_pending()
+                job = self.broker.claim(self.id)
+            except Exception:
+                self._log_error('не удалось получить задачу')
+                self._stop.wait(self.error_backoff)
+                continue
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            job_id, payload = job
+            with self._lock:
+                self.busy += 1
+            try:
+                result = self.execute(payload)
+                self.broker.complete(job_id, self.id, result)
+            except Exception:
+                # Поток не должен умирать: heartbeat продолжается, и задачу иначе никто не вернёт в очередь
+                self._log_error(f'задача {job_id} не выполнена')
+                self._release(job_id)
+                self._stop.wait(self.error_backoff)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.completed += 1
+
+    def _log_error(self, message):
+        with self._lock:
+            self.errors += 1
+        print(f'[worker] {self.id}: {message}', file=sys.stderr)
+        traceback.print_exc()
+
+    def _release(self, job_id):
+        try:
+            self.broker.release(job_id, self.id, self.max_attempts)
+        except Exception:
+            self._log_error(f'задача {job_id} не возвращена в очередь, повторим позже')
+            with self._lock:
+                self._unreleased.append(job_id)
+
+    def _release_pending(self):
+        with self._lock:
+            pending, self._unreleased = self._unreleased, []
+        for job_id in pending:
+            self._release(job_id)
+
+    def serve(self):
+        self.id = self.broker.register(self.concurrency)
+        threads = [threading.Thread(target=self._loop, name=f'executor-worker-{i}', daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        print(f'[worker] {self.id}: {self.concurrency} потоков, брокер {self.broker.path}')
+        try:
+            while not self._stop.wait(self.heartbeat_interval):
+                try:
+                    self.broker.heartbeat(self.id, self.busy)
+                except Exception:
+                    self._log_error('heartbeat не отправлен')
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=10)
+            self.broker.unregister(self.id)
+            self.pool.close()
+            print(f'[worker] {self.id}: остановлен, выполнено задач: {self.completed}')
+
+    def stop(self, *args):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Воркер выполнения кода PyWay')
+    parser.add_argument('--broker', default='db/broker.db', help='путь к базе брокера')
+    parser.add_argument('--concurrency', type=int, default=4, help='сколько задач выполнять одновременно')
+    parser.add_argument('--pool-size', type=int, default=2, help='число зигот')
+    parser.add_argument('--max-runs', type=int, default=500, help='запусков на одну зиготу')
+    args = parser.parse_args(argv)
+
+    # Лимиты приходят с каждой задачей от сервера, здесь — значения по умолчанию
+    pool = ExecutorPool(size=args.pool_size, max_runs=args.max_runs, limits=make_limits())
+    worker = Worker(SqliteBroker(args.broker), pool, concurrency=args.concurrency)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.serve()
+
+
+if __name__ == '__main__':
+    main()
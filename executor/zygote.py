@@ -0,0 +1,129 @@
+"""Тёплый процесс-зигота: форкает изолированного потомка на каждый запуск кода."""
+import base64
+import io
+import json
+import marshal
+import os
+import socket
+import struct
+import sys
+import threading
+import traceback
+import types
+
+from limits import apply_limits
+
+# Модули, которые часто импортируют в учебных задачах: загружаем один раз,
+# чтобы потомки получали их уже готовыми после fork().
+PRELOAD_MODULES = ('math', 'random', 'collections', 'itertools', 'functools',
+                   'string', 're', 'datetime', 'json')
+
+HEADER = struct.Struct('!I')
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def _run_submission(code, bytecode=None, line_buffered=False):
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, 'rb', closefd=False), encoding='utf-8', errors='ignore')
+    # Построчная буферизация нужна потоковому выполнению: вывод уходит в браузер сразу
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, 'wb', closefd=False), encoding='utf-8', errors='replace',
+                                  line_buffering=line_buffered)
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, 'wb', closefd=False), encoding='utf-8',
+                                  errors='backslashreplace', line_buffering=True)
+    sys.argv = ['-c']
+    sys.path[0] = ''
+
+    main_module = types.ModuleType('__main__')
+    main_module.__builtins__ = __builtins__
+    sys.modules['__main__'] = main_module
+
+    exit_code = 0
+    try:
+        # Байткод уже скомпилирован сервером при предварительной проверке
+        code_object = marshal.loads(bytecode) if bytecode else compile(code, '<string>', 'exec')
+        exec(code_object, main_module.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Пропускаем кадр самой зиготы, чтобы traceback совпадал с `python -c`
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        exit_code = 1
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    return exit_code
+
+
+def _report_status(pid, status_fd):
+    # Ждём потомка и отдаём родителю код завершения и потреблённые ресурсы
+    try:
+        _, status, usage = os.wait4(pid, 0)
+        report = {
+            'exit_code': os.waitstatus_to_exitcode(status),
+            'cpu_time': round(usage.ru_utime + usage.ru_stime, 4),
+            'max_rss_kb': usage.ru_maxrss,
+        }
+        os.write(status_fd, json.dumps(report).encode())
+    except OSError:
+        pass
+    finally:
+        os.close(status_fd)
+
+
+def serve(sock):
+    while True:
+        try:
+            header, fds, _, _ = socket.recv_fds(sock, HEADER.size, 4)
+            if not header:
+                break
+            request = json.loads(_recv_exact(sock, HEADER.unpack(header)[0]).decode('utf-8'))
+        except (EOFError, OSError):
+            break
+
+        stdio_fds, status_fd = fds[:3], fds[3]
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                sock.close()
+                os.close(status_fd)
+                os.setsid()
+                for target, fd in enumerate(stdio_fds):
+                    os.dup2(fd, target)
+                    os.close(fd)
+                apply_limits(request.get('limits'))
+                bytecode = request.get('bytecode')
+                exit_code = _run_submission(request['code'],
+                                            base64.b64decode(bytecode) if bytecode else None,
+                                            request.get('line_buffered', False))
+            finally:
+                os._exit(exit_code)
+
+        for fd in stdio_fds:
+            os.close(fd)
+        threading.Thread(target=_report_status, args=(pid, status_fd), daemon=True).start()
+        sock.sendall(HEADER.pack(pid))
+
+
+if __name__ == '__main__':
+    for name in PRELOAD_MODULES:
+        __import__(name)
+    serve(socket.socket(fileno=int(sys.argv[1])))
@@ -0,0 +1,61 @@
+"""Кэш отрендеренных фрагментов страниц и версии для условных GET.
+
+Фрагмент — общая для всех пользователей часть страницы (текст урока, задание,
+навигация). Ключ включает версию каталога, поэтому после правки контента
+старые фрагменты просто перестают запрашиваться и вытесняются.
+"""
+import collections
+import hashlib
+import os
+import threading
+
+
+def template_fingerprint(folder):
+    """Хэш содержимого всех шаблонов: ETag страниц меняется вместе с вёрсткой после деплоя."""
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def make_etag(*parts):
+    """ETag из версий данных, от которых зависит страница."""
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+class FragmentCache:
+    """LRU: ключ (name, id, version) → Markup."""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        if self.max_entries <= 0:
+            return render()
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        # Рендер вне блокировки: два потока могут отрендерить один фрагмент, результат одинаковый
+        fragment = render()
+        with self._lock:
+            self._entries[key] = fragment
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
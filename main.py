@@ -1,9 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import (Flask, Response, g, render_template, request, redirect, url_for, session, flash, jsonify,
+                   make_response, send_from_directory)
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+from werkzeug.middleware.proxy_fix import ProxyFix
 from db.db import *
+from executor.pool import ExecutorPool
+from executor.backends import LocalBackend, BrokerBackend, ExecutorUnavailable
+from executor.broker import SqliteBroker
+from executor.limits import make_limits, describe_signal
+from executor.jobs import JobScheduler, QueueFull
+from executor.live import LiveRunRegistry, LiveRunLimit
+from executor.grader import grade, reject, HARNESS_CODE
+from executor.precheck import precheck, PrecheckError, FORBIDDEN_MODULES, RESTRICTED_MODULES
+from executor.cache import ResultCache
+from ratelimit import RateLimiter
+from fragments import FragmentCache, make_etag, template_fingerprint
+from assets import AssetManifest
+from metrics import init_metrics, register_collector, observe_job, observe_usage, EXECUTOR_RUN
+import hashlib
 import subprocess
 import sys
 import os
-from datetime import datetime
+import json
+import mimetypes
+import time
+from datetime import datetime, timezone
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -12,97 +33,259 @@ app.config['SESSION_COOKIE_SECURE'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400
 app.config['JSON_AS_ASCII'] = False
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+app.config['EXECUTOR_BACKEND'] = os.environ.get('EXECUTOR_BACKEND', 'local')
+app.config['EXECUTOR_BROKER_PATH'] = os.environ.get('EXECUTOR_BROKER_PATH', os.path.join('db', 'broker.db'))
+app.config['EXECUTOR_BROKER_MAX_PENDING'] = int(os.environ.get('EXECUTOR_BROKER_MAX_PENDING', 100))
+app.config['EXECUTOR_WORKER_TIMEOUT'] = float(os.environ.get('EXECUTOR_WORKER_TIMEOUT', 10))
+app.config['EXECUTOR_POOL_SIZE'] = int(os.environ.get('EXECUTOR_POOL_SIZE', 2))
+app.config['EXECUTOR_MAX_RUNS'] = int(os.environ.get('EXECUTOR_MAX_RUNS', 500))
+app.config['EXECUTOR_JOB_WORKERS'] = int(os.environ.get('EXECUTOR_JOB_WORKERS', 4))
+app.config['EXECUTOR_JOBS_PER_USER'] = int(os.environ.get('EXECUTOR_JOBS_PER_USER', 1))
+app.config['EXECUTOR_MAX_QUEUED'] = int(os.environ.get('EXECUTOR_MAX_QUEUED', 200))
+app.config['EXECUTOR_CPU_SECONDS'] = int(os.environ.get('EXECUTOR_CPU_SECONDS', 5))
+app.config['EXECUTOR_MEMORY_MB'] = int(os.environ.get('EXECUTOR_MEMORY_MB', 256))
+app.config['EXECUTOR_FILE_SIZE_MB'] = float(os.environ.get('EXECUTOR_FILE_SIZE_MB', 1))
+app.config['EXECUTOR_MAX_PROCESSES'] = int(os.environ.get('EXECUTOR_MAX_PROCESSES', 0))
+app.config['EXECUTOR_MAX_OUTPUT_BYTES'] = int(os.environ.get('EXECUTOR_MAX_OUTPUT_BYTES', 65536))
+app.config['EXECUTOR_FORBIDDEN_IMPORTS'] = frozenset(
+    name.strip() for name in os.environ.get('EXECUTOR_FORBIDDEN_IMPORTS', ','.join(sorted(FORBIDDEN_MODULES))).split(',')
+    if name.strip())
+app.config['EXECUTOR_LIVE_TIMEOUT'] = int(os.environ.get('EXECUTOR_LIVE_TIMEOUT', 60))
+app.config['EXECUTOR_LIVE_MAX_RUNS'] = int(os.environ.get('EXECUTOR_LIVE_MAX_RUNS', 20))
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 1000))
+app.config['RESULT_CACHE_TTL'] = int(os.environ.get('RESULT_CACHE_TTL', 3600))
+app.config['RESULT_CACHE_PATH'] = os.environ.get('RESULT_CACHE_PATH')
+app.config['ASSETS_BUILD_ON_START'] = os.environ.get('ASSETS_BUILD_ON_START', '1') == '1'
+app.config['ASSETS_MAX_AGE'] = int(os.environ.get('ASSETS_MAX_AGE', 31536000))
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', 500))
+app.config['AUTH_RATE_LIMIT'] = int(os.environ.get('AUTH_RATE_LIMIT', 10))
+app.config['AUTH_RATE_WINDOW'] = int(os.environ.get('AUTH_RATE_WINDOW', 60))
+# Общий лимит на IP за то же окно: выше, чем на одну учётную запись, чтобы хватило классу за NAT
+app.config['AUTH_IP_RATE_LIMIT'] = int(os.environ.get('AUTH_IP_RATE_LIMIT', 100))
+# Сколько обратных прокси стоит перед приложением: их X-Forwarded-For даёт настоящий IP клиента
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+# Без токена /metrics отвечает только на запросы с localhost
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['PROFILE_SLOW_REQUEST_MS'] = float(os.environ.get('PROFILE_SLOW_REQUEST_MS', 0))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'],
+                            x_proto=app.config['TRUSTED_PROXIES'], x_host=app.config['TRUSTED_PROXIES'])
+
+executor_limits = make_limits(cpu_seconds=app.config['EXECUTOR_CPU_SECONDS'],
+                              memory_mb=app.config['EXECUTOR_MEMORY_MB'],
+                              file_size_mb=app.config['EXECUTOR_FILE_SIZE_MB'],
+                              max_processes=app.config['EXECUTOR_MAX_PROCESSES'])
+if app.config['EXECUTOR_BACKEND'] == 'broker':
+    # Код выполняют воркеры: python -m executor.worker --broker <EXECUTOR_BROKER_PATH>
+    executor_backend = BrokerBackend(SqliteBroker(app.config['EXECUTOR_BROKER_PATH']),
+                                     limits=executor_limits,
+                                     max_output=app.config['EXECUTOR_MAX_OUTPUT_BYTES'],
+                                     max_pending=app.config['EXECUTOR_BROKER_MAX_PENDING'],
+                                     worker_timeout=app.config['EXECUTOR_WORKER_TIMEOUT'])
+else:
+    executor_backend = LocalBackend(ExecutorPool(size=app.config['EXECUTOR_POOL_SIZE'],
+                                                 max_runs=app.config['EXECUTOR_MAX_RUNS'],
+                                                 limits=executor_limits,
+                                                 max_output=app.config['EXECUTOR_MAX_OUTPUT_BYTES']))
+result_cache = ResultCache(max_entries=app.config['RESULT_CACHE_SIZE'],
+                           ttl=app.config['RESULT_CACHE_TTL'],
+                           path=app.config['RESULT_CACHE_PATH'],
+                           context={
+                               'limits': executor_limits,
+                               'max_output': app.config['EXECUTOR_MAX_OUTPUT_BYTES'],
+                               'forbidden_imports': app.config['EXECUTOR_FORBIDDEN_IMPORTS'],
+                               'restricted_modules': RESTRICTED_MODULES,
+                               'harness': hashlib.sha256(HARNESS_CODE.encode('utf-8')).hexdigest(),
+                           })
+
+init_metrics(app, add_connection_hook, add_statement_hook)
+init_db_app(app)
+register_collector('db_pool', get_pool_stats)
+register_collector('result_cache', result_cache.stats)
+register_collector('autosave', get_autosave_stats)
+register_collector('catalog', get_catalog_stats)
+register_collector('executor', executor_backend.stats)
+register_collector('user_context', get_user_context_stats)
+register_collector('password_hasher', get_password_hasher_stats)
+register_collector('leaderboard', get_leaderboard_stats)
+
+fragment_cache = FragmentCache(max_entries=app.config['FRAGMENT_CACHE_SIZE'])
+register_collector('fragments', fragment_cache.stats)
+TEMPLATES_VERSION = template_fingerprint(os.path.join(app.root_path, app.template_folder))
+
+static_assets = AssetManifest(app.static_folder)
+if app.config['ASSETS_BUILD_ON_START']:
+    static_assets.build()
+else:
+    static_assets.load()
+
+@app.template_global()
+def asset_url(filename):
+    """Как url_for('static', filename=...), но для собранных файлов — имя с хэшем содержимого"""
+    hashed = static_assets.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('static_asset', filename=hashed)
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    if not static_assets.is_built(filename):
+        return jsonify({'error': 'Файл не найден'}), 404
+    path, encoding = static_assets.variant(filename, request.accept_encodings)
+    response = send_from_directory(static_assets.dist, path, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=app.config['ASSETS_MAX_AGE'])
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+auth_rate_limiter = RateLimiter(limit=app.config['AUTH_RATE_LIMIT'], window=app.config['AUTH_RATE_WINDOW'])
+register_collector('auth_rate_limit', auth_rate_limiter.stats)
+auth_ip_rate_limiter = RateLimiter(limit=app.config['AUTH_IP_RATE_LIMIT'], window=app.config['AUTH_RATE_WINDOW'])
+register_collector('auth_ip_rate_limit', auth_ip_rate_limiter.stats)
+
+@app.before_request
+def load_current_user():
+    # Контекст пользователя загружается один раз на запрос и берётся из кэша
+    g.user = None
+    if 'id' in session:
+        g.user = get_user_context(session['id'])
+        if g.user is None:
+            session.clear()
+
+@app.context_processor
+def inject_current_user():
+    return {'current_user': g.get('user')}
 
 def login_required(f):
     from functools import wraps
     
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'id' not in session:
+        if g.get('user') is None:
             flash('Для доступа к этой странице необходимо войти в систему.', 'error')
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     
     return decorated_function
 
-def execute_python_code(code, user_input=""):
+def teacher_required(f):
+    from functools import wraps
+    
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not g.user.get('is_teacher'):
+            flash('Эта страница доступна только преподавателям.', 'error')
+            return redirect(url_for('index'))
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+# Результаты, зависящие от нагрузки, а не от кода: их не кэшируем
+UNSTABLE_PREFIXES = ("Ошибка: время выполнения", "Ошибка: исполнител", "Системная ошибка")
+
+def is_stable_result(result):
+    return not result['output'].startswith(UNSTABLE_PREFIXES)
+
+def execute_python_code(code, user_input="", use_cache=True):
+    return execute_python_code_with_usage(code, user_input, use_cache)['output']
+
+def execute_python_code_with_usage(code, user_input="", use_cache=True):
+    return result_cache.get_or_run(code, user_input, lambda: run_python_code(code, user_input),
+                                   use_cache=use_cache, store=is_stable_result)
+
+def run_python_code(code, user_input=""):
+    start = time.perf_counter()
     try:
-        process = subprocess.Popen(
-            [sys.executable, '-c', code],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
-        )
-        
-        try:
-            stdout, stderr = process.communicate(input=user_input, timeout=5)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            stdout, stderr = process.communicate()
-            return "Ошибка: время выполнения кода истекло (максимум 5 секунд)"
-        
-        if stderr:
-            error_lines = []
-            for line in stderr.split('\n'):
-                if line and not any(x in line.lower() for x in ['warning', 'deprecation']):
-                    error_lines.append(line)
-            
-            if error_lines:
-                return f"Ошибка выполнения:\n{''.join(error_lines[:5])}"
+        bytecode = precheck(code, app.config['EXECUTOR_FORBIDDEN_IMPORTS'])
+    except PrecheckError as e:
+        # Код не запускаем вовсе: ошибку видно уже при компиляции
+        EXECUTOR_RUN.observe(time.perf_counter() - start, 'precheck')
+        return {'output': f"Ошибка компиляции:\n{e.message}", 'usage': None,
+                'error_location': e.location()}
+    
+    try:
+        result = _run_python_code(code, user_input, bytecode)
+    finally:
+        EXECUTOR_RUN.observe(time.perf_counter() - start, 'run')
+    observe_usage(result['usage'])
+    return result
+
+def _run_python_code(code, user_input="", bytecode=None):
+    try:
+        result = executor_backend.run_with_usage(code, user_input, timeout=5, bytecode=bytecode)
+        usage = result.usage()
+        if result.timed_out:
+            return {'output': "Ошибка: время выполнения кода истекло (максимум 5 секунд)", 'usage': usage}
         
-        return stdout.strip() if stdout else "(нет вывода)"
+        output = format_run_output(result)
+        if result.truncated:
+            output += f"\n... (вывод обрезан до {app.config['EXECUTOR_MAX_OUTPUT_BYTES']} байт)"
+        return {'output': output, 'usage': usage}
         
+    except ExecutorUnavailable as e:
+        return {'output': f"Ошибка: {e}", 'usage': None}
     except Exception as e:
-        return f"Системная ошибка: {str(e)}"
+        return {'output': f"Системная ошибка: {str(e)}", 'usage': None}
 
-def get_user_progress_summary(id):
-    conn = get_db_connection()
-    
-    stats = conn.execute('''
-        SELECT 
-            COUNT(DISTINCT l.id) as total_lessons,
-            COUNT(DISTINCT up.lesson_id) as completed_lessons,
-            COALESCE(SUM(up.score), 0) as total_score,
-            u.experience,
-            u.level
-        FROM lessons l
-        CROSS JOIN users u
-        LEFT JOIN user_progress up ON l.id = up.lesson_id AND up.user_id = ?
-        WHERE u.id = ?
-        GROUP BY u.id
-    ''', (id, id)).fetchone()
-    
-    conn.close()
-    
-    if stats:
-        progress_percent = (stats['completed_lessons'] / stats['total_lessons'] * 100) if stats['total_lessons'] > 0 else 0
-        return {
-            'total_lessons': stats['total_lessons'],
-            'completed_lessons': stats['completed_lessons'],
-            'progress_percent': round(progress_percent, 1),
-            'total_score': stats['total_score'],
-            'experience': stats['experience'],
-            'level': stats['level']
-        }
+def format_run_output(result):
+    stdout, stderr = result.stdout, result.stderr
+    if result.signal and not result.truncated:
+        return f"Ошибка выполнения:\n{describe_signal(result.signal)}"
+    
+    if stderr:
+        error_lines = []
+        for line in stderr.split('\n'):
+            if line and not any(x in line.lower() for x in ['warning', 'deprecation']):
+                error_lines.append(line)
+        
+        if error_lines:
+            return f"Ошибка выполнения:\n{''.join(error_lines[:5])}"
     
-    return None
+    return stdout.strip() if stdout else "(нет вывода)"
 
 @app.route('/')
 def index():
     courses = get_all_courses()
     user_stats = None
     
-    if 'id' in session:
-        user_stats = get_user_progress_summary(session['id'])
+    if g.user:
+        user_stats = g.user['progress_summary']
     
     return render_template('index.html', 
                          courses=courses, 
                          user_stats=user_stats,
                          username=session.get('username'))
 
+def auth_rate_key(identifier):
+    # Неудачные попытки считаются по паре (IP, логин): класс за одним NAT не блокирует сам себя,
+    # а подбор пароля к одной учётной записи ограничен
+    return f"{request.remote_addr or 'unknown'}:{identifier.lower()}"
+
+def auth_rate_checks(key):
+    # Пара (IP, логин) и сам IP с более высоким лимитом: иначе с одного адреса можно
+    # перебирать учётные записи, по одной попытке на каждую
+    return ((auth_rate_limiter, key), (auth_ip_rate_limiter, request.remote_addr or 'unknown'))
+
+def auth_rate_limit(template, key):
+    for limiter, limiter_key in auth_rate_checks(key):
+        if limiter.is_limited(limiter_key):
+            flash('Слишком много попыток, попробуйте позже.', 'error')
+            response = app.make_response((render_template(template), 429))
+            response.headers['Retry-After'] = str(limiter.retry_after(limiter_key))
+            return response
+    return None
+
+def auth_rate_hit(key):
+    for limiter, limiter_key in auth_rate_checks(key):
+        limiter.hit(limiter_key)
+
 @app.route('/signup', methods=['GET', 'POST'])
 def signup():
     if 'id' in session:
@@ -121,16 +304,29 @@ def signup():
             flash('Пароль должен содержать минимум 6 символов.', 'error')
             return render_template('auth/signup.html')
         
-        user = create_user(username, email, password)
+        rate_key = auth_rate_key(username)
+        limited = auth_rate_limit('auth/signup.html', rate_key)
+        if limited:
+            return limited
+        
+        try:
+            user_id = create_user(username, email, password)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'error')
+            return render_template('auth/signup.html'), 503
 
-        if user:
+        if user_id:
+            # Каждая регистрация расходует лимит IP, иначе новые имена можно перебирать без конца
+            auth_ip_rate_limiter.hit(request.remote_addr or 'unknown')
             flash('Регистрация успешна!', 'success')
-            session['id'] = user['id']
-            session['username'] = user['username']
-            session['email'] = user['email']
+            session.regenerate()
+            session['id'] = user_id
+            session['username'] = username
+            session['email'] = email
             session.permanent = True
             return redirect(url_for('index'))
         else:
+            auth_rate_hit(rate_key)
             flash('Пользователь с таким именем или email уже существует.', 'error')
     
     return render_template('auth/signup.html')
@@ -144,9 +340,22 @@ def login():
         email = request.form.get('email', '').strip()
         password = request.form.get('password', '')
         
+        rate_key = auth_rate_key(email)
+        limited = auth_rate_limit('auth/login.html', rate_key)
+        if limited:
+            return limited
+        
         user = get_user_by_email(email)
         
-        if user and verify_password(user, password):
+        try:
+            verified = bool(user) and verify_password(user, password)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'error')
+            return render_template('auth/login.html'), 503
+        
+        if verified:
+            auth_rate_limiter.reset(rate_key)
+            session.regenerate()
             session['id'] = user['id']
             session['username'] = user['username']
             session['email'] = user['email']
@@ -161,6 +370,7 @@ def login():
             flash(f'Добро пожаловать, {user["username"]}!', 'success')
             return redirect(url_for('index'))
         else:
+            auth_rate_hit(rate_key)
             flash('Неверное имя пользователя или пароль.', 'error')
     
     return render_template('auth/login.html')
@@ -174,28 +384,64 @@ def logout():
 @app.route('/courses')
 @login_required
 def courses():
-    print(f"[DEBUG] Запрос /courses от пользователя {session['id']}")
-    
     courses_list = get_all_courses()
-    print(f"[DEBUG] Получено курсов из БД: {len(courses_list)}")
     
     if not courses_list:
-        print("[DEBUG] Нет курсов в БД! Показываем заглушку")
         return render_template('courses.html', 
                              courses=[], 
                              user_progress={})
     
-    user_progress = {}
-    
-    for course in courses_list:
-        print(f"[DEBUG] Получаем прогресс для курса {course['id']}: {course['title']}")
-        progress = get_user_progress(session['id'], course['id'])
-        user_progress[course['id']] = progress
+    summaries = get_user_course_summaries(session['id'], [course['id'] for course in courses_list])
+    user_progress = {course_id: summary for course_id, summary in summaries.items()
+                     if summary['total_lessons'] > 0}
     
     return render_template('courses.html', 
                          courses=courses_list, 
                          user_progress=user_progress)
 
+def render_fragment(template, name, object_id, **context):
+    """Общая для всех пользователей часть страницы, кэшируется до изменения каталога"""
+    key = (name, object_id, get_catalog().version)
+    return fragment_cache.get(key, lambda: Markup(render_template(template, **context)))
+
+def conditional_page(name, object_id, render):
+    """Страница пользователя с ETag и Last-Modified.
+    
+    Оба строятся из версий каталога и прогресса пользователя, прочитанных из БД одним запросом
+    по первичным ключам: кэши процесса (снимок каталога, g.user) в другом процессе gunicorn
+    могут отставать. На повторный визит отвечаем 304, не вызывая render().
+    """
+    versions = get_page_versions(session['id'])
+    if get_catalog().version != versions['catalog_version']:
+        invalidate_catalog()
+    progress = g.user['progress_summary'] or {}
+    if progress.get('version', 0) != versions['progress_version']:
+        # Прогресс изменил другой процесс: страница не должна собираться из устаревшего контекста
+        invalidate_user_context(session['id'])
+        g.user = get_user_context(session['id'])
+    etag = make_etag(TEMPLATES_VERSION, static_assets.version, name, object_id, session['id'],
+                     versions['catalog_version'], versions['progress_version'])
+    last_modified = max(parse_db_timestamp(versions['catalog_updated_at']),
+                        parse_db_timestamp(versions['progress_updated_at']))
+    
+    # Флеш-сообщение показывается один раз: страницу с ним нельзя заменить копией из кэша браузера
+    if '_flashes' not in session and not is_resource_modified(request.environ, etag=etag,
+                                                             last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def parse_db_timestamp(value):
+    # CURRENT_TIMESTAMP в SQLite — UTC без зоны
+    if not value:
+        return datetime.fromtimestamp(0, timezone.utc)
+    return datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc)
+
 @app.route('/course/<int:course_id>')
 @login_required
 def course_detail(course_id):
@@ -206,32 +452,35 @@ def course_detail(course_id):
         flash('Курс не найден.', 'error')
         return redirect(url_for('courses'))
     
-    progress_data = get_user_progress(session['id'], course_id)
+    def render():
+        progress_data = get_user_progress(session['id'], course_id)
+        return render_template('course_detail.html',
+                             course=course_data,
+                             progress=progress_data)
     
-    return render_template('course_detail.html',
-                         course=course_data,
-                         progress=progress_data)
+    return conditional_page('course', course_id, render)
 
 @app.route('/lesson/<int:lesson_id>')
 @login_required
 def lesson(lesson_id):
-    lesson_data = get_lesson(lesson_id)
+    context = get_lesson_context(lesson_id)
     
-    if not lesson_data:
+    if not context:
         flash('Урок не найден.', 'error')
         return redirect(url_for('courses'))
-    conn = get_db_connection()
-    module = conn.execute('SELECT * FROM modules WHERE id = ?', 
-                         (lesson_data['module_id'],)).fetchone()
-    course = conn.execute('SELECT * FROM courses WHERE id = ?', 
-                         (module['course_id'],)).fetchone()
-    exercise = get_exercise_for_lesson(lesson_id)
-    conn.close()
+    
+    return conditional_page('lesson', lesson_id, lambda: render_lesson(lesson_id, context))
+
+def render_lesson(lesson_id, context):
+    lesson_data = context['lesson']
+    module = context['module']
+    course = context['course']
+    exercise = context['exercise']
     
     conn = get_db_connection()
     progress = conn.execute('''
         SELECT completed FROM user_progress 
-        WHERE id = ? AND lesson_id = ?
+        WHERE user_id = ? AND lesson_id = ?
     ''', (session['id'], lesson_id)).fetchone()
     conn.close()
     lesson_completed = bool(progress and progress['completed'])
@@ -241,30 +490,22 @@ def lesson(lesson_id):
     starter_code = exercise.get('starter_code', '')
     question = exercise.get('question', '')
     
-    conn = get_db_connection()
-    next_lesson = conn.execute('''
-        SELECT id, title FROM lessons 
-        WHERE module_id = ? AND order_index > ? 
-        ORDER BY order_index LIMIT 1
-    ''', (lesson_data['module_id'], lesson_data['order_index'])).fetchone()
-    
-    prev_lesson = conn.execute('''
-        SELECT id, title FROM lessons 
-        WHERE module_id = ? AND order_index < ? 
-        ORDER BY order_index DESC LIMIT 1
-    ''', (lesson_data['module_id'], lesson_data['order_index'])).fetchone()
-    conn.close()
+    lesson_content = render_fragment('fragments/lesson_content.html', 'lesson', lesson_id,
+                                     lesson=lesson_data,
+                                     test_cases=test_cases,
+                                     question=question,
+                                     next_lesson=context['next_lesson'],
+                                     prev_lesson=context['prev_lesson'])
     
     return render_template('lesson.html',
                          lesson=lesson_data,
+                         lesson_content=lesson_content,
+                         course=course,
                          module_title=module['title'],
                          course_title=course['title'],
                          lesson_completed=lesson_completed,
                          test_cases=test_cases,
-                         starter_code=starter_code,
-                         question=question,
-                         next_lesson=next_lesson,
-                         prev_lesson=prev_lesson)
+                         starter_code=starter_code)
 
 @app.route('/lesson/<int:lesson_id>/complete', methods=['POST'])
 @login_required
@@ -283,6 +524,8 @@ def complete_lesson(lesson_id):
             code_submission=code_submission if code_submission else None,
             completed=True
         )
+        if success and code_submission:
+            save_submission(session['id'], lesson_id, code_submission, 'completed')
         
         if success:
             flash('Урок успешно завершен!', 'success')
@@ -315,86 +558,303 @@ def complete_lesson(lesson_id):
         flash(f'Ошибка: {str(e)}', 'error')
         return redirect(url_for('lesson', lesson_id=lesson_id))
 
-@app.route('/api/execute', methods=['POST'])
-@login_required
-def execute_code():
+def execution_result(code, user_input="", use_cache=True):
+    result = execute_python_code_with_usage(code, user_input, use_cache)
+    return {
+        'success': not result['output'].startswith('Ошибка'),
+        'output': result['output'],
+        'usage': result['usage'],
+        'error_location': result.get('error_location'),
+        'timestamp': datetime.now().isoformat()
+    }
+
+job_scheduler = JobScheduler(execution_result,
+                             workers=app.config['EXECUTOR_JOB_WORKERS'],
+                             per_user_limit=app.config['EXECUTOR_JOBS_PER_USER'],
+                             max_queued=app.config['EXECUTOR_MAX_QUEUED'],
+                             on_complete=observe_job)
+register_collector('jobs', job_scheduler.stats)
+
+def parse_execute_request():
     if not request.is_json:
-        return jsonify({'error': 'Content-Type должен быть application/json'}), 400
+        return None, (jsonify({'error': 'Content-Type должен быть application/json'}), 400)
     
     data = request.get_json()
     code = data.get('code', '')
     user_input = data.get('input', '')
+    use_cache = bool(data.get('cache', True))
     
     if not code:
-        return jsonify({'error': 'Код не может быть пустым'}), 400
+        return None, (jsonify({'error': 'Код не может быть пустым'}), 400)
     
     if len(code) > 10000:
-        return jsonify({'error': 'Код слишком длинный (максимум 10000 символов)'}), 400
+        return None, (jsonify({'error': 'Код слишком длинный (максимум 10000 символов)'}), 400)
+    
+    return (code, user_input, use_cache), None
+
+@app.route('/api/execute', methods=['POST'])
+@login_required
+def execute_code():
+    args, error = parse_execute_request()
+    if error:
+        return error
     
-    result = execute_python_code(code, user_input)
+    return jsonify(execution_result(*args))
+
+@app.route('/api/execute/jobs', methods=['POST'])
+@login_required
+def submit_execute_job():
+    args, error = parse_execute_request()
+    if error:
+        return error
+    
+    try:
+        job = job_scheduler.submit(session['id'], *args)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
     
     return jsonify({
-        'success': not result.startswith('Ошибка'),
-        'output': result,
-        'timestamp': datetime.now().isoformat()
-    })
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': url_for('get_execute_job', job_id=job.id),
+        'stream_url': url_for('stream_execute_job', job_id=job.id)
+    }), 202
+
+@app.route('/api/execute/jobs/<job_id>')
+@login_required
+def get_execute_job(job_id):
+    job = job_scheduler.get(job_id, session['id'])
+    if not job:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    
+    wait = min(request.args.get('wait', 0, type=float), 10)
+    if wait > 0:
+        job.wait(wait)
+    
+    return jsonify(job.to_dict())
+
+@app.route('/api/execute/jobs/<job_id>/stream')
+@login_required
+def stream_execute_job(job_id):
+    job = job_scheduler.get(job_id, session['id'])
+    if not job:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    
+    def events():
+        last_status = None
+        while True:
+            finished = job.wait(15)
+            if job.status != last_status or finished:
+                last_status = job.status
+                event = 'result' if finished else 'status'
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if finished:
+                break
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+live_runs = LiveRunRegistry(max_runs=app.config['EXECUTOR_LIVE_MAX_RUNS'])
+register_collector('live_runs', live_runs.stats)
+
+def live_exit_message(result):
+    if result['cancelled']:
+        return "Выполнение остановлено"
+    if result['timed_out']:
+        return f"Ошибка: время выполнения кода истекло (максимум {app.config['EXECUTOR_LIVE_TIMEOUT']} секунд)"
+    if result['truncated']:
+        return f"... (вывод обрезан до {app.config['EXECUTOR_MAX_OUTPUT_BYTES']} байт)"
+    if result['exit_code'] is not None and result['exit_code'] < 0:
+        return f"Ошибка выполнения:\n{describe_signal(-result['exit_code'])}"
+    return None
+
+@app.route('/api/execute/live', methods=['POST'])
+@login_required
+def start_live_run():
+    args, error = parse_execute_request()
+    if error:
+        return error
+    code, user_input, _ = args
+    
+    if not hasattr(executor_backend, 'spawn'):
+        return jsonify({'error': 'Потоковое выполнение недоступно'}), 501
+    
+    try:
+        bytecode = precheck(code, app.config['EXECUTOR_FORBIDDEN_IMPORTS'])
+    except PrecheckError as e:
+        return jsonify({
+            'success': False,
+            'output': f"Ошибка компиляции:\n{e.message}",
+            'error_location': e.location()
+        })
+    
+    try:
+        run = live_runs.start(session['id'], lambda: executor_backend.spawn(code, bytecode),
+                              timeout=app.config['EXECUTOR_LIVE_TIMEOUT'],
+                              max_output=app.config['EXECUTOR_MAX_OUTPUT_BYTES'])
+    except LiveRunLimit as e:
+        return jsonify({'error': str(e)}), 429
+    
+    if user_input:
+        run.write_input(user_input if user_input.endswith('\n') else user_input + '\n')
+    if not request.get_json().get('interactive', True):
+        run.close_input()
+    
+    return jsonify({
+        'run_id': run.id,
+        'stream_url': url_for('stream_live_run', run_id=run.id),
+        'input_url': url_for('send_live_input', run_id=run.id),
+        'cancel_url': url_for('cancel_live_run', run_id=run.id)
+    }), 201
+
+@app.route('/api/execute/live/<run_id>/stream')
+@login_required
+def stream_live_run(run_id):
+    run = live_runs.get(run_id, session['id'])
+    if not run:
+        return jsonify({'error': 'Запуск не найден'}), 404
+    
+    def events():
+        finished = False
+        try:
+            for item in run.iter_events():
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event, data = item
+                if event == 'exit':
+                    finished = True
+                    observe_usage(data)
+                    data = dict(data, message=live_exit_message(data))
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            # Клиент ушёл, не дождавшись конца: программу никто не слушает
+            if not finished:
+                run.cancel()
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/execute/live/<run_id>/input', methods=['POST'])
+@login_required
+def send_live_input(run_id):
+    run = live_runs.get(run_id, session['id'])
+    if not run:
+        return jsonify({'error': 'Запуск не найден'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    if data.get('eof'):
+        run.close_input()
+        return jsonify({'ok': True})
+    
+    text = data.get('text', '')
+    if len(text) > 4096:
+        return jsonify({'error': 'Слишком длинный ввод (максимум 4096 символов)'}), 413
+    if run.finished or not run.write_input(text):
+        return jsonify({'error': 'Программа не принимает ввод'}), 409
+    return jsonify({'ok': True})
+
+@app.route('/api/execute/live/<run_id>', methods=['DELETE'])
+@login_required
+def cancel_live_run(run_id):
+    run = live_runs.get(run_id, session['id'])
+    if not run:
+        return jsonify({'error': 'Запуск не найден'}), 404
+    run.cancel()
+    return jsonify({'ok': True})
 
 @app.route('/api/lesson/<int:lesson_id>/tests')
 @login_required
 def get_lesson_tests(lesson_id):
-    test_cases = [
-        {"input": "5\n3", "output": "8", "description": "Тест 1"},
-        {"input": "10\n-2", "output": "8", "description": "Тест 2"},
-        {"input": "0\n0", "output": "0", "description": "Тест 3"}
-    ]
+    exercise = get_exercise_for_lesson(lesson_id)
+    test_cases = exercise['test_cases'] if exercise else []
     
     return jsonify({
         'lesson_id': lesson_id,
         'test_cases': test_cases
     })
 
+def grade_submission(code, test_cases, stop_on_failure=False, use_cache=True):
+    cache_input = json.dumps([test_cases, stop_on_failure], ensure_ascii=False, sort_keys=True)
+    return result_cache.get_or_run(
+        code, cache_input,
+        lambda: _grade_submission(code, test_cases, stop_on_failure),
+        namespace='grade', use_cache=use_cache,
+        store=lambda report: all(case['error'] is None or
+                                 ('истекло' not in case['error'] and not case['error'].startswith(UNSTABLE_PREFIXES))
+                                 for case in report['cases']))
+
+def _grade_submission(code, test_cases, stop_on_failure=False):
+    try:
+        bytecode = precheck(code, app.config['EXECUTOR_FORBIDDEN_IMPORTS'])
+    except PrecheckError as e:
+        return reject(test_cases, e.message)
+    return grade(executor_backend, code, test_cases, stop_on_failure=stop_on_failure, bytecode=bytecode)
+
+def grade_and_record(user_id, lesson_id, code, test_cases, stop_on_failure=False, use_cache=True):
+    report = grade_submission(code, test_cases, stop_on_failure, use_cache)
+    record_check_attempt(user_id, lesson_id, code, report['passed'], report['passed_count'], report['total'])
+    return report
+
+@app.route('/api/lesson/<int:lesson_id>/check', methods=['POST'])
+@login_required
+def check_lesson_code(lesson_id):
+    args, error = parse_execute_request()
+    if error:
+        return error
+    
+    exercise = get_exercise_for_lesson(lesson_id)
+    if not exercise or not exercise['test_cases']:
+        return jsonify({'error': 'Для этого урока нет тестов'}), 404
+    
+    stop_on_failure = bool(request.get_json().get('stop_on_failure', False))
+    try:
+        job = job_scheduler.submit(session['id'], session['id'], lesson_id, args[0], exercise['test_cases'],
+                                   stop_on_failure, args[2], handler=grade_and_record)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': url_for('get_execute_job', job_id=job.id),
+        'stream_url': url_for('stream_execute_job', job_id=job.id)
+    }), 202
+
+@app.route('/api/lesson/<int:lesson_id>/submissions')
+@login_required
+def lesson_submissions(lesson_id):
+    """История попыток пользователя по уроку, от новых к старым, страницами по limit"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    before = request.args.get('before', type=int)
+    submissions = get_submission_history(session['id'], lesson_id, before, limit + 1)
+    next_url = None
+    if len(submissions) > limit:
+        submissions = submissions[:limit]
+        next_url = url_for('lesson_submissions', lesson_id=lesson_id, before=submissions[-1]['attempt'], limit=limit)
+    for submission in submissions:
+        submission['code_url'] = url_for('lesson_submission', lesson_id=lesson_id, attempt=submission['attempt'])
+    return jsonify({'submissions': submissions, 'next': next_url})
+
+@app.route('/api/lesson/<int:lesson_id>/submissions/<int:attempt>')
+@login_required
+def lesson_submission(lesson_id, attempt):
+    submission = get_submission_code(session['id'], lesson_id, attempt)
+    if not submission:
+        return jsonify({'error': 'Попытка не найдена'}), 404
+    return jsonify(submission)
+
 @app.route('/profile')
 @login_required
 def profile():
-    user_data = get_user_profile(session['id'])
-    
-    if not user_data:
-        flash('Профиль не найден.', 'error')
-        return redirect(url_for('index'))
-    progress_stats = get_user_progress_summary(session['id'])
+    user_data = g.user
+    progress_stats = user_data['progress_summary']
+    active_course_ids = {course['id'] for course in get_all_courses()}
+    courses_progress = [summary for course_id, summary in get_user_course_summaries(session['id']).items()
+                        if course_id in active_course_ids]
     conn = get_db_connection()
-    courses = conn.execute('''
-        SELECT c.* FROM courses c
-        JOIN user_progress up ON EXISTS (
-            SELECT 1 FROM lessons l 
-            JOIN modules m ON l.module_id = m.id 
-            WHERE m.course_id = c.id AND up.lesson_id = l.id AND up.user_id = ?
-        )
-        WHERE c.is_active = TRUE
-        GROUP BY c.id
-    ''', (session['id'],)).fetchall()
-    
-    courses_progress = []
-    for course in courses:
-        progress = conn.execute('''
-            SELECT 
-                COUNT(DISTINCT l.id) as total_lessons,
-                COUNT(DISTINCT up.lesson_id) as completed_lessons
-            FROM lessons l
-            JOIN modules m ON l.module_id = m.id
-            LEFT JOIN user_progress up ON l.id = up.lesson_id AND up.user_id = ? AND up.completed = TRUE
-            WHERE m.course_id = ?
-        ''', (session['id'], course['id'])).fetchone()
-        
-        if progress:
-            progress_percent = (progress['completed_lessons'] / progress['total_lessons'] * 100) if progress['total_lessons'] > 0 else 0
-            courses_progress.append({
-                'id': course['id'],
-                'title': course['title'],
-                'total_lessons': progress['total_lessons'],
-                'completed_lessons': progress['completed_lessons'],
-                'progress_percent': round(progress_percent, 1)
-            })
     recent_lessons = conn.execute('''
         SELECT l.title, up.completed_at, m.title as module_title, up.completed
         FROM user_progress up
@@ -405,12 +865,74 @@ def profile():
         LIMIT 10
     ''', (session['id'],)).fetchall()
     conn.close()
+    ranking = get_leaderboard(resolve_leaderboard('global'), session['id'], limit=0)
     return render_template('profile.html',
                          user=user_data,
+                         ranking=ranking,
                          progress_stats=progress_stats,
                          courses_progress=courses_progress,
                          recent_lessons=recent_lessons)
 
+@app.route('/api/search')
+@login_required
+def search_api():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': 'Пустой запрос'}), 400
+    if len(text) > 200:
+        return jsonify({'error': 'Слишком длинный запрос (максимум 200 символов)'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    
+    results = search_catalog(text, limit)
+    for result in results:
+        result['url'] = url_for('lesson', lesson_id=result['lesson_id'])
+    return jsonify({'query': text, 'results': results})
+
+@app.route('/teacher')
+@teacher_required
+def teacher_dashboard():
+    courses_list = get_all_courses()
+    course_id = request.args.get('course_id', type=int)
+    if course_id not in {course['id'] for course in courses_list}:
+        course_id = courses_list[0]['id'] if courses_list else None
+    
+    activity = get_activity(days=30)
+    return render_template('teacher.html',
+                         courses=courses_list,
+                         course_id=course_id,
+                         funnel=get_course_funnel(course_id) if course_id else None,
+                         hardest=get_hardest_exercises(limit=10),
+                         activity=activity,
+                         max_active=max((day['active_users'] for day in activity), default=0))
+
+LEADERBOARD_KINDS = {'global': 'За всё время', 'week': 'За неделю', 'course': 'По курсу'}
+
+@app.route('/leaderboard')
+@login_required
+def leaderboard():
+    kind = request.args.get('kind', 'global')
+    if kind not in LEADERBOARD_KINDS:
+        kind = 'global'
+    courses_list = get_all_courses()
+    course_id = request.args.get('course_id', type=int)
+    if kind == 'course' and course_id not in {course['id'] for course in courses_list}:
+        course_id = courses_list[0]['id'] if courses_list else None
+    
+    board = get_leaderboard(resolve_leaderboard(kind, course_id), session['id'])
+    return render_template('leaderboard.html',
+                         kinds=LEADERBOARD_KINDS,
+                         kind=kind,
+                         courses=courses_list,
+                         course_id=course_id,
+                         board=board)
+
+@app.route('/api/leaderboard')
+@login_required
+def leaderboard_api():
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+    board = resolve_leaderboard(request.args.get('kind', 'global'), request.args.get('course_id', type=int))
+    return jsonify(get_leaderboard(board, session['id'], limit=limit))
+
 #Обработчики ошибок есть, но html страницы не написаны
 @app.errorhandler(404)
 def page_not_found(error):
@@ -432,32 +954,19 @@ def save_lesson_code(lesson_id):
     if not code:
         return jsonify({'error': 'Code is empty'}), 400
     
-    conn = get_db_connection()
-    conn.execute('''
-        INSERT OR REPLACE INTO user_progress 
-        (user_id, lesson_id, code_submission, completed)
-        VALUES (?, ?, ?, ?)
-    ''', (session['id'], lesson_id, code, False))
-    
-    conn.commit()
-    conn.close()
+    save_code_draft(session['id'], lesson_id, code)
     
     return jsonify({'success': True, 'message': 'Код сохранён'})
 
 @app.route('/api/lesson/<int:lesson_id>/get-code', methods=['GET'])
 @login_required
 def get_saved_code(lesson_id):
-    conn = get_db_connection()
-    progress = conn.execute('''
-        SELECT code_submission FROM user_progress 
-        WHERE user_id = ? AND lesson_id = ?
-    ''', (session['id'], lesson_id)).fetchone()
-    conn.close()
+    code = get_code_draft(session['id'], lesson_id)
     
-    if progress and progress['code_submission']:
+    if code:
         return jsonify({
             'success': True,
-            'code': progress['code_submission']
+            'code': code
         })
     
     return jsonify({'success': False, 'code': ''})
@@ -0,0 +1,245 @@
+"""Метрики приложения в формате Prometheus и профилирование медленных запросов."""
+import cProfile
+import os
+import threading
+import time
+
+from flask import Response, abort, before_render_template, g, request, template_rendered
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, label_values, ('le', bound))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.labels, label_values, ('le', '+Inf'))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram('pyway_http_request_duration_seconds',
+                             'Время обработки HTTP-запроса', ('endpoint', 'method', 'status'))
+SQL_STATEMENTS = Histogram('pyway_sql_statements_per_request', 'Число SQL-запросов на HTTP-запрос',
+                           ('endpoint',), buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+SQL_DURATION = Histogram('pyway_sql_statement_duration_seconds', 'Время выполнения SQL-запроса')
+TEMPLATE_DURATION = Histogram('pyway_template_render_seconds', 'Время рендеринга шаблона', ('template',))
+EXECUTOR_QUEUE = Histogram('pyway_executor_queue_seconds', 'Время ожидания задачи в очереди')
+EXECUTOR_RUN = Histogram('pyway_executor_run_seconds', 'Время выполнения пользовательского кода', ('kind',))
+EXECUTOR_CPU = Histogram('pyway_executor_cpu_seconds', 'Процессорное время пользовательского кода',
+                         buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+EXECUTOR_MEMORY = Histogram('pyway_executor_max_rss_bytes', 'Пиковая память процесса с пользовательским кодом',
+                            buckets=tuple(mb * 1024 * 1024 for mb in (16, 32, 64, 128, 256, 512)))
+EXECUTOR_TRUNCATED = Counter('pyway_executor_truncated_output_total', 'Запуски с обрезанным выводом')
+SLOW_REQUESTS = Counter('pyway_slow_requests_total', 'Запросы дольше порога профилирования', ('endpoint',))
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+_local = threading.local()
+_collectors = []
+# С Python 3.12 в процессе может работать только один cProfile.Profile: enable() второго
+# бросает ValueError. Профилируется один запрос за раз, остальные в это время пропускаются
+_profiler_lock = threading.Lock()
+
+
+def register_collector(prefix, collect):
+    """collect() возвращает словарь числовых показателей, они публикуются как gauge."""
+    _collectors.append((prefix, collect))
+
+
+def _trace_statement(statement):
+    if getattr(_local, 'active', False):
+        _local.sql_count += 1
+
+
+def _time_statement(sql, elapsed):
+    SQL_DURATION.observe(elapsed)
+
+
+def request_sql_count():
+    """Число SQL-запросов последнего запроса в текущем потоке"""
+    return getattr(_local, 'sql_count', 0)
+
+
+def install_sql_tracing(conn):
+    conn.set_trace_callback(_trace_statement)
+
+
+def observe_job(job):
+    EXECUTOR_QUEUE.observe(job.started_at - job.created_at)
+    EXECUTOR_RUN.observe(job.finished_at - job.started_at, 'job')
+
+
+def observe_usage(usage):
+    if not usage:
+        return
+    if usage.get('cpu_time') is not None:
+        EXECUTOR_CPU.observe(usage['cpu_time'])
+    if usage.get('max_rss_kb') is not None:
+        EXECUTOR_MEMORY.observe(usage['max_rss_kb'] * 1024)
+    if usage.get('truncated'):
+        EXECUTOR_TRUNCATED.inc()
+
+
+def render_metrics():
+    lines = []
+    for metric in (REQUEST_DURATION, SQL_STATEMENTS, SQL_DURATION, TEMPLATE_DURATION,
+                   EXECUTOR_QUEUE, EXECUTOR_RUN, EXECUTOR_CPU, EXECUTOR_MEMORY, EXECUTOR_TRUNCATED,
+                   SLOW_REQUESTS):
+        lines.extend(metric.render())
+    for prefix, collect in _collectors:
+        for key, value in collect().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f'pyway_{prefix}_{key}'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, add_connection_hook, add_statement_hook):
+    """Подключает сбор метрик к приложению и маршрут /metrics.
+
+    PROFILE_SLOW_REQUEST_MS — порог, после которого профиль запроса сохраняется
+    в PROFILE_DIR (файлы .pstats, их читают snakeviz, flameprof и т.п.).
+    PROFILE_SAMPLE_RATE — доля запросов, которые вообще профилируются.
+    /metrics без METRICS_TOKEN отвечает только на запросы с localhost.
+    """
+    add_connection_hook(install_sql_tracing)
+    add_statement_hook(_time_statement)
+
+    slow_ms = float(app.config.get('PROFILE_SLOW_REQUEST_MS') or 0)
+    sample_rate = float(app.config.get('PROFILE_SAMPLE_RATE', 1.0))
+    profile_dir = app.config.get('PROFILE_DIR') or 'profiles'
+    sample_counter = [0]
+
+    @app.before_request
+    def start_request_metrics():
+        _local.active = True
+        _local.sql_count = 0
+        g.metrics_start = time.perf_counter()
+        g.profiler = None
+        if slow_ms > 0 and sample_rate > 0:
+            sample_counter[0] += 1
+            if sample_counter[0] % max(1, round(1 / sample_rate)) == 0 and _profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Профилировщик уже включён не нами (отладчик, coverage)
+                    _profiler_lock.release()
+                else:
+                    g.profiler = profiler
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_DURATION.observe(elapsed, endpoint, request.method, response.status_code)
+        SQL_STATEMENTS.observe(_local.sql_count, endpoint)
+        _local.active = False
+
+        profiler = _stop_profiler()
+        if profiler is not None:
+            if elapsed * 1000 >= slow_ms:
+                SLOW_REQUESTS.inc(endpoint)
+                os.makedirs(profile_dir, exist_ok=True)
+                filename = f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{int(elapsed * 1000)}ms.pstats'
+                profiler.dump_stats(os.path.join(profile_dir, filename))
+        return response
+
+    def _stop_profiler():
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+        return profiler
+
+    @app.teardown_request
+    def release_profiler(exc):
+        # after_request вызывается не всегда, а профилировщик процесса нельзя оставить занятым
+        _stop_profiler()
+
+    def template_started(sender, template, context, **extra):
+        stack = getattr(_local, 'templates', None)
+        if stack is None:
+            stack = _local.templates = []
+        stack.append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        stack = getattr(_local, 'templates', None)
+        if stack:
+            TEMPLATE_DURATION.observe(time.perf_counter() - stack.pop(), template.name or 'string')
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            if request.headers.get('Authorization') != f'Bearer {token}':
+                abort(403)
+        elif request.remote_addr not in LOCAL_ADDRESSES:
+            abort(403)
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,64 @@
+"""Ограничение частоты запросов по ключу (например, IP) скользящим окном в памяти процесса."""
+import collections
+import threading
+import time
+
+
+class RateLimiter:
+    """Не больше limit событий за window секунд на ключ."""
+
+    def __init__(self, limit=10, window=60, max_keys=10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.blocked = 0
+        self._events = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        events = self._events.pop(key, None) or collections.deque()
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        return events
+
+    def is_limited(self, key):
+        """True, если лимит для key исчерпан; само обращение событием не считается."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            if events:
+                self._events[key] = events
+            limited = len(events) >= self.limit
+            if limited:
+                self.blocked += 1
+            return limited
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    def hit(self, key):
+        """Учитывает событие; возвращает False, если лимит для key уже исчерпан."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            allowed = len(events) < self.limit
+            if allowed:
+                events.append(now)
+            else:
+                self.blocked += 1
+            self._events[key] = events
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+            return allowed
+
+    def retry_after(self, key):
+        with self._lock:
+            events = self._events.get(key)
+            if not events or len(events) < self.limit:
+                return 0
+            return max(int(events[0] + self.window - time.monotonic()) + 1, 1)
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._events), 'blocked': self.blocked}
@@ -124,6 +124,15 @@ function setupEventListeners() {
         resetBtn.addEventListener('click', resetCode);
     }
     
+    const liveRunBtn = document.getElementById('live-run-btn');
+    if (liveRunBtn && lessonConfig.liveUrl) {
+        liveRunBtn.addEventListener('click', runLive);
+        document.getElementById('live-stop-btn').addEventListener('click', stopLive);
+        document.getElementById('live-input-form').addEventListener('submit', sendLiveInput);
+    } else if (liveRunBtn) {
+        liveRunBtn.style.display = 'none';
+    }
+    
     if (codeEditor && codeEditor.on) {
         codeEditor.on('blur', function() {
             saveCodeToStorage();
@@ -162,7 +171,30 @@ async function executeCode() {
     let failedTests = 0;
     const startTime = performance.now();
     
-    for (let i = 0; i < testCases.length; i++) {
+    if (lessonConfig.checkUrl && testCases.length > 0) {
+        try {
+            const report = await checkAllTests(code);
+            report.cases.forEach(function(caseReport) {
+                const testCase = testCases[caseReport.index - 1];
+                const element = caseReport.error
+                    ? createTestErrorElement(testCase, caseReport.error, caseReport.index)
+                    : createTestResultElement(testCase, caseReport.output, caseReport.passed, caseReport.index);
+                if (testResults) {
+                    testResults.appendChild(element);
+                }
+            });
+            passedTests = report.passed_count;
+            failedTests = report.total - report.passed_count;
+        } catch (error) {
+            console.error('executeCode: ошибка проверки:', error);
+            if (testResults) {
+                testResults.appendChild(createTestErrorElement({}, error.message, 1));
+            }
+            failedTests = testCases.length;
+        }
+    }
+    
+    for (let i = 0; i < testCases.length && !lessonConfig.checkUrl; i++) {
         const testCase = testCases[i];
         
         try {
@@ -218,11 +250,40 @@ async function executeCode() {
     saveCodeToStorage();
 }
 
+async function checkAllTests(code) {
+    console.log('checkAllTests: отправка решения на проверку');
+    
+    const response = await fetch(lessonConfig.checkUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            code: code,
+            language: 'python'
+        })
+    });
+    
+    const job = await response.json();
+    if (!response.ok) {
+        throw new Error(job.error || `Ошибка сервера: ${response.status}`);
+    }
+    
+    const finished = window.EventSource ? await streamJob(job) : await pollJob(job);
+    console.log('checkAllTests: результат', finished);
+    
+    return finished.result;
+}
+
 async function runSingleTest(code, inputData) {
-    console.log('runSingleTest: отправка запроса на выполнение');
+    console.log('runSingleTest: отправка задачи на выполнение');
+    
+    if (!lessonConfig.jobsUrl) {
+        return runSingleTestSync(code, inputData);
+    }
     
     try {
-        const response = await fetch(lessonConfig.apiUrl, {
+        const response = await fetch(lessonConfig.jobsUrl, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -234,20 +295,17 @@ async function runSingleTest(code, inputData) {
             })
         });
         
-        console.log('runSingleTest: ответ получен, статус', response.status);
+        console.log('runSingleTest: задача принята, статус', response.status);
         
+        const job = await response.json();
         if (!response.ok) {
-            throw new Error(`Ошибка сервера: ${response.status}`);
+            throw new Error(job.error || `Ошибка сервера: ${response.status}`);
         }
         
-        const result = await response.json();
-        console.log('runSingleTest: результат', result);
+        const finished = window.EventSource ? await streamJob(job) : await pollJob(job);
+        console.log('runSingleTest: результат', finished);
         
-        if (result.error) {
-            throw new Error(result.error);
-        }
-        
-        return result.output || '';
+        return finished.result.output || '';
         
     } catch (error) {
         console.error('runSingleTest: ошибка запроса:', error);
@@ -255,6 +313,186 @@ async function runSingleTest(code, inputData) {
     }
 }
 
+function streamJob(job) {
+    return new Promise(function(resolve, reject) {
+        const source = new EventSource(job.stream_url);
+        
+        source.addEventListener('result', function(event) {
+            source.close();
+            resolve(JSON.parse(event.data));
+        });
+        
+        source.onerror = function() {
+            // Соединение оборвалось — дожидаемся результата обычным опросом
+            source.close();
+            pollJob(job).then(resolve, reject);
+        };
+    });
+}
+
+async function pollJob(job) {
+    while (true) {
+        const response = await fetch(`${job.poll_url}?wait=5`);
+        const data = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(data.error || `Ошибка сервера: ${response.status}`);
+        }
+        if (data.status === 'done') {
+            return data;
+        }
+    }
+}
+
+async function runSingleTestSync(code, inputData) {
+    const response = await fetch(lessonConfig.apiUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            code: code,
+            input: inputData,
+            language: 'python'
+        })
+    });
+    
+    if (!response.ok) {
+        throw new Error(`Ошибка сервера: ${response.status}`);
+    }
+    
+    const result = await response.json();
+    if (result.error) {
+        throw new Error(result.error);
+    }
+    
+    return result.output || '';
+}
+
+// Потоковый запуск: вывод появляется по мере выполнения, input() читает строки из поля ввода
+let liveRun = null;
+
+function appendLiveOutput(text, className) {
+    const output = document.getElementById('live-output');
+    const span = document.createElement('span');
+    span.className = className;
+    span.textContent = text;
+    output.appendChild(span);
+    output.scrollTop = output.scrollHeight;
+}
+
+function setLiveRunning(running) {
+    const liveRunBtn = document.getElementById('live-run-btn');
+    const input = document.getElementById('live-input');
+    liveRunBtn.disabled = running;
+    document.getElementById('live-stop-btn').disabled = !running;
+    input.disabled = !running;
+    document.querySelector('#live-input-form button').disabled = !running;
+    if (running) {
+        input.focus();
+    }
+}
+
+async function runLive() {
+    const code = window.codeEditor ? window.codeEditor.getValue() : '';
+    if (!code.trim()) {
+        alert('Введите код для выполнения');
+        return;
+    }
+    
+    document.getElementById('live-console').style.display = 'block';
+    document.getElementById('live-output').textContent = '';
+    setLiveRunning(true);
+    
+    let response;
+    try {
+        response = await fetch(lessonConfig.liveUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({code: code, interactive: true})
+        });
+    } catch (error) {
+        appendLiveOutput(`Ошибка соединения: ${error.message}\n`, 'live-stderr');
+        setLiveRunning(false);
+        return;
+    }
+    const data = await response.json();
+    
+    if (response.status === 501) {
+        // Исполнитель не умеет потоковый режим — запускаем обычным образом
+        try {
+            appendLiveOutput(await runSingleTestSync(code, ''), 'live-stdout');
+        } catch (error) {
+            appendLiveOutput(error.message, 'live-stderr');
+        }
+        setLiveRunning(false);
+        return;
+    }
+    if (!response.ok || !data.run_id) {
+        appendLiveOutput(data.error || data.output || `Ошибка сервера: ${response.status}`, 'live-stderr');
+        setLiveRunning(false);
+        return;
+    }
+    
+    liveRun = data;
+    const source = new EventSource(data.stream_url);
+    liveRun.source = source;
+    
+    source.addEventListener('stdout', function(event) {
+        appendLiveOutput(JSON.parse(event.data).text, 'live-stdout');
+    });
+    source.addEventListener('stderr', function(event) {
+        appendLiveOutput(JSON.parse(event.data).text, 'live-stderr');
+    });
+    source.addEventListener('exit', function(event) {
+        const result = JSON.parse(event.data);
+        if (result.message) {
+            appendLiveOutput(`\n${result.message}\n`, result.cancelled ? 'live-status' : 'live-stderr');
+        }
+        appendLiveOutput(`\n[Программа завершилась с кодом ${result.exit_code}]\n`, 'live-status');
+        finishLive();
+    });
+    source.onerror = function() {
+        appendLiveOutput('\n[Соединение прервано]\n', 'live-status');
+        finishLive();
+    };
+}
+
+function finishLive() {
+    if (liveRun && liveRun.source) {
+        liveRun.source.close();
+    }
+    liveRun = null;
+    setLiveRunning(false);
+}
+
+async function sendLiveInput(event) {
+    event.preventDefault();
+    const input = document.getElementById('live-input');
+    if (!liveRun) {
+        return;
+    }
+    const text = input.value + '\n';
+    input.value = '';
+    appendLiveOutput(text, 'live-stdin');
+    
+    const response = await fetch(liveRun.input_url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({text: text})
+    });
+    if (!response.ok) {
+        const data = await response.json();
+        appendLiveOutput(`[${data.error}]\n`, 'live-status');
+    }
+}
+
+async function stopLive() {
+    if (liveRun) {
+        await fetch(liveRun.cancel_url, {method: 'DELETE'});
+    }
+}
+
 function compareOutput(actual, expected) {
     const normalize = (str) => {
         if (typeof str !== 'string') return '';
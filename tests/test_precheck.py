@@ -0,0 +1,40 @@
+"""Запрет опасных импортов: обходы через os, posix, sys.modules и атрибуты других модулей."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor.precheck import PrecheckError, precheck
+
+
+@pytest.mark.parametrize('code', [
+    'import os\nos.system("id")',
+    'import posix\nposix.system("id")',
+    'import _posixsubprocess',
+    'from os import popen',
+    'import os as o\no.fork()',
+    'import os\ngetattr(os, "system")("id")',
+    'import os.path\nos.path.os.system("id")',
+    'import random\nrandom._os.system("id")',
+    'import sys\nsys.modules["os"].system("id")',
+    '__import__("os").system("id")',
+    '__import__("o" + "s")',
+    '__builtins__.__import__("os")',
+    'import builtins',
+])
+def test_rejects_process_access(code):
+    with pytest.raises(PrecheckError):
+        precheck(code)
+
+
+@pytest.mark.parametrize('code', [
+    'import os.path\nprint(os.path.join("a", "b"))',
+    'from os.path import join\nprint(join("a", "b"))',
+    'import sys\ninput = sys.stdin.readline\nprint(int(input()))',
+    'import sys\nsys.setrecursionlimit(10000)',
+    'import math\nprint(__import__("math").sqrt(2))',
+])
+def test_allows_lesson_code(code):
+    assert precheck(code)
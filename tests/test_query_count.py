@@ -0,0 +1,76 @@
+"""Число SQL-запросов на страницах каталога не должно расти вместе с числом курсов и модулей."""
+import os
+import sqlite3
+import sys
+
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='module')
+def app_env(tmp_path_factory):
+    from bench.seed import seed
+
+    path = str(tmp_path_factory.mktemp('db') / 'app.db')
+    seed(path, users=2, courses=2, modules_per_course=1, lessons_per_module=3, progress=4)
+    os.environ['DATABASE_PATH'] = path
+    # Версия каталога проверяется только после явного invalidate_catalog()
+    os.environ['CATALOG_CHECK_INTERVAL'] = '3600'
+    os.environ['ASSETS_BUILD_ON_START'] = '0'
+    import main
+
+    main.app.config['TESTING'] = True
+    if 'course_detail.html' not in main.app.jinja_env.list_templates():
+        # Шаблона страницы курса в репозитории нет; запросы к БД от шаблона не зависят
+        main.app.jinja_loader = ChoiceLoader([main.app.jinja_loader, DictLoader({
+            'course_detail.html': '{% for m in course.modules %}{{ m.title }}{% endfor %}{{ progress|length }}',
+        })])
+    statements = []
+    main.add_statement_hook(lambda sql, elapsed: statements.append(sql))
+    return main, path, statements
+
+
+def add_course(path, modules, lessons_per_module=3):
+    conn = sqlite3.connect(path)
+    course_id = conn.execute("INSERT INTO courses (title, description, order_index) VALUES ('Курс', '', 100)").lastrowid
+    for m in range(modules):
+        module_id = conn.execute('INSERT INTO modules (course_id, title, order_index) VALUES (?, ?, ?)',
+                                 (course_id, f'Модуль {m}', m)).lastrowid
+        conn.executemany('INSERT INTO lessons (module_id, title, content, order_index) VALUES (?, ?, ?, ?)',
+                         [(module_id, f'Урок {m}.{i}', '<p>текст</p>', i) for i in range(lessons_per_module)])
+    conn.commit()
+    conn.close()
+    return course_id
+
+
+def count_statements(app_env, url):
+    main, _, statements = app_env
+    main.invalidate_catalog()
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session['id'] = 1
+        session['username'] = 'user1'
+        session['email'] = 'user1@example.com'
+    # Первый запрос прогревает снимок каталога и контекст пользователя, считаем второй
+    assert client.get(url).status_code == 200
+    del statements[:]
+    assert client.get(url).status_code == 200
+    return len(statements)
+
+
+def test_courses_page_queries_do_not_grow_with_courses(app_env):
+    _, path, _ = app_env
+    before = count_statements(app_env, '/courses')
+    for _ in range(5):
+        add_course(path, modules=4)
+    assert count_statements(app_env, '/courses') == before
+
+
+def test_course_page_queries_do_not_grow_with_modules(app_env):
+    _, path, _ = app_env
+    small = add_course(path, modules=1)
+    large = add_course(path, modules=12)
+    assert count_statements(app_env, f'/course/{large}') == count_statements(app_env, f'/course/{small}')